@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Versioned arrival snapshots
+Train data handed from the update thread to the display as immutable
+snapshots: the update thread builds a new one and publishes it by
+replacing a single reference, so readers never lock and never see a
+half-updated board.
+
+Every publish gets the next sequence number; the version only moves when
+the arrivals themselves change, so render caches keyed on it survive
+refreshes that bring nothing new for the station.
+
+The last snapshot can be saved to a small binary file and restored at
+startup, so the board has countdowns before the first fetch returns.
+"""
+
+import logging
+import os
+import struct
+import tempfile
+import time
+from collections import namedtuple
+
+from mta_client import Train
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ("northbound", "southbound")
+
+
+def arrivals_key(trains):
+    """Comparable content of a sequence of Train objects"""
+    return tuple(
+        (train.route_id, train.destination, train.arrival_time)
+        for train in trains
+    )
+
+
+class ArrivalSnapshot(namedtuple(
+        'ArrivalSnapshot',
+        'sequence version feed_timestamp fetched_at northbound southbound restored')):
+    """Immutable arrivals for the display, one per published update
+
+    Fields:
+        sequence: Publish counter (1 for the first published snapshot)
+        version: Sequence number of the last publish that changed the arrivals
+        feed_timestamp: Feed header timestamp the arrivals came from (Unix)
+        fetched_at: When the feed was fetched (Unix)
+        northbound, southbound: Tuples of Train objects, soonest first
+        restored: True if loaded from a file at startup rather than fetched
+
+    The Train objects are shared between snapshots and must not be modified.
+    """
+
+    __slots__ = ()
+
+    FILE_MAGIC = b"MTASNAP\0"
+    FILE_VERSION = 1
+    # magic, version, feed timestamp, fetched_at, northbound and southbound
+    # counts, string table length
+    FILE_HEADER = struct.Struct("<8sIQdHHI")
+    # route index, destination index, arrival time
+    FILE_TRAIN = struct.Struct("<HHq")
+
+    @classmethod
+    def empty(cls):
+        """Snapshot with no trains, before the first fetch"""
+        return cls(0, 0, 0, 0.0, (), (), False)
+
+    def trains(self, direction):
+        """Trains for 'northbound' or 'southbound'"""
+        if direction == "southbound":
+            return self.southbound
+        return self.northbound
+
+    def age(self, now=None):
+        """Seconds since the data was fetched (inf before the first fetch)"""
+        if not self.fetched_at:
+            return float("inf")
+        return (now or time.time()) - self.fetched_at
+
+    def next_arrival(self, now=None):
+        """Arrival time of the soonest train still to come, or None"""
+        now = now or time.time()
+        upcoming = [
+            train.arrival_time
+            for trains in (self.northbound, self.southbound)
+            for train in trains
+            if train.arrival_time > now
+        ]
+        return min(upcoming, default=None)
+
+    def publish(self, train_data=None, feed_timestamp=None, fetched_at=None):
+        """Build the snapshot that follows this one
+
+        Args:
+            train_data: Dict with 'northbound' and 'southbound' lists of
+                        Train objects, or None if the feed was unchanged
+            feed_timestamp: Feed header timestamp (default: keep)
+            fetched_at: Unix time of the fetch (default: time.time())
+
+        Returns:
+            New ArrivalSnapshot; version only advances when the arrivals
+            differ from this snapshot's
+        """
+        northbound, southbound = self.northbound, self.southbound
+        if train_data is not None:
+            northbound = tuple(train_data.get("northbound", ()))
+            southbound = tuple(train_data.get("southbound", ()))
+
+        sequence = self.sequence + 1
+        version = self.version
+        if (arrivals_key(northbound) != arrivals_key(self.northbound)
+                or arrivals_key(southbound) != arrivals_key(self.southbound)
+                or self.sequence == 0 or self.restored):
+            version = sequence
+
+        return ArrivalSnapshot(
+            sequence,
+            version,
+            self.feed_timestamp if feed_timestamp is None else feed_timestamp,
+            time.time() if fetched_at is None else fetched_at,
+            northbound,
+            southbound,
+            False,
+        )
+
+    def counts(self):
+        """Dict of direction -> number of trains"""
+        return {direction: len(self.trains(direction)) for direction in DIRECTIONS}
+
+    def save(self, path):
+        """Write the snapshot to a binary file atomically
+
+        Route IDs and destinations go into a string table; each train is a
+        fixed-size record pointing into it.
+
+        Args:
+            path: Destination path
+        """
+        strings = {}
+        records = []
+        for train in self.northbound + self.southbound:
+            records.append(self.FILE_TRAIN.pack(
+                strings.setdefault(train.route_id, len(strings)),
+                strings.setdefault(train.destination, len(strings)),
+                int(train.arrival_time),
+            ))
+        table = "\0".join(strings).encode("utf-8")
+
+        header = self.FILE_HEADER.pack(
+            self.FILE_MAGIC, self.FILE_VERSION, int(self.feed_timestamp or 0),
+            float(self.fetched_at), len(self.northbound), len(self.southbound), len(table)
+        )
+
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(table)
+                f.write(b"".join(records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path, after=None):
+        """Read a snapshot written by save()
+
+        Args:
+            path: Snapshot file
+            after: Drop trains that arrived before this Unix time
+
+        Returns:
+            ArrivalSnapshot marked as restored (sequence and version 1), or
+            None if the file is missing or unreadable
+        """
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+
+        try:
+            magic, version, feed_timestamp, fetched_at, north_count, south_count, table_len = \
+                cls.FILE_HEADER.unpack_from(data)
+            if magic != cls.FILE_MAGIC or version != cls.FILE_VERSION:
+                logger.warning(f"Ignoring snapshot file {path} from another format version")
+                return None
+
+            offset = cls.FILE_HEADER.size
+            table = data[offset:offset + table_len].decode("utf-8")
+            strings = table.split("\0") if table_len else []
+            offset += table_len
+
+            trains = {}
+            for direction, count in (("northbound", north_count), ("southbound", south_count)):
+                trains[direction] = []
+                for _ in range(count):
+                    route, destination, arrival_time = cls.FILE_TRAIN.unpack_from(data, offset)
+                    offset += cls.FILE_TRAIN.size
+                    if after is None or arrival_time >= after:
+                        trains[direction].append(
+                            Train(strings[route], strings[destination], arrival_time, direction)
+                        )
+        except (struct.error, UnicodeDecodeError, IndexError) as e:
+            logger.warning(f"Ignoring unreadable snapshot file {path}: {e}")
+            return None
+
+        return cls(1, 1, feed_timestamp, fetched_at,
+                   tuple(trains["northbound"]), tuple(trains["southbound"]), True)
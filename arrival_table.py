@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Columnar arrival table backed by NumPy
+Stores every indexed arrival as parallel typed columns so "next K trains"
+and countdown queries run vectorized, for one stop or every stop at once
+
+NumPy is optional - check HAVE_NUMPY before building a table
+"""
+
+import logging
+
+try:
+    import numpy as np
+    HAVE_NUMPY = True
+except ImportError:
+    np = None
+    HAVE_NUMPY = False
+
+logger = logging.getLogger(__name__)
+
+# Direction column codes
+NORTHBOUND = 0
+SOUTHBOUND = 1
+DIRECTION_NAMES = ("northbound", "southbound")
+
+
+class ArrivalTable:
+    """Arrivals as columns: stop_idx, route_idx, direction, arrival_ts, trip_idx
+
+    Stop, route and trip strings are interned into lookup lists; the columns
+    hold their indices. Rows are sorted by arrival time, so the first
+    matching rows of any query are the next arrivals.
+    """
+
+    def __init__(self, stops, routes, trips, stop_idx, route_idx, direction, arrival_ts, trip_idx):
+        """Initialize from prepared columns (use from_rows / from_index)
+
+        Args:
+            stops: List of base stop IDs (e.g. 'R35'), indexed by stop_idx
+            routes: List of route IDs, indexed by route_idx
+            trips: List of trip IDs, indexed by trip_idx
+            stop_idx, route_idx, direction, arrival_ts, trip_idx: Columns
+        """
+        self.stops = stops
+        self.routes = routes
+        self.trips = trips
+        self.stop_lookup = {stop_id: i for i, stop_id in enumerate(stops)}
+        self.route_lookup = {route_id: i for i, route_id in enumerate(routes)}
+
+        order = np.argsort(arrival_ts, kind="stable")
+        self.stop_idx = stop_idx[order]
+        self.route_idx = route_idx[order]
+        self.direction = direction[order]
+        self.arrival_ts = arrival_ts[order]
+        self.trip_idx = trip_idx[order]
+
+    def __len__(self):
+        return len(self.arrival_ts)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """Build a table from arrival rows
+
+        Platform stop IDs ('R35N' / 'R35S') are split into the base stop and
+        a direction code; arrivals at a parent stop ('R35') take their
+        direction from the trip's direction_id.
+
+        Args:
+            rows: Iterable of (stop_id, arrival_time, route_id, trip_id,
+                  direction_id) tuples
+
+        Returns:
+            ArrivalTable
+        """
+        stops, routes, trips = {}, {}, {}
+        stop_col, route_col, dir_col, time_col, trip_col = [], [], [], [], []
+
+        for stop_id, arrival_time, route_id, trip_id, direction_id in rows:
+            suffix = stop_id[-1:]
+            if suffix == "N" and len(stop_id) > 1:
+                stop_id, direction = stop_id[:-1], NORTHBOUND
+            elif suffix == "S" and len(stop_id) > 1:
+                stop_id, direction = stop_id[:-1], SOUTHBOUND
+            else:
+                direction = NORTHBOUND if direction_id == 0 else SOUTHBOUND
+
+            stop_col.append(stops.setdefault(stop_id, len(stops)))
+            route_col.append(routes.setdefault(route_id, len(routes)))
+            trip_col.append(trips.setdefault(trip_id, len(trips)))
+            dir_col.append(direction)
+            time_col.append(arrival_time)
+
+        return cls(
+            list(stops),
+            list(routes),
+            list(trips),
+            np.array(stop_col, dtype=np.int32),
+            np.array(route_col, dtype=np.int16),
+            np.array(dir_col, dtype=np.int8),
+            np.array(time_col, dtype=np.int64),
+            np.array(trip_col, dtype=np.int32),
+        )
+
+    @classmethod
+    def from_index(cls, index):
+        """Build a table from the arrivals held by a FeedIndex
+
+        Args:
+            index: mta_client.FeedIndex
+
+        Returns:
+            ArrivalTable
+        """
+        return cls.from_rows(
+            (stop_id, arrival_time, route_id, trip_id, direction_id)
+            for stop_id, (arrival_time, route_id, trip_id, direction_id) in index.rows()
+        )
+
+    def _route_mask(self, route_ids):
+        """Boolean mask of rows served by the given routes (None = all)"""
+        if route_ids is None:
+            return np.ones(len(self), dtype=bool)
+        codes = [self.route_lookup[r] for r in route_ids if r in self.route_lookup]
+        return np.isin(self.route_idx, codes)
+
+    def next_arrivals(self, stop_id, route_ids=None, k=5, after=0):
+        """Find the next arrivals at one stop
+
+        Args:
+            stop_id: Base stop ID (e.g. 'R35')
+            route_ids: List of route IDs to include, or None for all routes
+            k: Arrivals per direction
+            after: Ignore arrivals before this Unix timestamp
+
+        Returns:
+            Dict of 'northbound' / 'southbound' -> array of row indices,
+            earliest first
+        """
+        result = {name: np.empty(0, dtype=np.intp) for name in DIRECTION_NAMES}
+        stop = self.stop_lookup.get(stop_id)
+        if stop is None:
+            return result
+
+        mask = (self.stop_idx == stop) & (self.arrival_ts >= after) & self._route_mask(route_ids)
+        for code, name in enumerate(DIRECTION_NAMES):
+            result[name] = np.flatnonzero(mask & (self.direction == code))[:k]
+        return result
+
+    def next_arrivals_all(self, route_ids=None, k=5, after=0):
+        """Find the next arrivals at every stop in one vectorized pass
+
+        Args:
+            route_ids: List of route IDs to include, or None for all routes
+            k: Arrivals per stop and direction
+            after: Ignore arrivals before this Unix timestamp
+
+        Returns:
+            Dict of base stop ID -> {'northbound': rows, 'southbound': rows}
+        """
+        rows = np.flatnonzero((self.arrival_ts >= after) & self._route_mask(route_ids))
+        if not len(rows):
+            return {}
+
+        # Group rows by (stop, direction); rows are time-sorted, and a stable
+        # sort keeps that order inside each group
+        group = self.stop_idx[rows].astype(np.int64) * 2 + self.direction[rows]
+        order = np.argsort(group, kind="stable")
+        rows, group = rows[order], group[order]
+
+        # Rank of each row within its group - keep the first k
+        starts = np.flatnonzero(np.r_[True, group[1:] != group[:-1]])
+        sizes = np.diff(np.r_[starts, len(group)])
+        rank = np.arange(len(group)) - np.repeat(starts, sizes)
+        keep = rank < k
+        rows, group = rows[keep], group[keep]
+
+        result = {}
+        bounds = np.flatnonzero(np.r_[True, group[1:] != group[:-1], True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            stop_code, direction = divmod(int(group[start]), 2)
+            by_direction = result.setdefault(
+                self.stops[stop_code],
+                {name: np.empty(0, dtype=np.intp) for name in DIRECTION_NAMES}
+            )
+            by_direction[DIRECTION_NAMES[direction]] = rows[start:end]
+        return result
+
+    def minutes_to_arrival(self, now, rows=None):
+        """Minutes until arrival for all rows (or a subset), clamped at 0
+
+        Args:
+            now: Unix timestamp to measure from
+            rows: Optional array of row indices
+
+        Returns:
+            Integer array of minutes
+        """
+        arrival_ts = self.arrival_ts if rows is None else self.arrival_ts[rows]
+        return np.maximum(0, np.trunc((arrival_ts - now) / 60)).astype(np.int64)
+
+    def row(self, row):
+        """Decode one row
+
+        Args:
+            row: Row index
+
+        Returns:
+            Tuple of (route_id, arrival_time, trip_id)
+        """
+        return (
+            self.routes[self.route_idx[row]],
+            int(self.arrival_ts[row]),
+            self.trips[self.trip_idx[row]],
+        )
@@ -0,0 +1,1245 @@
+#!/usr/bin/env python3
+"""
+Performance benchmarks for MTA Train Display
+Runs headless against synthetic feeds and a mock matrix - no network or
+LED hardware needed
+
+Run with:
+    python3 benchmark.py
+"""
+
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+
+from google.transit import gtfs_realtime_pb2
+from PIL import Image, ImageDraw
+
+from arrival_snapshot import ArrivalSnapshot
+from arrival_table import HAVE_NUMPY, ArrivalTable
+from bitmap_font import BitmapFont
+from circuit_breaker import CircuitBreaker
+from config import Config
+from display_manager import DisplayManager
+from frame_pipeline import FramePipeline
+from frame_scheduler import FrameScheduler
+from frame_sinks import RingBufferSink, SnapshotSink
+from mock_matrix import MockMatrix
+from mta_client import FeedIndex, MTAClient, Train
+from poll_scheduler import PollScheduler
+from static_gtfs import StaticGTFS, short_pattern, split_trip_id
+
+# Keep parse_feed and font fallback logging out of the timings
+logging.basicConfig(level=logging.WARNING)
+logging.getLogger("mta_client").setLevel(logging.ERROR)
+logging.getLogger("display_manager").setLevel(logging.ERROR)
+logging.getLogger("poll_scheduler").setLevel(logging.ERROR)
+logging.getLogger("circuit_breaker").setLevel(logging.ERROR)
+logging.getLogger("main").setLevel(logging.ERROR)
+
+
+# Stops along the 4 Av line, used to give synthetic trips realistic lengths
+SYNTHETIC_STOPS = [
+    "R30", "R31", "R32", "R33", "R34", "R35", "R36", "R39", "R40",
+    "R41", "R42", "R43", "R44", "R45", "N02", "N03", "N04", "N05",
+    "N06", "N07", "N08", "N09", "N10", "D40", "D41", "D42", "D43",
+]
+
+
+def build_synthetic_feed(num_entities=300, routes=("R", "N", "D", "Q", "W"), now=None):
+    """Build a FeedMessage shaped like an MTA subway feed
+
+    Args:
+        num_entities: Number of trip_update entities
+        routes: Route IDs to cycle through
+        now: Reference Unix timestamp (defaults to current time)
+
+    Returns:
+        FeedMessage with num_entities trip updates
+    """
+    now = int(now or time.time())
+    feed = gtfs_realtime_pb2.FeedMessage()
+    feed.header.gtfs_realtime_version = "1.0"
+    feed.header.timestamp = now
+
+    for i in range(num_entities):
+        route_id = routes[i % len(routes)]
+        suffix = "N" if i % 2 else "S"
+
+        entity = feed.entity.add()
+        entity.id = f"{i:06d}"
+        trip_update = entity.trip_update
+        trip_update.trip.trip_id = f"{(i * 150) % 144000:06d}_{route_id}..{suffix}"
+        trip_update.trip.route_id = route_id
+
+        for j, stop in enumerate(SYNTHETIC_STOPS):
+            stop_time = trip_update.stop_time_update.add()
+            stop_time.stop_id = f"{stop}{suffix}"
+            stop_time.arrival.time = now + 60 * ((i * 7 + j * 2) % 45)
+
+    return feed
+
+
+def reference_parse_feed(feed, stop_id, route_ids=None):
+    """Stop matching as done before the compiled matcher
+
+    Two passes over every stop_time_update with upper() and substring tests,
+    kept here only as a baseline for bench_parse_feed.
+    """
+    trains = {"northbound": [], "southbound": []}
+
+    all_stops = {}
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        for stop_time in entity.trip_update.stop_time_update:
+            stop = stop_time.stop_id
+            if stop_id.upper() in stop.upper() or stop.startswith(stop_id):
+                all_stops[stop] = all_stops.get(stop, 0) + 1
+
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        trip_update = entity.trip_update
+        route_id = trip_update.trip.route_id
+        if route_ids is not None and route_id not in route_ids:
+            continue
+
+        for stop_time in trip_update.stop_time_update:
+            stop_id_check = stop_time.stop_id
+            if (stop_id.upper() in stop_id_check.upper()
+                    or stop_id_check.startswith(stop_id)
+                    or stop_id in stop_id_check):
+                stop_upper = stop_id_check.upper()
+                direction = "northbound" if stop_upper.endswith('N') else "southbound"
+                if stop_time.HasField("arrival"):
+                    trains[direction].append((stop_time.arrival.time, route_id))
+                break
+
+    return trains
+
+
+def reference_single_pass(feed, stop_id, route_ids=None):
+    """Exact stop ID matching in one pass over the feed, without an index
+
+    How parse_feed matches stops, without building Train objects; the
+    baseline for the incremental index (it rescans every trip each poll).
+    """
+    stop_directions = MTAClient.compile_stop_matcher(stop_id)
+    route_filter = set(route_ids) if route_ids is not None else None
+    trains = {"northbound": [], "southbound": []}
+
+    for entity in feed.entity:
+        if not entity.HasField("trip_update"):
+            continue
+        trip_update = entity.trip_update
+        trip = trip_update.trip
+        route_id = trip.route_id
+        if route_filter is not None and route_id not in route_filter:
+            continue
+
+        for stop_time in trip_update.stop_time_update:
+            if stop_time.stop_id not in stop_directions:
+                continue
+            direction = stop_directions[stop_time.stop_id]
+            if direction is None:
+                direction = "northbound" if trip.direction_id == 0 else "southbound"
+            arrival_time = stop_time.arrival.time or stop_time.departure.time
+            if arrival_time:
+                trains[direction].append((arrival_time, route_id))
+            break
+
+    for direction in trains:
+        trains[direction] = sorted(trains[direction])[:5]
+    return trains
+
+
+def time_call(func, repeat=50):
+    """Time a callable
+
+    Args:
+        func: Callable taking no arguments
+        repeat: Number of calls
+
+    Returns:
+        Mean seconds per call
+    """
+    func()  # Warm up
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def changed_copy(feed, fraction):
+    """Copy a feed and shift the predictions of some of its trips
+
+    Args:
+        feed: FeedMessage to copy
+        fraction: Fraction of trip_update entities to change
+
+    Returns:
+        New FeedMessage
+    """
+    copy = gtfs_realtime_pb2.FeedMessage()
+    copy.CopyFrom(feed)
+    step = max(1, int(round(1 / fraction)))
+    for entity in copy.entity[::step]:
+        for stop_time in entity.trip_update.stop_time_update:
+            stop_time.arrival.time += 30
+    return copy
+
+
+def bench_parse_feed():
+    """Compare parse_feed against the old two-pass substring matcher"""
+    print("\n" + "="*70)
+    print("parse_feed: exact stop IDs vs. substring scan (300 entities)")
+    print("="*70)
+
+    feed = build_synthetic_feed(300)
+    client = MTAClient()
+    route_ids = ["R", "N", "D"]
+
+    before = time_call(lambda: reference_parse_feed(feed, "R35", route_ids))
+    after = time_call(lambda: client.parse_feed(feed, "R35", route_ids))
+
+    print(f"  Substring scan:   {before * 1000:8.3f} ms/parse")
+    print(f"  Exact IDs:        {after * 1000:8.3f} ms/parse")
+    print(f"  Speedup:          {before / after:8.1f}x")
+
+
+def bench_feed_index():
+    """Compare one FeedIndex for many stations against an index per station"""
+    print("\n" + "="*70)
+    print("FeedIndex: many stations from one scan vs. one scan per station")
+    print("="*70)
+
+    feed = build_synthetic_feed(300)
+    client = MTAClient()
+    line_stations = {
+        stop: {"stop_id": stop, "route_ids": ["R", "N", "D"]}
+        for stop in SYNTHETIC_STOPS
+    }
+
+    for label, stations in [("STATION_CONFIGS", Config.STATION_CONFIGS),
+                            ("Whole line", line_stations)]:
+        def scan_per_station():
+            for station in stations.values():
+                client.parse_feed(feed, station["stop_id"], station["route_ids"])
+
+        def shared_index():
+            client.feed_index = None
+            client.parse_stations(feed, stations)
+
+        before = time_call(scan_per_station, repeat=20)
+        after = time_call(shared_index, repeat=20)
+
+        print(f"  {label} ({len(stations)} stations):")
+        print(f"    Scan per station: {before * 1000:8.3f} ms/cycle")
+        print(f"    Shared index:     {after * 1000:8.3f} ms/cycle")
+        print(f"    Speedup:          {before / after:8.1f}x")
+
+
+def bench_incremental_index():
+    """Compare full index rebuilds against incremental updates"""
+    print("\n" + "="*70)
+    print("FeedIndex: incremental update vs. full rebuild and single pass (10% of trips changed)")
+    print("="*70)
+
+    feeds = [build_synthetic_feed(300)]
+    feeds.append(changed_copy(feeds[0], 0.1))
+    stop_ids = MTAClient.compile_stop_matcher("R35")
+    route_ids = ["R", "N", "D"]
+    index = FeedIndex(stop_ids=stop_ids, route_ids=route_ids)
+    polls = [0]
+
+    def poll(rebuild):
+        feed = feeds[polls[0] % 2]
+        polls[0] += 1
+        if rebuild:
+            index.build(feed)
+        else:
+            index.update(feed)
+
+    single = time_call(lambda: reference_single_pass(feeds[polls[0] % 2], "R35", route_ids))
+    before = time_call(lambda: poll(True))
+    after = time_call(lambda: poll(False))
+
+    print(f"  Single pass:      {single * 1000:8.3f} ms/poll (no index)")
+    print(f"  Full rebuild:     {before * 1000:8.3f} ms/poll")
+    print(f"  Incremental:      {after * 1000:8.3f} ms/poll")
+    print(f"  Reuse ratio:      {index.reuse_ratio:8.0%}")
+    print(f"  Speedup:          {before / after:8.1f}x vs. rebuild, {single / after:.1f}x vs. single pass")
+
+
+def bench_top_k():
+    """Compare bounded top-k selection against allocating every train"""
+    print("\n" + "="*70)
+    print("trains_from_index: bounded top-k vs. all trains (all routes, 900 trips)")
+    print("="*70)
+
+    feed = build_synthetic_feed(900)
+    index = FeedIndex(feed, stop_ids=MTAClient.compile_stop_matcher("R35"))
+    unbounded = MTAClient(max_trains=10 ** 6, stale_seconds=10 ** 9)
+    bounded = MTAClient()
+
+    before = time_call(lambda: unbounded.trains_from_index(index, "R35"))
+    after = time_call(lambda: bounded.trains_from_index(index, "R35"))
+
+    print(f"  All trains:       {before * 1000:8.3f} ms/lookup")
+    print(f"  Top {bounded.max_trains}:            {after * 1000:8.3f} ms/lookup")
+    print(f"  Speedup:          {before / after:8.1f}x")
+
+
+def bench_arrival_table():
+    """Compare a whole-line overview on the NumPy table against per-stop lookups"""
+    print("\n" + "="*70)
+    print("ArrivalTable: next trains at every stop (NumPy) vs. per-stop lookups")
+    print("="*70)
+
+    if not HAVE_NUMPY:
+        print("  Skipped - NumPy is not installed")
+        return
+
+    feed = build_synthetic_feed(300)
+    index = FeedIndex(feed)
+    client = MTAClient()
+    route_ids = ["R", "N", "D"]
+    now = time.time()
+
+    def per_stop():
+        for stop_id in SYNTHETIC_STOPS:
+            trains = client.trains_from_index(index, stop_id, route_ids)
+            for direction_trains in trains.values():
+                [train.get_minutes_to_arrival(now) for train in direction_trains]
+
+    def vectorized():
+        overview = table.next_arrivals_all(route_ids, k=client.max_trains, after=int(now) - 30)
+        for by_direction in overview.values():
+            for rows in by_direction.values():
+                table.minutes_to_arrival(now, rows)
+
+    table = ArrivalTable.from_index(index)
+    build = time_call(lambda: ArrivalTable.from_index(index), repeat=10)
+    before = time_call(per_stop)
+    after = time_call(vectorized)
+
+    print(f"  Rows:             {len(table):8d}")
+    print(f"  Table build:      {build * 1000:8.3f} ms (once per changed feed)")
+    print(f"  Per-stop lookups: {before * 1000:8.3f} ms/overview")
+    print(f"  Vectorized:       {after * 1000:8.3f} ms/overview")
+    print(f"  Speedup:          {before / after:8.1f}x, "
+          f"{before / (build + after):.1f}x with the rebuild on a changed feed")
+
+
+def bench_static_gtfs():
+    """Compare parsing trips.txt against loading the binary cache"""
+    print("\n" + "="*70)
+    print("StaticGTFS: trips.txt CSV parse vs. memory-mapped cache")
+    print("="*70)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_path = os.path.join(tmp, "trips.cache")
+        before = time_call(lambda: StaticGTFS.from_csv(Config.STATIC_TRIPS_PATH), repeat=3)
+        StaticGTFS.load(Config.STATIC_TRIPS_PATH, cache_path)
+        after = time_call(lambda: StaticGTFS.load(Config.STATIC_TRIPS_PATH, cache_path))
+
+    print(f"  CSV parse:        {before * 1000:8.3f} ms")
+    print(f"  Cached load:      {after * 1000:8.3f} ms")
+    print(f"  Speedup:          {before / after:8.1f}x")
+
+
+def bench_trip_headsigns():
+    """Compare resolving realtime trip IDs by scanning trips.txt vs. the index"""
+    print("\n" + "="*70)
+    print("StaticGTFS: realtime trip_id -> headsign, linear scan vs. suffix index")
+    print("="*70)
+
+    static = StaticGTFS.load(Config.STATIC_TRIPS_PATH, Config.STATIC_CACHE_PATH)
+    # Realtime-style IDs for 300 static trips, without the shape variant
+    step = max(1, len(static) // 300)
+    trip_ids = [
+        f"{static.origin[i]:06d}_{short_pattern(static.patterns[static.pattern_idx[i]])}"
+        for i in range(0, len(static), step)
+    ]
+
+    def linear_scan():
+        for trip_id in trip_ids:
+            origin, pattern = split_trip_id(trip_id)
+            for i in range(len(static)):
+                if (static.origin[i] == origin
+                        and static.patterns[static.pattern_idx[i]].startswith(pattern)):
+                    break
+
+    def cold_index():
+        static._trip_index = None
+        static._resolved.clear()
+        for trip_id in trip_ids:
+            static.headsign_for_trip(trip_id)
+
+    def memoized():
+        for trip_id in trip_ids:
+            static.headsign_for_trip(trip_id)
+
+    before = time_call(linear_scan, repeat=1)
+    cold = time_call(cold_index, repeat=3)
+    after = time_call(memoized)
+    resolved = sum(1 for trip_id in trip_ids if static.headsign_for_trip(trip_id))
+
+    print(f"  Trips resolved:   {resolved:5d}/{len(trip_ids)}")
+    print(f"  Linear scan:      {before * 1000:8.3f} ms/poll")
+    print(f"  First poll:       {cold * 1000:8.3f} ms/poll (builds the index)")
+    print(f"  Later polls:      {after * 1000:8.3f} ms/poll")
+    print(f"  Speedup:          {before / after:8.1f}x")
+
+
+def bench_display_blit():
+    """Compare the frame canvas blit against per-pixel SetPixel output"""
+    print("\n" + "="*70)
+    print("display_image: SetImage + SwapOnVSync vs. SetPixel (mock matrix)")
+    print("="*70)
+
+    setpixel = DisplayManager(matrix=MockMatrix(canvas=False))
+    canvas = DisplayManager(matrix=MockMatrix())
+    now = time.time()
+    trains = [
+        Train("R", "Bay Ridge-95 St", now + 300, "southbound"),
+        Train("N", "Coney Island-Stillwell Av", now + 600, "southbound"),
+    ]
+    frame = Image.new("RGB", (DisplayManager.DISPLAY_WIDTH, DisplayManager.DISPLAY_HEIGHT))
+    setpixel.render_frame("southbound", trains, now=now)
+    frame.paste(setpixel.matrix.image)
+
+    before = time_call(lambda: setpixel.display_image(frame))
+    after = time_call(lambda: canvas.display_image(frame))
+    identical = setpixel.matrix.image.tobytes() == canvas.matrix.image.tobytes()
+
+    print(f"  SetPixel:         {before * 1000:8.3f} ms/frame")
+    print(f"  Frame canvas:     {after * 1000:8.3f} ms/frame")
+    print(f"  Same pixels:      {'yes' if identical else 'NO':>8}")
+    print(f"  Speedup:          {before / after:8.1f}x")
+
+
+def bench_frame_diff():
+    """Compare pushing every frame against skipping unchanged frames"""
+    print("\n" + "="*70)
+    print("render_frame: push every frame vs. skip unchanged (10 s at 30 FPS)")
+    print("="*70)
+
+    now = time.time()
+    scenarios = [
+        ("Static text", ["Fulton", "Bklyn"]),
+        ("Sliding text", ["Bay Ridge-95 St", "Coney Island-Stillwell Av"]),
+    ]
+    frames = 10 * Config.DISPLAY_FPS
+
+    for label, destinations in scenarios:
+        trains = [
+            Train("R", destinations[0], now + 300, "southbound"),
+            Train("N", destinations[1], now + 600, "southbound"),
+        ]
+        for output, canvas in [("SetPixel", False), ("Frame canvas", True)]:
+            display = DisplayManager(matrix=MockMatrix(canvas=canvas))
+
+            def run(skip):
+                display.skip_unchanged = skip
+                display.last_frame = None
+                display.frame_stats = {"pushed": 0, "skipped": 0}
+                for i in range(frames):
+                    display.render_frame("southbound", trains, now=now + i / Config.DISPLAY_FPS)
+
+            before = time_call(lambda: run(False), repeat=3)
+            after = time_call(lambda: run(True), repeat=3)
+            pushed = display.frame_stats["pushed"]
+
+            print(f"  {label}, {output}:")
+            print(f"    Every frame:    {before / frames * 1000:8.3f} ms/frame")
+            print(f"    Skip unchanged: {after / frames * 1000:8.3f} ms/frame ({pushed}/{frames} pushed)")
+            print(f"    Speedup:        {before / after:8.1f}x")
+
+
+def bench_text_cache():
+    """Compare render_frame with and without the text sprite cache"""
+    print("\n" + "="*70)
+    print("render_frame: rasterize text every frame vs. cached sprites")
+    print("="*70)
+
+    now = time.time()
+    trains = [
+        Train("R", "Bay Ridge-95 St", now + 300, "southbound"),
+        Train("N", "Coney Island-Stillwell Av", now + 600, "southbound"),
+    ]
+    display = DisplayManager(matrix=MockMatrix())
+    display.skip_unchanged = False
+
+    def frame():
+        display.render_frame("southbound", trains, now=now)
+
+    def uncached_text():
+        # Same drawing as the renderer did before the cache
+        img = Image.new("RGB", (DisplayManager.DISPLAY_WIDTH, DisplayManager.DISPLAY_HEIGHT))
+        draw = ImageDraw.Draw(img)
+        for text, role in [("SOUTHBOUND", "header"), ("R", "badge"), ("N", "badge"),
+                           ("Bay Ridge-95 St", "dest"), ("Coney Island-Stillwell Av", "dest"),
+                           ("5m", "time"), ("10m", "time")]:
+            font = display.fonts[role]
+            draw.textbbox((0, 0), text, font=font)
+            draw.text((0, 0), text, font=font, fill=(255, 255, 255))
+
+    def cached_text():
+        img = Image.new("RGB", (DisplayManager.DISPLAY_WIDTH, DisplayManager.DISPLAY_HEIGHT))
+        draw = ImageDraw.Draw(img)
+        for text, role in [("SOUTHBOUND", "header"), ("R", "badge"), ("N", "badge"),
+                           ("Bay Ridge-95 St", "dest"), ("Coney Island-Stillwell Av", "dest"),
+                           ("5m", "time"), ("10m", "time")]:
+            display.text_bbox(text, role)
+            display.draw_text(draw, (0, 0), text, role, (255, 255, 255))
+
+    display.text_cache_size = 0
+    display.text_cache.clear()
+    before = time_call(frame)
+    display.text_cache_size = DisplayManager.TEXT_CACHE_SIZE
+    display.text_cache_stats = {"hits": 0, "misses": 0, "evictions": 0}
+    after = time_call(frame)
+    text_before = time_call(uncached_text)
+    text_after = time_call(cached_text)
+    stats = display.text_cache_stats
+
+    print(f"  Text, draw.text:  {text_before * 1000:8.3f} ms/frame")
+    print(f"  Text, sprites:    {text_after * 1000:8.3f} ms/frame")
+    print(f"  Frame, no cache:  {before * 1000:8.3f} ms/frame")
+    print(f"  Frame, cached:    {after * 1000:8.3f} ms/frame")
+    print(f"  Cache:            {len(display.text_cache):8d} sprites, "
+          f"{stats['hits']} hits / {stats['misses']} misses")
+    print(f"  Speedup:          {before / after:8.1f}x (text only {text_before / text_after:.1f}x)")
+
+
+def bench_layers():
+    """Compare redrawing every layer per frame against the cached layers"""
+    print("\n" + "="*70)
+    print("render_frame: redraw all layers vs. cached static/destination layers")
+    print("="*70)
+
+    now = time.time()
+    scenarios = [
+        ("Static text", ["Fulton", "Bklyn"]),
+        ("Sliding text", ["Bay Ridge-95 St", "Coney Island-Stillwell Av"]),
+    ]
+
+    for label, destinations in scenarios:
+        trains = [
+            Train("R", destinations[0], now + 300, "southbound"),
+            Train("N", destinations[1], now + 600, "southbound"),
+        ]
+        display = DisplayManager(matrix=MockMatrix())
+        display.skip_unchanged = False
+
+        def redraw():
+            display.static_layer_key = display.dest_layer_key = None
+            display.render_frame("southbound", trains, now=now)
+
+        before = time_call(redraw, repeat=240)
+        display.layer_stats = {"static_builds": 0, "dest_builds": 0}
+        after = time_call(lambda: display.render_frame("southbound", trains, now=now), repeat=240)
+        stats = display.layer_stats
+
+        print(f"  {label}:")
+        print(f"    Redraw layers:  {before * 1000:8.3f} ms/frame")
+        print(f"    Cached layers:  {after * 1000:8.3f} ms/frame "
+              f"({stats['static_builds']} static / {stats['dest_builds']} destination rebuilds)")
+        print(f"    Speedup:        {before / after:8.1f}x")
+
+
+def reference_slide_row(display, draw, destination, row_y):
+    """Draw one sliding destination row as done before the slide strips
+
+    Measures the text on a throwaway image for the offset, then rasterizes
+    the whole string again; kept here only as a baseline for bench_slide.
+    """
+    font = display.fonts["dest"]
+    bbox = ImageDraw.Draw(Image.new("RGB", (1, 1))).textbbox((0, 0), destination, font=font)
+    text_width = bbox[2] - bbox[0]
+    offset = 0
+    if text_width > display.DEST_MAX_WIDTH:
+        slide_distance = text_width - display.DEST_MAX_WIDTH + 5
+        offset = display._slide_offset_at(display.frame_count % 120, slide_distance)
+    bbox = draw.textbbox((0, 0), destination, font=font)
+    text_y = row_y + (display.ROW_HEIGHT - (bbox[3] - bbox[1])) // 2
+    draw.text((display.COL_WIDTHS[0] + 2 - offset, text_y), destination,
+              font=font, fill=(255, 255, 255))
+
+
+def bench_slide():
+    """Compare per-frame textbbox + full text draw against slide strips"""
+    print("\n" + "="*70)
+    print("Sliding destinations: textbbox + draw.text vs. offset table + strip crop")
+    print("="*70)
+
+    display = DisplayManager(matrix=MockMatrix())
+    destinations = ["Bay Ridge-95 St", "Coney Island-Stillwell Av"]
+    img = Image.new("RGB", (DisplayManager.DISPLAY_WIDTH, DisplayManager.DISPLAY_HEIGHT))
+    draw = ImageDraw.Draw(img)
+
+    def before_frame():
+        display.frame_count += 1
+        for idx, destination in enumerate(destinations):
+            reference_slide_row(display, draw, destination, 7 + idx * 12)
+
+    def after_frame():
+        display.frame_count += 1
+        for idx, destination in enumerate(destinations):
+            display.draw_destination_text_only(draw, destination, display.COL_WIDTHS[0],
+                                               7 + idx * 12, "dest")
+
+    before = time_call(before_frame, repeat=240)
+    after = time_call(after_frame, repeat=240)
+
+    print(f"  textbbox + text:  {before * 1000:8.3f} ms/frame")
+    print(f"  Strip crop:       {after * 1000:8.3f} ms/frame")
+    print(f"  Speedup:          {before / after:8.1f}x")
+
+
+def bench_frame_scheduler():
+    """Compare fixed-rate rendering against the adaptive frame scheduler"""
+    print("\n" + "="*70)
+    print("Display loop: fixed 30 FPS vs. adaptive scheduler (10 simulated minutes)")
+    print("="*70)
+
+    start = 1_700_000_000.0
+    duration = 600
+    scenarios = [
+        ("Static text", ["Fulton", "Bklyn"]),
+        ("Sliding text", ["Bay Ridge-95 St", "Coney Island-Stillwell Av"]),
+    ]
+
+    for label, destinations in scenarios:
+        trains = [
+            Train("R", destinations[0], start + 420, "northbound"),
+            Train("N", destinations[1], start + 900, "northbound"),
+        ]
+        display = DisplayManager(matrix=MockMatrix())
+        display.skip_unchanged = False
+        render = time_call(lambda: display.render_frame("northbound", trains, now=start))
+
+        counts = {}
+        for mode, adaptive in [("Fixed", False), ("Adaptive", True)]:
+            scheduler = FrameScheduler(Config.DISPLAY_FPS, Config.FRAME_DURATION, adaptive)
+            now, frames = start, 0
+            while now < start + duration:
+                frames += 1
+                due = scheduler.next_frame_time(now, trains, display.is_animating(trains))
+                now = now + scheduler.frame_period if due is None else due
+            counts[mode] = frames
+
+        print(f"  {label}:")
+        for mode, frames in counts.items():
+            busy = frames * render / duration
+            print(f"    {mode + ':':<15} {frames / duration:8.2f} FPS, "
+                  f"~{busy:.2%} busy rendering, {1 - busy:.2%} idle")
+        print(f"    Frames saved:   {1 - counts['Adaptive'] / counts['Fixed']:8.1%}")
+
+
+def bench_frame_pacing(seconds=2.0, load=0.02):
+    """Compare sleep-after-render pacing against monotonic deadlines under load"""
+    print("\n" + "="*70)
+    print(f"Frame pacing: sleep(1/FPS) vs. deadlines ({load * 1000:.0f} ms extra work per frame)")
+    print("="*70)
+
+    now = time.time()
+    trains = [
+        Train("R", "Bay Ridge-95 St", now + 300, "southbound"),
+        Train("N", "Coney Island-Stillwell Av", now + 600, "southbound"),
+    ]
+    display = DisplayManager(matrix=MockMatrix())
+    fps = Config.DISPLAY_FPS
+
+    def render(frame=None):
+        display.render_frame("southbound", trains, frame=frame)
+        busy_until = time.perf_counter() + load
+        while time.perf_counter() < busy_until:
+            pass  # Stand-in for a slower board
+
+    # Old loop: render, then sleep a full frame period
+    display.frame_count = 0
+    start = time.monotonic()
+    while time.monotonic() - start < seconds:
+        render()
+        time.sleep(1 / fps)
+    fixed_frames = display.frame_count
+    expected = int(seconds * fps)
+
+    scheduler = FrameScheduler(fps, Config.FRAME_DURATION, adaptive=False)
+    first = None
+    start = time.monotonic()
+    rendered = 0
+    while time.monotonic() - start < seconds:
+        frame = scheduler.start_frame()
+        first = frame if first is None else first
+        render_start = time.monotonic()
+        render(frame)
+        scheduler.end_frame(time.monotonic() - render_start)
+        rendered += 1
+        scheduler.wait(None)
+    report = scheduler.report()
+
+    def ms(percentiles):
+        return "/".join(f"{percentiles[p] * 1000:.1f}" for p in (50, 95, 99))
+
+    print(f"  sleep(1/FPS):     {fixed_frames / seconds:5.1f} FPS, animation at "
+          f"{fixed_frames / expected:.0%} speed")
+    print(f"  Deadlines:        {rendered / seconds:5.1f} FPS, animation at "
+          f"{(display.frame_count - first + 1) / expected:.0%} speed, "
+          f"{report['skipped']} frames skipped")
+    print(f"  p50/p95/p99 ms:   render {ms(report['render'])}, "
+          f"overshoot {ms(report['overshoot'])}, jitter {ms(report['jitter'])}")
+
+
+def simulate_polling(scheduler, period, lag, duration=3600, stall=None, fetch_time=0.3,
+                     headways=None):
+    """Poll a simulated feed on a virtual clock
+
+    The feed publishes every period seconds (header timestamp = publish
+    time) and each publish becomes available lag to lag + 0.5 s later.
+
+    Args:
+        scheduler: PollScheduler deciding when to poll
+        period: Publish period (seconds)
+        lag: Publish -> available delay (seconds)
+        duration: Simulated seconds
+        stall: Optional (start, end) offsets during which nothing publishes
+        fetch_time: Seconds each request takes
+        headways: Optional seconds between trains, cycled; the scheduler
+                  then gets the next arrival for proximity spacing
+
+    Returns:
+        Tuple of (requests, mean age of the data on the board in seconds,
+        mean age while the next train is at most 2 minutes away)
+    """
+    rng = random.Random(1)
+    start = 1_700_000_000.0
+    publishes = []
+    stamp = start + 7
+    while stamp < start + duration + period:
+        if not (stall and start + stall[0] <= stamp < start + stall[1]):
+            publishes.append((int(stamp), stamp + lag + rng.uniform(0, 0.5)))
+        stamp += period
+
+    arrivals = []
+    if headways:
+        arrival = start
+        while arrival < start + duration + max(headways):
+            arrival += headways[len(arrivals) % len(headways)]
+            arrivals.append(arrival)
+
+    def next_arrival(t):
+        return next((arrival for arrival in arrivals if arrival > t), None)
+
+    now = start
+    polls = []  # (time, feed timestamp on the server)
+    while now < start + duration:
+        available = [stamp for stamp, at in publishes if at <= now]
+        feed_timestamp = available[-1] if available else None
+        polls.append((now + fetch_time, feed_timestamp))
+        scheduler.record(feed_timestamp, now + fetch_time)
+        done = now + fetch_time
+        now = max(done, scheduler.next_poll(done, next_arrival(done)))
+
+    # Average age of what the board shows, sampled every 100 ms after warm-up
+    requests = len(polls)
+    ages = []
+    near_ages = []
+    shown = None
+    polls.reverse()
+    for step in range(600, duration * 10):
+        t = start + step / 10
+        while polls and polls[-1][0] <= t:
+            shown = polls.pop()[1] or shown
+        if shown:
+            ages.append(t - shown)
+            arrival = next_arrival(t)
+            if arrival is not None and arrival - t <= 120:
+                near_ages.append(t - shown)
+    near_age = sum(near_ages) / len(near_ages) if near_ages else None
+    return requests, sum(ages) / len(ages), near_age
+
+
+def bench_poll_scheduler():
+    """Compare fixed-interval polling against feed-aware polling (simulated hour)"""
+    print("\n" + "="*70)
+    print(f"Polling: every {Config.API_UPDATE_INTERVAL}s vs. just after each feed publish (simulated hour)")
+    print("="*70)
+
+    for label, period, stall in [("15 s feed", 15, None), ("30 s feed", 30, None),
+                                 ("15 s feed, 10 min stall", 15, (1200, 1800))]:
+        fixed = PollScheduler(interval=Config.API_UPDATE_INTERVAL, adaptive=False)
+        aware = PollScheduler(interval=Config.API_UPDATE_INTERVAL,
+                              retry_delay=Config.POLL_RETRY_DELAY,
+                              max_backoff=Config.POLL_MAX_BACKOFF)
+        fixed_polls, fixed_age, _ = simulate_polling(fixed, period, lag=2.0, stall=stall)
+        aware_polls, aware_age, _ = simulate_polling(aware, period, lag=2.0, stall=stall)
+
+        print(f"  {label}:")
+        print(f"    Fixed interval: {fixed_polls:5d} requests, data on board {fixed_age:5.1f}s old on average")
+        print(f"    Feed-aware:     {aware_polls:5d} requests, data on board {aware_age:5.1f}s old on average "
+              f"(learned period {aware.period:.1f}s, lag {aware.lag:.2f}s)")
+
+
+def simulate_outage(scheduler, breaker, outage, duration=1800, offset=0.0, fetch_time=0.3,
+                    period=15, lag=2.0):
+    """Poll a simulated feed that fails for a while, on a virtual clock
+
+    Args:
+        scheduler: PollScheduler, or None to poll every API_UPDATE_INTERVAL
+                   whatever happens
+        breaker: CircuitBreaker guarding the requests, or None
+        outage: (start, end) offsets during which every request fails
+        duration: Simulated seconds
+        offset: Seconds before the first poll
+        fetch_time: Seconds each request takes
+        period: Feed publish period (seconds)
+        lag: Publish -> available delay (seconds)
+
+    Returns:
+        Tuple of (request times during the outage, seconds from the end of
+        the outage to the first good fetch)
+    """
+    start = 1_700_000_000.0
+    now = start + offset
+    attempts = []
+    recovered = None
+    while now < start + duration:
+        done = now + fetch_time
+        if breaker is None or breaker.allow(now):
+            if outage[0] <= now - start < outage[1]:
+                attempts.append(now - start)
+                feed_timestamp = None
+                if breaker:
+                    breaker.record_failure(done)
+            else:
+                feed_timestamp = int(start + (now - start - lag) // period * period)
+                if breaker:
+                    breaker.record_success()
+                if recovered is None and now - start >= outage[1]:
+                    recovered = done - start - outage[1]
+            if scheduler:
+                scheduler.record(feed_timestamp, done)
+
+        if scheduler is None:
+            due = now + Config.API_UPDATE_INTERVAL
+        else:
+            due = scheduler.next_poll(done)
+        if breaker and breaker.retry_at() is not None:
+            due = max(due, breaker.retry_at())
+        now = max(done, due)
+    return attempts, recovered
+
+
+def bench_feed_outage(displays=50):
+    """Compare fixed-interval retries against jittered backoff and a circuit breaker"""
+    print("\n" + "="*70)
+    print(f"Feed outage: {displays} displays, feed down for 10 min "
+          f"(board keeps its last data for {Config.STALE_DATA_LIMIT}s)")
+    print("="*70)
+
+    outage = (600, 1200)
+    for mode in ("Fixed interval", "Backoff + breaker"):
+        rng = random.Random(7)
+        attempts = []
+        recoveries = []
+        for _ in range(displays):
+            scheduler = breaker = None
+            if mode != "Fixed interval":
+                scheduler = PollScheduler(interval=Config.API_UPDATE_INTERVAL,
+                                          retry_delay=Config.POLL_RETRY_DELAY,
+                                          max_backoff=Config.POLL_MAX_BACKOFF,
+                                          rng=rng)
+                breaker = CircuitBreaker("feed", Config.BREAKER_FAILURE_THRESHOLD,
+                                         Config.BREAKER_RESET_TIMEOUT,
+                                         max_reset_timeout=4 * Config.BREAKER_RESET_TIMEOUT,
+                                         rng=rng)
+            times, recovered = simulate_outage(scheduler, breaker, outage,
+                                               offset=rng.uniform(0, Config.API_UPDATE_INTERVAL))
+            attempts.extend(times)
+            recoveries.append(recovered)
+
+        # Peak load once retries are under way (the first failures line up
+        # with the feed publish every display polls on)
+        per_second = {}
+        for t in attempts:
+            if t >= outage[0] + 60:
+                per_second[int(t)] = per_second.get(int(t), 0) + 1
+        print(f"  {mode}:")
+        print(f"    Failed requests:  {len(attempts) / displays:5.1f} per display, "
+              f"fleet peak {max(per_second.values())}/s while retrying")
+        print(f"    Back after outage: {sum(recoveries) / len(recoveries):5.1f}s on average, "
+              f"{max(recoveries):5.1f}s worst")
+
+
+def bench_proximity_polling():
+    """Compare polling every publish against spacing polls by the next arrival"""
+    print("\n" + "="*70)
+    print(f"Polling: every publish vs. by next arrival "
+          f"({Config.POLL_MIN_INTERVAL}-{Config.POLL_MAX_INTERVAL}s, simulated hour, 15 s feed)")
+    print("="*70)
+
+    for label, headways in [("Trains every 4-8 min", [240, 480, 360]),
+                            ("Trains every 12-20 min", [720, 1200])]:
+        results = {}
+        for mode, min_interval in [("Every publish", None), ("By next arrival", Config.POLL_MIN_INTERVAL)]:
+            scheduler = PollScheduler(interval=Config.API_UPDATE_INTERVAL,
+                                      retry_delay=Config.POLL_RETRY_DELAY,
+                                      max_backoff=Config.POLL_MAX_BACKOFF,
+                                      min_interval=min_interval,
+                                      max_interval=Config.POLL_MAX_INTERVAL,
+                                      proximity_factor=Config.POLL_PROXIMITY_FACTOR)
+            results[mode] = simulate_polling(scheduler, 15, lag=2.0, headways=headways)
+
+        print(f"  {label}:")
+        for mode, (polls, age, near_age) in results.items():
+            print(f"    {mode + ':':<17}{polls:5d} requests ({polls / 60:4.1f}/min), data "
+                  f"{age:5.1f}s old on average, {near_age:5.1f}s with a train <= 2 min out")
+        saved = 1 - results["By next arrival"][0] / results["Every publish"][0]
+        print(f"    Requests saved:  {saved:5.0%}")
+
+
+def bench_arrival_snapshot(polls=60):
+    """Count display invalidations per fetch vs. per arrivals change"""
+    print("\n" + "="*70)
+    print(f"Arrival snapshots: {polls} feed updates moving a few trips anywhere on the line")
+    print("="*70)
+
+    feed = build_synthetic_feed(300)
+    client = MTAClient(max_trains=Config.MAX_TRAINS)
+    snapshot = ArrivalSnapshot.empty().publish(client.parse_feed(feed, "R35", ["R", "N", "D"]))
+    versions = 0
+    publish_times = []
+
+    for poll in range(polls):
+        # Each poll decodes a new FeedMessage; a few trips moved since the last
+        previous, feed = feed, gtfs_realtime_pb2.FeedMessage()
+        feed.CopyFrom(previous)
+        for offset in range(0, len(feed.entity), 97):
+            entity = feed.entity[(poll * 13 + offset) % len(feed.entity)]
+            for stop_time in entity.trip_update.stop_time_update:
+                stop_time.arrival.time += 30
+        feed.header.timestamp += 30
+
+        train_data = client.parse_feed(feed, "R35", ["R", "N", "D"])
+        start = time.perf_counter()
+        published = snapshot.publish(train_data, feed.header.timestamp)
+        publish_times.append(time.perf_counter() - start)
+        versions += published.version != snapshot.version
+        snapshot = published
+
+    print(f"  Snapshots:        {polls:8d} published")
+    print(f"  New versions:     {versions:8d} (display re-rendered)")
+    print(f"  Publish:          {sum(publish_times) / polls * 1e6:8.1f} us/snapshot")
+    print(f"  Invalidations:    {1 - versions / polls:8.0%} avoided")
+
+
+def bench_frame_pipeline(seconds=3.0, spike=0.05, refresh=0.5):
+    """Compare rendering on the display loop against the render thread under spikes"""
+    print("\n" + "="*70)
+    print(f"Frame delivery: render in the loop vs. render thread "
+          f"({spike * 1000:.0f} ms spikes, data every {refresh:.1f} s)")
+    print("="*70)
+
+    now = time.time()
+    trains = [
+        Train("R", "Bay Ridge-95 St", now + 300, "southbound"),
+        Train("N", "Coney Island-Stillwell Av", now + 600, "southbound"),
+    ]
+    fps = Config.DISPLAY_FPS
+
+    def spiky(display, refreshed):
+        compose = display.compose_frame
+        count = [0]
+
+        def compose_frame(*args, **kwargs):
+            count[0] += 1
+            busy = spike if count[0] % 15 == 0 else 0.0
+            if refreshed.is_set():
+                refreshed.clear()
+                busy += spike  # New data rebuilds layers and sprites
+            busy_until = time.perf_counter() + busy
+            while time.perf_counter() < busy_until:
+                pass  # Stand-in for a slow frame
+            return compose(*args, **kwargs)
+
+        display.compose_frame = compose_frame
+
+    def recorded(display):
+        shown = []
+        present = display.present_frame
+
+        def present_frame(img, direction, now=None):
+            shown.append(time.monotonic())
+            present(img, direction, now)
+
+        display.present_frame = present_frame
+        return shown
+
+    def data_updates(stop, refreshed, notify, snapshot):
+        shift = 0
+        while not stop.wait(refresh):
+            shift += 1  # Predictions moved: a new snapshot version
+            moved = [
+                Train(train.route_id, train.destination, train.arrival_time + shift, "southbound")
+                for train in trains
+            ]
+            snapshot[0] = snapshot[0].publish({"northbound": moved, "southbound": moved})
+            refreshed.set()
+            notify()
+
+    results = {}
+    for label in ("In loop", "Render thread"):
+        display = DisplayManager(matrix=MockMatrix())
+        display.skip_unchanged = False
+        scheduler = FrameScheduler(fps, Config.FRAME_DURATION)
+        refreshed = threading.Event()
+        stop = threading.Event()
+        spiky(display, refreshed)
+        shown = recorded(display)
+        # Same trains both ways, so the board slides whichever way it faces
+        snapshot = [ArrivalSnapshot.empty().publish({"northbound": trains, "southbound": trains})]
+
+        if label == "In loop":
+            notify = scheduler.notify_data
+        else:
+            pipeline = FramePipeline(display, scheduler, lambda: snapshot[0],
+                                     depth=Config.RENDER_QUEUE_SIZE)
+            notify = pipeline.notify_data
+        updater = threading.Thread(target=data_updates, args=(stop, refreshed, notify, snapshot),
+                                   daemon=True)
+        updater.start()
+
+        start = time.monotonic()
+        if label == "In loop":
+            while time.monotonic() - start < seconds:
+                frame = scheduler.start_frame()
+                render_start = time.monotonic()
+                shown_trains = snapshot[0].southbound
+                display.render_frame("southbound", shown_trains, frame=frame)
+                scheduler.end_frame(time.monotonic() - render_start)
+                scheduler.wait(scheduler.next_frame_time(time.time(), shown_trains,
+                                                         display.is_animating(shown_trains)))
+        else:
+            pipeline.start()
+            while time.monotonic() - start < seconds:
+                pipeline.show_next(timeout=0.1)
+            pipeline.stop()
+        stop.set()
+        updater.join()
+
+        gaps = [later - earlier for earlier, later in zip(shown, shown[1:])]
+        stalls = sum(1 for gap in gaps if gap > 1.5 / fps)
+        results[label] = (len(shown) / seconds, stalls, max(gaps), scheduler.report())
+
+    def ms(percentiles):
+        return "/".join(f"{percentiles[p] * 1000:.1f}" for p in (50, 95, 99))
+
+    for label, (rate, stalls, worst, report) in results.items():
+        print(f"  {label + ':':<18}{rate:5.1f} FPS, {stalls} stalls > 1.5 frames, "
+              f"longest gap {worst * 1000:.0f} ms")
+        print(f"  {'':<18}jitter p50/p95/p99 ms {ms(report['jitter'])}, "
+              f"render {ms(report['render'])}, {report['skipped']} skipped")
+
+
+def time_to_first_frame(snapshot_path, feed, fetch_time):
+    """Start the application and time its first frame with trains on it
+
+    Args:
+        snapshot_path: SNAPSHOT_PATH for the run
+        feed: FeedMessage every fetch returns
+        fetch_time: Seconds each simulated fetch takes
+
+    Returns:
+        Tuple of (seconds from run() to the first frame with trains,
+        whether that frame was marked stale)
+    """
+    # Imported here: main configures logging at import time
+    from main import MTATrainDisplay
+
+    app = MTATrainDisplay()
+    app.config = type("BenchConfig", (Config,), {"SNAPSHOT_PATH": snapshot_path})
+
+    def get_feeds(paths):
+        time.sleep(fetch_time)
+        fetched = gtfs_realtime_pb2.FeedMessage()
+        fetched.CopyFrom(feed)
+        return fetched
+    app.mta_client.get_feeds = get_feeds
+
+    display = app.display_manager
+    compose_frame = display.compose_frame
+    present_frame = display.present_frame
+    with_trains = {}
+    first = []
+
+    def compose(direction, trains, now=None, frame=None, stale=False):
+        img = compose_frame(direction, trains, now=now, frame=frame, stale=stale)
+        if trains and img is not None:
+            with_trains[id(img)] = stale
+        return img
+
+    def present(img, direction, now=None):
+        present_frame(img, direction, now)
+        if not first and id(img) in with_trains:
+            first.append((time.perf_counter() - start, with_trains[id(img)]))
+            app.running = False
+
+    display.compose_frame = compose
+    display.present_frame = present
+    start = time.perf_counter()
+    app.run()
+    return first[0] if first else (None, None)
+
+
+def bench_time_to_first_frame(fetch_time=0.5):
+    """Compare time to the first frame with countdowns with and without a saved snapshot"""
+    print("\n" + "="*70)
+    print(f"Time to first frame with trains (simulated {fetch_time * 1000:.0f} ms feed fetch)")
+    print("="*70)
+
+    feed = build_synthetic_feed(300)
+    client = MTAClient(max_trains=Config.MAX_TRAINS)
+    snapshot = ArrivalSnapshot.empty().publish(
+        client.parse_feed(feed, Config.STOP_ID, Config.ROUTE_IDS), feed.header.timestamp
+    )
+
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = os.path.join(tmp, "arrivals.snapshot")
+        snapshot.save(saved)
+        start = time.perf_counter()
+        ArrivalSnapshot.load(saved)
+        load = time.perf_counter() - start
+
+        results = {}
+        for label, path in [("No saved snapshot", os.path.join(tmp, "missing.snapshot")),
+                            ("Restored snapshot", saved)]:
+            elapsed, stale = time_to_first_frame(path, feed, fetch_time)
+            results[label] = elapsed
+            print(f"  {label + ':':<19}{elapsed * 1000:8.1f} ms"
+                  + (" (header grayed until the first fetch)" if stale else ""))
+        print(f"  Snapshot file:     {os.path.getsize(saved)} bytes, loaded in {load * 1000:.2f} ms")
+        print(f"  Speedup:          {results['No saved snapshot'] / results['Restored snapshot']:8.1f}x")
+        time.sleep(fetch_time + 0.1)  # Let the last run's update thread finish its fetch
+
+
+def bench_frame_sinks():
+    """Compare a PNG per frame against the in-memory and rate-limited sinks"""
+    print("\n" + "="*70)
+    print("Test mode output: PNG per frame vs. ring buffer + snapshots (10 s at 30 FPS)")
+    print("="*70)
+
+    now = time.time()
+    trains = [
+        Train("R", "Bay Ridge-95 St", now + 300, "southbound"),
+        Train("N", "Coney Island-Stillwell Av", now + 600, "southbound"),
+    ]
+    frames = 10 * Config.DISPLAY_FPS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        size = (DisplayManager.DISPLAY_WIDTH, DisplayManager.DISPLAY_HEIGHT)
+        png_per_frame = [SnapshotSink(tmp, min_interval=0, prefix="every")]
+        buffered = [RingBufferSink(frames, size),
+                    SnapshotSink(tmp, min_interval=DisplayManager.SNAPSHOT_INTERVAL, prefix="snap")]
+        results = {}
+
+        for label, sinks in [("PNG per frame", png_per_frame), ("Ring + snapshots", buffered)]:
+            display = DisplayManager(matrix=MockMatrix(), sinks=sinks)
+            display.skip_unchanged = False
+
+            def run():
+                for i in range(frames):
+                    display.render_frame("southbound", trains, now=now + i / Config.DISPLAY_FPS)
+
+            results[label] = time_call(run, repeat=3) / frames
+            written = sum(getattr(sink, "written", 0) for sink in sinks if isinstance(sink, SnapshotSink))
+            print(f"  {label + ':':<18}{results[label] * 1000:8.3f} ms/frame, "
+                  f"{written} PNG writes")
+
+        gif = os.path.join(tmp, "frames.gif")
+        start = time.perf_counter()
+        count = buffered[0].dump_animation(gif)
+        dump = time.perf_counter() - start
+        print(f"  GIF dump:         {dump * 1000:8.1f} ms for {count} frames "
+              f"({os.path.getsize(gif) // 1024} KiB)")
+        print(f"  Speedup:          {results['PNG per frame'] / results['Ring + snapshots']:8.1f}x")
+
+
+def bench_bitmap_font():
+    """Compare rasterizing text with FreeType against bitmap glyph writes"""
+    print("\n" + "="*70)
+    print("Text sprites: TrueType rasterization vs. bitmap font glyphs")
+    print("="*70)
+
+    display = DisplayManager(matrix=MockMatrix())
+    texts = ["Bay Ridge-95 St", "Coney Island-Stillwell Av", "Whitehall St", "SOUTHBOUND", "12m"]
+    font = display.fonts["dest"]
+
+    # No BDF fonts ship with the repo: threshold the TrueType font into one
+    # and round-trip it through a BDF file, as a panel would load it
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "dest.bdf")
+        BitmapFont.from_font(font, [chr(code) for code in range(32, 127)]).save_bdf(path)
+        start = time.perf_counter()
+        bitmap = BitmapFont.load(path)
+        load = time.perf_counter() - start
+
+    def truetype():
+        for text in texts:
+            bbox = font.getbbox(text)
+            mask = Image.new("L", (bbox[2] - bbox[0], bbox[3] - bbox[1]), 0)
+            ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), text, font=font, fill=255)
+
+    def glyphs():
+        for text in texts:
+            bitmap.render(text)
+
+    before = time_call(truetype, repeat=200)
+    after = time_call(glyphs, repeat=200)
+    lit = len(set(bitmap.render(texts[0])[0].tobytes()))
+
+    print(f"  BDF load:         {load * 1000:8.3f} ms ({len(bitmap.glyphs)} glyphs)")
+    print(f"  TrueType:         {before * 1e6 / len(texts):8.1f} us/string")
+    print(f"  Bitmap glyphs:    {after * 1e6 / len(texts):8.1f} us/string ({lit} mask levels)")
+    print(f"  Speedup:          {before / after:8.1f}x (cache misses only; hits cost the same)")
+
+
+def main():
+    print("""
+╔════════════════════════════════════════════════╗
+║   MTA Train Display - Benchmarks               ║
+╚════════════════════════════════════════════════╝
+    """)
+
+    bench_parse_feed()
+    bench_feed_index()
+    bench_incremental_index()
+    bench_top_k()
+    bench_arrival_table()
+    bench_static_gtfs()
+    bench_trip_headsigns()
+    bench_display_blit()
+    bench_frame_diff()
+    bench_text_cache()
+    bench_bitmap_font()
+    bench_layers()
+    bench_slide()
+    bench_frame_scheduler()
+    bench_frame_pacing()
+    bench_arrival_snapshot()
+    bench_poll_scheduler()
+    bench_proximity_polling()
+    bench_feed_outage()
+    bench_frame_pipeline()
+    bench_time_to_first_frame()
+    bench_frame_sinks()
+
+
+if __name__ == "__main__":
+    main()
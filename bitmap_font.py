@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+Bitmap (pixel) font backend
+Loads BDF/PCF fonts, like the ones shipped in rpi-rgb-led-matrix/fonts,
+into precomputed glyph bitmaps and renders text by writing pixels straight
+into a byte buffer - no FreeType and no antialiasing, so every lit pixel
+maps to exactly one LED
+"""
+
+import gzip
+import logging
+from collections import namedtuple
+
+from PIL import Image, ImageDraw
+
+logger = logging.getLogger(__name__)
+
+# One glyph: pen advance, bitmap size, offset of the bitmap's bottom-left
+# corner from the pen position on the baseline (BDF BBX convention), and
+# the lit pixels as (x, y) offsets from the bitmap's top-left corner
+Glyph = namedtuple('Glyph', 'advance width height x_offset y_offset pixels')
+
+
+class BitmapFont:
+    """Pixel font with precomputed glyphs
+
+    Text positions follow PIL's default anchor: y = 0 is the top of the
+    font's ascent, so it can stand in for an ImageFont in the display.
+    """
+
+    def __init__(self, glyphs, ascent, descent, default_char="?"):
+        """Initialize from prepared glyphs (use load / from_font)
+
+        Args:
+            glyphs: Dict of character -> Glyph
+            ascent: Pixels above the baseline
+            descent: Pixels below the baseline
+            default_char: Drawn for characters the font lacks
+        """
+        self.glyphs = glyphs
+        self.ascent = ascent
+        self.descent = descent
+        self.default_glyph = glyphs.get(default_char)
+
+    @classmethod
+    def load(cls, path):
+        """Load a BDF or PCF font file (.pcf.gz too)
+
+        Args:
+            path: Font file path
+
+        Returns:
+            BitmapFont
+        """
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rb") as f:
+            data = f.read()
+
+        if data[:4] == b"\x01fcp":
+            return cls._from_pcf(data)
+        return cls._from_bdf(data.decode("latin-1"))
+
+    @classmethod
+    def _from_bdf(cls, text):
+        """Parse BDF source
+
+        Args:
+            text: Contents of a .bdf file
+
+        Returns:
+            BitmapFont
+        """
+        glyphs = {}
+        ascent = descent = None
+        bbox_ascent = bbox_descent = 0
+        lines = iter(text.splitlines())
+
+        for line in lines:
+            fields = line.split()
+            if not fields:
+                continue
+            keyword = fields[0]
+
+            if keyword == "FONTBOUNDINGBOX":
+                height, y_offset = int(fields[2]), int(fields[4])
+                bbox_ascent, bbox_descent = height + y_offset, -y_offset
+            elif keyword == "FONT_ASCENT":
+                ascent = int(fields[1])
+            elif keyword == "FONT_DESCENT":
+                descent = int(fields[1])
+            elif keyword == "STARTCHAR":
+                encoding, advance, bbx, rows = None, 0, None, []
+                for line in lines:
+                    fields = line.split()
+                    if not fields:
+                        continue
+                    if fields[0] == "ENCODING":
+                        encoding = int(fields[1])
+                    elif fields[0] == "DWIDTH":
+                        advance = int(fields[1])
+                    elif fields[0] == "BBX":
+                        bbx = [int(value) for value in fields[1:5]]
+                    elif fields[0] == "BITMAP":
+                        for line in lines:
+                            if line.strip() == "ENDCHAR":
+                                break
+                            rows.append(line.strip())
+                        break
+
+                if encoding is None or encoding < 0 or bbx is None:
+                    continue
+                width, height, x_offset, y_offset = bbx
+                pixels = []
+                for y, row in enumerate(rows[:height]):
+                    bits = int(row, 16) if row else 0
+                    row_bits = len(row) * 4
+                    for x in range(width):
+                        if bits >> (row_bits - 1 - x) & 1:
+                            pixels.append((x, y))
+                glyphs[chr(encoding)] = Glyph(advance, width, height, x_offset, y_offset, tuple(pixels))
+
+        if ascent is None:
+            ascent = bbox_ascent
+        if descent is None:
+            descent = bbox_descent
+        return cls(glyphs, ascent, descent)
+
+    @classmethod
+    def _from_pcf(cls, data):
+        """Parse a PCF font with Pillow's reader
+
+        Args:
+            data: Contents of a .pcf file
+
+        Returns:
+            BitmapFont
+        """
+        import io
+        from PIL import PcfFontFile
+
+        pcf = PcfFontFile.PcfFontFile(io.BytesIO(data))
+        glyphs = {}
+        ascent = descent = 0
+        for code, glyph in enumerate(pcf.glyph):
+            if not glyph:
+                continue
+            (advance, _), (left, top, right, bottom), src, bitmap = glyph
+            width, height = right - left, bottom - top
+            pixels = tuple(
+                (x, y) for y in range(height) for x in range(width)
+                if bitmap.getpixel((x, y))
+            )
+            glyphs[chr(code)] = Glyph(advance, width, height, left, -bottom, pixels)
+            ascent, descent = max(ascent, -top), max(descent, bottom)
+        return cls(glyphs, ascent, descent)
+
+    @classmethod
+    def from_font(cls, font, chars, threshold=128):
+        """Build a bitmap font by thresholding a PIL font's glyphs
+
+        Turns a TrueType font into crisp 1-bit glyphs for characters in
+        chars, for panels where no BDF font is installed.
+
+        Args:
+            font: PIL ImageFont
+            chars: Characters to include
+            threshold: Coverage (0-255) at which a pixel is lit
+
+        Returns:
+            BitmapFont
+        """
+        ascent, descent = font.getmetrics() if hasattr(font, "getmetrics") else (font.getbbox("A")[3], 0)
+        glyphs = {}
+        for char in set(chars):
+            advance = int(round(font.getlength(char)))
+            left, top, right, bottom = font.getbbox(char)
+            width, height = max(0, right - left), max(0, bottom - top)
+            pixels = ()
+            if width and height:
+                mask = Image.new("L", (width, height), 0)
+                ImageDraw.Draw(mask).text((-left, -top), char, font=font, fill=255)
+                data = mask.tobytes()
+                pixels = tuple(
+                    (i % width, i // width) for i, value in enumerate(data) if value >= threshold
+                )
+            # Bitmap bottom relative to the baseline (ascent - bottom, y up)
+            glyphs[char] = Glyph(advance, width, height, left, ascent - bottom, pixels)
+        return cls(glyphs, ascent, descent)
+
+    def save_bdf(self, path, name="bitmap"):
+        """Write the font as a BDF file
+
+        Args:
+            path: Output path
+            name: FONT name
+        """
+        chars = sorted(self.glyphs, key=ord)
+        lines = [
+            "STARTFONT 2.1",
+            f"FONT {name}",
+            f"SIZE {self.ascent + self.descent} 75 75",
+            f"FONTBOUNDINGBOX {self.line_width()} {self.ascent + self.descent} 0 {-self.descent}",
+            "STARTPROPERTIES 2",
+            f"FONT_ASCENT {self.ascent}",
+            f"FONT_DESCENT {self.descent}",
+            "ENDPROPERTIES",
+            f"CHARS {len(chars)}",
+        ]
+        for char in chars:
+            glyph = self.glyphs[char]
+            row_bytes = max(1, (glyph.width + 7) // 8)
+            rows = [0] * glyph.height
+            for x, y in glyph.pixels:
+                rows[y] |= 1 << (row_bytes * 8 - 1 - x)
+            lines += [
+                f"STARTCHAR U+{ord(char):04X}",
+                f"ENCODING {ord(char)}",
+                f"SWIDTH {glyph.advance * 1000 // max(1, self.ascent + self.descent)} 0",
+                f"DWIDTH {glyph.advance} 0",
+                f"BBX {glyph.width} {glyph.height} {glyph.x_offset} {glyph.y_offset}",
+                "BITMAP",
+            ]
+            lines += [f"{row:0{row_bytes * 2}X}" for row in rows]
+            lines.append("ENDCHAR")
+        lines.append("ENDFONT")
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def line_width(self):
+        """Widest glyph advance"""
+        return max((glyph.advance for glyph in self.glyphs.values()), default=0)
+
+    def _layout(self, text):
+        """Position glyphs along the baseline
+
+        Yields:
+            (glyph, left, top) with left/top of the glyph bitmap relative
+            to the text origin
+        """
+        pen = 0
+        for char in text:
+            glyph = self.glyphs.get(char, self.default_glyph)
+            if glyph is None:
+                continue
+            top = self.ascent - glyph.y_offset - glyph.height
+            yield glyph, pen + glyph.x_offset, top
+            pen += glyph.advance
+
+    def getbbox(self, text):
+        """Bounding box of the lit pixels of text drawn at (0, 0)
+
+        Returns:
+            (left, top, right, bottom), like ImageFont.getbbox
+        """
+        left = top = right = bottom = None
+        for glyph, x, y in self._layout(text):
+            if not glyph.pixels:
+                continue
+            x0 = x + min(px for px, py in glyph.pixels)
+            x1 = x + max(px for px, py in glyph.pixels) + 1
+            y0 = y + min(py for px, py in glyph.pixels)
+            y1 = y + max(py for px, py in glyph.pixels) + 1
+            left = x0 if left is None else min(left, x0)
+            top = y0 if top is None else min(top, y0)
+            right = x1 if right is None else max(right, x1)
+            bottom = y1 if bottom is None else max(bottom, y1)
+        if left is None:
+            return (0, 0, 0, 0)
+        return (left, top, right, bottom)
+
+    def getlength(self, text):
+        """Pen advance of text in pixels"""
+        return sum(glyph.advance for glyph, x, y in self._layout(text))
+
+    def render(self, text):
+        """Render text into an 'L' mask cropped to its lit pixels
+
+        Writes each glyph's precomputed pixels straight into a byte buffer.
+
+        Args:
+            text: String to render
+
+        Returns:
+            Tuple of (mask image, bbox), bbox as returned by getbbox()
+        """
+        bbox = self.getbbox(text)
+        width = max(1, bbox[2] - bbox[0])
+        height = max(1, bbox[3] - bbox[1])
+        buffer = bytearray(width * height)
+
+        for glyph, x, y in self._layout(text):
+            x -= bbox[0]
+            y -= bbox[1]
+            for px, py in glyph.pixels:
+                buffer[(y + py) * width + x + px] = 255
+
+        return Image.frombytes("L", (width, height), bytes(buffer)), bbox
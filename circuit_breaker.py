@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Circuit breaker and retry backoff for feed requests
+After a few consecutive failures the breaker opens and requests to that
+feed are skipped until a reset timeout passes; then one trial request is
+let through (half open) and either closes the breaker or reopens it with
+a longer timeout. Retry delays and reset timeouts grow exponentially with
+random jitter, so a fleet of displays polling on the same feed publishes
+does not retry in lockstep.
+"""
+
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_delay(attempt, base=1.0, cap=60.0, rng=random):
+    """Get a jittered exponential retry delay
+
+    Half of the delay is fixed and half random ("equal jitter"), so retries
+    spread out but never fire immediately.
+
+    Args:
+        attempt: Retry number, 0 for the first retry
+        base: Delay of the first retry before jitter (seconds)
+        cap: Longest delay (seconds)
+        rng: Random source (random module or a random.Random)
+
+    Returns:
+        Delay in seconds, between half and all of min(cap, base * 2**attempt)
+    """
+    delay = min(cap, base * 2 ** min(attempt, 32))
+    return delay / 2 + rng.uniform(0, delay / 2)
+
+
+class CircuitBreaker:
+    """Stops requests to a failing endpoint for a while"""
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30, max_reset_timeout=120, rng=None):
+        """Initialize breaker
+
+        Args:
+            name: Endpoint name for logging
+            failure_threshold: Consecutive failures that open the breaker
+            reset_timeout: Seconds open before a trial request (half fixed,
+                           half random)
+            max_reset_timeout: Longest timeout after repeated failed trials
+            rng: Random source for timeout jitter (default: random module)
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.rng = rng or random
+
+        self.state = self.CLOSED
+        self.failures = 0      # Consecutive failures
+        self.timeout = reset_timeout  # Before jitter
+        self.opened_at = None  # Unix time the breaker last opened
+        self.reopen_at = None  # Unix time the next trial is allowed
+
+        self.stats = {'successes': 0, 'failures': 0, 'rejected': 0, 'opened': 0}
+
+    def retry_at(self):
+        """Unix time requests are let through again (None while closed)"""
+        if self.state == self.CLOSED:
+            return None
+        return self.reopen_at
+
+    def allow(self, now=None):
+        """Check whether a request may be sent
+
+        Moves an open breaker to half open once its timeout has passed and
+        lets exactly that one trial request through.
+
+        Args:
+            now: Unix timestamp (default: time.time())
+
+        Returns:
+            True if the request may go ahead
+        """
+        if self.state == self.CLOSED:
+            return True
+
+        now = now or time.time()
+        if self.state == self.OPEN and now >= self.retry_at():
+            self.state = self.HALF_OPEN
+            logger.info(f"Circuit {self.name} half open, sending a trial request")
+            return True
+
+        self.stats['rejected'] += 1
+        return False
+
+    def record_success(self):
+        """Record a successful request"""
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit {self.name} closed, feed is back")
+        self.state = self.CLOSED
+        self.failures = 0
+        self.timeout = self.reset_timeout
+        self.stats['successes'] += 1
+
+    def record_failure(self, now=None):
+        """Record a failed request, opening the breaker if needed
+
+        Args:
+            now: Unix timestamp (default: time.time())
+        """
+        now = now or time.time()
+        self.failures += 1
+        self.stats['failures'] += 1
+
+        if self.state == self.HALF_OPEN:
+            # Trial failed: stay away for longer
+            self.timeout = min(self.timeout * 2, self.max_reset_timeout)
+            self._open(now)
+        elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+            self._open(now)
+
+    def _open(self, now):
+        self.state = self.OPEN
+        self.opened_at = now
+        self.reopen_at = now + self.timeout / 2 + self.rng.uniform(0, self.timeout / 2)
+        self.stats['opened'] += 1
+        logger.warning(
+            f"Circuit {self.name} open after {self.failures} failures, "
+            f"retrying in {self.reopen_at - now:.0f}s"
+        )
@@ -14,7 +14,10 @@ class Config:
     
     # Feed path for N, Q, R, W, B, D lines serving Brooklyn
     FEED_PATH = "gtfs-nqrw"
-    """Feed path - adjust based on which lines you want to track"""
+    """Default feed path - used when ROUTE_IDS is None or for routes
+    missing from MTAClient.ROUTE_FEEDS. Feeds for the configured routes
+    are picked automatically (e.g. D trains come from gtfs-bdfm)
+    """
     
     # Stop configuration - supports multiple routes
     STOP_ID = "R35"
@@ -46,15 +49,92 @@ class Config:
     """Frame duration (seconds) to show each direction"""
     
     DISPLAY_FPS = 30
-    """Display refresh rate (frames per second)"""
+    """Display refresh rate (frames per second) while text is sliding"""
+    
+    ADAPTIVE_FRAME_RATE = True
+    """Only redraw when something changes (countdown minute, direction, new
+    data) unless a destination is sliding; False renders at DISPLAY_FPS"""
+    
+    FRAME_STATS_INTERVAL = 60
+    """How often to log achieved frame rate and idle time (seconds)"""
+    
+    RENDER_PIPELINE = True
+    """Render frames ahead on a separate thread and blit them on deadline;
+    False renders and displays each frame on the main thread"""
+    
+    RENDER_QUEUE_SIZE = 3
+    """Most frames the render thread works ahead (frames)"""
     
     # API Settings
     API_UPDATE_INTERVAL = 10
-    """How often to fetch new train data (seconds)"""
+    """How often to fetch new train data (seconds); with FEED_AWARE_POLLING
+    only until the feed's publish period has been learned"""
+    
+    FEED_AWARE_POLLING = True
+    """Poll just after each expected feed publish, learned from the feed
+    header timestamps; False polls every API_UPDATE_INTERVAL"""
+    
+    POLL_RETRY_DELAY = 1.0
+    """First retry delay when an expected publish has not shown up or a
+    request failed (seconds, doubled on each further empty or failed poll;
+    failed polls get random jitter)"""
+    
+    POLL_MAX_BACKOFF = 60
+    """Longest delay between polls of a stalled or failing feed (seconds)"""
+    
+    BREAKER_FAILURE_THRESHOLD = 3
+    """Consecutive failed requests after which a feed is left alone for
+    BREAKER_RESET_TIMEOUT"""
+    
+    BREAKER_RESET_TIMEOUT = 30
+    """Seconds before a trial request to a failing feed (jittered, doubled
+    after each failed trial up to 4x)"""
+    
+    STALE_DATA_LIMIT = 300
+    """Keep showing the last good arrivals while the feed is failing for at
+    most this long (seconds), then clear the board until it recovers"""
+    
+    SNAPSHOT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "arrivals.snapshot")
+    """File the last arrivals are saved to and restored from at startup
+    (None = off); restored arrivals show a gray header until the feed answers"""
+    
+    SNAPSHOT_SAVE_INTERVAL = 60
+    """Shortest time between snapshot file writes (seconds); the latest
+    arrivals are also saved on shutdown"""
+    
+    PROXIMITY_POLLING = True
+    """Space polls by how soon the next train arrives: every publish when
+    it is close, less often when it is far away"""
+    
+    POLL_MIN_INTERVAL = 10
+    """Shortest spacing between polls with a train about to arrive (seconds)"""
+    
+    POLL_MAX_INTERVAL = 60
+    """Longest spacing between polls, with no train or a distant one (seconds)"""
+    
+    POLL_PROXIMITY_FACTOR = 0.1
+    """Poll spacing as a fraction of the time until the next arrival,
+    clamped to POLL_MIN_INTERVAL..POLL_MAX_INTERVAL"""
+    
+    POLL_STATS_INTERVAL = 300
+    """How often to log request counts and data age (seconds)"""
     
     API_TIMEOUT = 10
     """Request timeout (seconds)"""
     
+    MAX_TRAINS = 5
+    """Upcoming trains kept per direction after each update"""
+    
+    STALE_ARRIVAL_SECONDS = 30
+    """Drop trains whose predicted arrival passed more than this many seconds ago"""
+    
+    # Static GTFS
+    STATIC_TRIPS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "trips.txt")
+    """Static GTFS trips.txt used for destination headsigns"""
+    
+    STATIC_CACHE_PATH = None
+    """Binary cache of trips.txt (None = trips.cache next to trips.txt)"""
+    
     # Logging
     LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
     """Logging level - DEBUG, INFO, WARNING, ERROR"""
@@ -2,21 +2,27 @@
 
 """
 LED Display Manager - OPENSANS TRUETYPE FONT WITH SLIDING DESTINATIONS
-Handles rendering to 32x64 RGB LED matrix using SetPixel() method
+Handles rendering to 32x64 RGB LED matrix, double-buffered through an
+offscreen frame canvas (SetPixel() on libraries without one)
 
 FEATURES:
-- OpenSans TrueType font rendering
+- OpenSans TrueType font rendering, or BDF/PCF bitmap fonts
 - Sliding destination text animation with proper clipping
 - Tunable font sizes via configuration
 - All previous fixes maintained
 - Smaller font for 'NOW' time display
+- LRU cache of pre-rendered text sprites, pasted instead of re-rasterized
 """
 
 import logging
 import time
 import os
+from collections import OrderedDict
 from PIL import Image, ImageDraw, ImageFont
 
+from bitmap_font import BitmapFont
+from frame_sinks import RingBufferSink, SnapshotSink
+
 logger = logging.getLogger(__name__)
 
 class DisplayManager:
@@ -53,8 +59,28 @@ class DisplayManager:
         'dest_size': 9,        # Destination font size
         'time_size': 10,        # Time font size
         'time_now_size': 7,    # Smaller size for 'NOW' text
+        
+        # 'truetype' (antialiased) or 'bitmap' (BDF/PCF pixel fonts)
+        'backend': 'truetype',
+        # Bitmap font file per role, looked up in BITMAP_FONT_DIRS. Roles
+        # whose file is missing use their TrueType font thresholded to 1 bit
+        'bitmap_fonts': {
+            'header': '5x7.bdf',
+            'badge': '5x7.bdf',
+            'dest': '5x7.bdf',
+            'time': '6x10.bdf',
+            'time_now': '4x6.bdf',
+        },
     }
     
+    # Where bitmap fonts are searched (rpi-rgb-led-matrix ships BDF fonts)
+    BITMAP_FONT_DIRS = [
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fonts'),
+        os.path.expanduser('~/rpi-rgb-led-matrix/fonts'),
+        '/usr/local/share/fonts/bdf',
+        '/usr/share/fonts/X11/misc',
+    ]
+    
     # Sliding animation configuration
     SLIDE_CONFIG = {
         'enabled': True,           # Enable sliding animation
@@ -63,19 +89,64 @@ class DisplayManager:
         'cycle_duration': 120,     # Total frames per complete cycle
     }
     
-    def __init__(self):
-        """Initialize display manager"""
-        self.matrix = None
-        self.try_init_matrix()
+    # Rendered text sprites kept by the LRU cache
+    TEXT_CACHE_SIZE = 128
+    
+    # Test mode sinks: frames kept in memory, seconds between PNG snapshots
+    FRAME_BUFFER_SIZE = 300
+    SNAPSHOT_INTERVAL = 5.0
+    
+    def __init__(self, matrix=None, sinks=None):
+        """Initialize display manager
+        
+        Args:
+            matrix: Optional matrix object to draw on instead of the LED
+                    hardware (e.g. mock_matrix.MockMatrix)
+            sinks: Optional list of frame sinks (see frame_sinks) that get
+                   every pushed frame. Defaults to a ring buffer and a
+                   rate-limited snapshot writer in test mode, none otherwise.
+        """
+        self.matrix = matrix
+        if self.matrix is None:
+            self.try_init_matrix()
         
         # For testing/development without hardware
         self.test_mode = self.matrix is None
         
+        if sinks is None:
+            sinks = []
+            if self.test_mode:
+                sinks = [
+                    RingBufferSink(self.FRAME_BUFFER_SIZE, (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT)),
+                    SnapshotSink(min_interval=self.SNAPSHOT_INTERVAL),
+                ]
+        self.sinks = sinks
+        
+        # Offscreen canvas, swapped in on vsync for tear-free frames
+        self.canvas = self._create_canvas()
+        
+        # Frame diffing - frames identical to the last one pushed are dropped
+        self.skip_unchanged = True
+        self.last_frame = None  # Raw RGB bytes of the last pushed frame
+        self.frame_stats = {'pushed': 0, 'skipped': 0}
+        
         # Load OpenSans TrueType fonts
         self.fonts = self._load_fonts()
         
+        # (text, font role) -> (mask, bbox) sprites, least recently used first
+        self.text_cache = OrderedDict()
+        self.text_cache_size = self.TEXT_CACHE_SIZE
+        self.text_cache_stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        
+        # Cached compositor layers and the inputs they were built from
+        self.static_layer_key = None
+        self.static_layer = None
+        self.dest_layer_key = None
+        self.dest_layer = None
+        self.layer_stats = {'static_builds': 0, 'dest_builds': 0}
+        
         # Animation state for destinations
-        self.slide_state = {}  # destination -> slide position
+        self.slide_state = {}  # (destination, width) -> slide offset table
         self.frame_count = 0   # Global frame counter for animation
         
         if self.test_mode:
@@ -85,6 +156,51 @@ class DisplayManager:
             logger.info(f"  Resolution: {self.matrix.width}x{self.matrix.height}")
     
     def _load_fonts(self):
+        """Load the fonts for the backend selected in FONT_CONFIG
+        
+        Returns:
+            Dict of font name -> ImageFont or BitmapFont object
+        """
+        if self.FONT_CONFIG.get('backend') == 'bitmap':
+            return self._load_bitmap_fonts()
+        return self._load_truetype_fonts()
+    
+    def _load_bitmap_fonts(self):
+        """Load BDF/PCF bitmap fonts
+        
+        Roles whose font file is not found get their TrueType font
+        converted to a 1-bit bitmap font instead.
+        
+        Returns:
+            Dict of font name -> BitmapFont object
+        """
+        fonts = {}
+        truetype_fonts = None
+        
+        for role, filename in self.FONT_CONFIG['bitmap_fonts'].items():
+            for directory in self.BITMAP_FONT_DIRS:
+                path = os.path.join(directory, filename)
+                if not os.path.exists(path):
+                    continue
+                try:
+                    fonts[role] = BitmapFont.load(path)
+                    logger.info(f"✓ Loaded bitmap font for {role}: {path}")
+                    break
+                except Exception as e:
+                    logger.warning(f"Could not load bitmap font {path}: {e}")
+            
+            if role not in fonts:
+                if truetype_fonts is None:
+                    truetype_fonts = self._load_truetype_fonts()
+                logger.warning(f"Bitmap font {filename} not found, thresholding TrueType font for {role}")
+                fonts[role] = BitmapFont.from_font(
+                    truetype_fonts[role],
+                    [chr(code) for code in range(32, 127)]
+                )
+        
+        return fonts
+    
+    def _load_truetype_fonts(self):
         """Load OpenSans TrueType fonts
         
         Returns:
@@ -205,75 +321,229 @@ class DisplayManager:
             logger.debug(f"Full error: {e}", exc_info=True)
             self.matrix = None
     
-    def render_frame(self, direction, trains):
+    def _create_canvas(self):
+        """Create the offscreen frame canvas used by display_image()
+        
+        Returns:
+            Canvas, or None if there is no matrix or the library has no
+            CreateFrameCanvas/SwapOnVSync (SetPixel() is used instead)
+        """
+        if self.matrix is None:
+            return None
+        if not (getattr(self.matrix, 'CreateFrameCanvas', None)
+                and getattr(self.matrix, 'SwapOnVSync', None)):
+            logger.warning("Matrix has no frame canvas support, using SetPixel()")
+            return None
+        try:
+            return self.matrix.CreateFrameCanvas()
+        except Exception as e:
+            logger.error(f"Failed to create frame canvas: {e}")
+            return None
+    
+    def render_frame(self, direction, trains, now=None, frame=None, stale=False):
         """
         Render a complete frame to the LED matrix
         
         Args:
             direction: 'northbound' or 'southbound'
             trains: List of Train objects (up to 2)
+            now: Unix timestamp the countdowns are computed against
+                 (one clock sample per frame, default: time.time())
+            frame: Animation frame number from the frame clock, so sliding
+                   text keeps its speed when frames are skipped
+                   (default: one more than the last frame)
+            stale: Draw the header grayed out (arrivals restored at startup,
+                   not fetched yet)
+        """
+        if now is None:
+            now = time.time()
+        img = self.compose_frame(direction, trains, now=now, frame=frame, stale=stale)
+        if img is not None:
+            self.present_frame(img, direction, now)
+    
+    def compose_frame(self, direction, trains, now=None, frame=None, stale=False):
+        """
+        Draw a complete frame without displaying it
+        
+        Touches only the render caches, so frames can be composed ahead of
+        time on a render thread while present_frame() runs elsewhere.
+        
+        Args:
+            direction: 'northbound' or 'southbound'
+            trains: List of Train objects (up to 2)
+            now: Unix timestamp the countdowns are computed against
+                 (default: time.time())
+            frame: Animation frame number (default: one more than the last)
+            stale: Draw the header grayed out
+            
+        Returns:
+            PIL Image object of the frame, or None on error
         """
         try:
-            # Increment frame counter for animations
-            self.frame_count += 1
+            # Advance frame counter for animations
+            if frame is None:
+                self.frame_count += 1
+            else:
+                self.frame_count = frame
+            if now is None:
+                now = time.time()
             
-            # Create image for rendering
-            img = Image.new('RGB', (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT), self.COLORS['black'])
-            draw = ImageDraw.Draw(img)
+            trains = trains[:2]
             
-            # STEP 1: Draw all sliding destination text first
-            for idx, train in enumerate(trains[:2]):
-                row_y = self.HEADER_HEIGHT + (idx * self.ROW_HEIGHT) + 2
-                col2_x = self.COL_WIDTHS[0]
-                font = self.fonts['dest']
-                self.draw_destination_text_only(draw, train.destination, col2_x, row_y, font)
+            # Dynamic layer: sliding destination text (reused while no row slides)
+            img = self._destination_layer(trains).copy()
             
-            # STEP 2: Draw black clipping rectangles to hide overflow
-            for idx, train in enumerate(trains[:2]):
-                row_y = self.HEADER_HEIGHT + (idx * self.ROW_HEIGHT) + 2
-                col2_x = self.COL_WIDTHS[0]
-                self.draw_clipping_rectangles(draw, col2_x, row_y)
+            # Static layer: clipping rectangles and badges, pasted through the
+            # clip mask so they hide destination overflow
+            static = self._static_layer(direction, trains)
+            img.paste(static['image'], (0, 0), static['mask'])
+            draw = ImageDraw.Draw(img)
             
-            # STEP 3: Draw badges and time (on top of clipping rectangles)
-            for idx, train in enumerate(trains[:2]):
+            # Dynamic layer: countdowns (on top of clipping rectangles)
+            for idx, train in enumerate(trains):
                 row_y = self.HEADER_HEIGHT + (idx * self.ROW_HEIGHT) + 2
-                self.draw_train_badge(draw, train.route_id, row_y)
                 
                 # Draw time with conditional font size
                 col3_x = self.COL_WIDTHS[0] + self.COL_WIDTHS[1]
-                minutes = train.get_minutes_to_arrival()
+                minutes = train.get_minutes_to_arrival(now)
                 time_text = self.format_time_text(minutes)
                 
                 # Use smaller font for 'NOW', regular font for minutes
                 if time_text == "NOW":
-                    time_font = self.fonts['time_now']
+                    time_font = 'time_now'
                 else:
-                    time_font = self.fonts['time']
+                    time_font = 'time'
                 
-                bbox = draw.textbbox((0, 0), time_text, font=time_font)
+                bbox = self.text_bbox(time_text, time_font)
                 text_height = bbox[3] - bbox[1]
                 time_y = row_y + (self.ROW_HEIGHT - text_height) // 2 - 1
                 
-                draw.text(
-                    (col3_x + 1, time_y),
-                    time_text,
-                    font=time_font,
-                    fill=self.COLORS['cyan']
-                )
+                self.draw_text(draw, (col3_x + 1, time_y), time_text, time_font, self.COLORS['cyan'])
             
-            # STEP 4: Draw header (NORTHBOUND/SOUTHBOUND) on top of everything
-            self.draw_header(draw, direction)
+            # Header (NORTHBOUND/SOUTHBOUND) on top of everything
+            self.draw_header(draw, direction, stale)
+            return img
             
-            # Display or save
-            if self.test_mode:
-                self.save_test_image(img, direction)
-            else:
-                self.display_image(img)
-                
         except Exception as e:
             logger.error(f"Error rendering frame: {e}", exc_info=True)
+            return None
+    
+    def present_frame(self, img, direction, now=None):
+        """
+        Push a composed frame to the matrix and/or the headless sinks
+        
+        Frames identical to the one already on the display are dropped.
+        
+        Args:
+            img: PIL Image object from compose_frame()
+            direction: Direction shown
+            now: Unix timestamp of the frame (default: time.time())
+        """
+        if not self.frame_changed(img):
+            return
+        
+        if not self.test_mode:
+            self.display_image(img)
+        if self.sinks:
+            self.save_test_image(img, direction, now)
+    
+    def _static_layer(self, direction, trains):
+        """
+        Get the cached static layer, rebuilding it when its inputs change
+        
+        Holds what only changes with the direction or the routes shown:
+        the clipping rectangles and the train badges. Its mask covers the
+        clipping rectangles (badges sit inside them), so pasting the layer
+        through the mask hides destination overflow exactly like drawing
+        the rectangles did.
+        
+        Args:
+            direction: 'northbound' or 'southbound'
+            trains: Train objects shown (up to 2)
+            
+        Returns:
+            Dict with 'image' (RGB) and 'mask' (L) of the layer
+        """
+        key = (direction, tuple(train.route_id for train in trains))
+        if self.static_layer_key == key:
+            return self.static_layer
+        
+        image = Image.new('RGB', (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT), self.COLORS['black'])
+        mask = Image.new('L', (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT), 0)
+        draw = ImageDraw.Draw(image)
+        mask_draw = ImageDraw.Draw(mask)
+        col2_x = self.COL_WIDTHS[0]
+        
+        for idx, train in enumerate(trains):
+            row_y = self.HEADER_HEIGHT + (idx * self.ROW_HEIGHT) + 2
+            self.draw_clipping_rectangles(draw, col2_x, row_y)
+            self.draw_clipping_rectangles(mask_draw, col2_x, row_y, fill=255)
+            self.draw_train_badge(draw, train.route_id, row_y)
+        
+        self.static_layer_key = key
+        self.static_layer = {'image': image, 'mask': mask}
+        self.layer_stats['static_builds'] += 1
+        logger.debug(f"Rebuilt static layer for {key}")
+        return self.static_layer
     
-    def draw_header(self, draw, direction):
+    def _destination_layer(self, trains):
+        """
+        Get the destination text layer for the current animation frame
+        
+        The layer is rebuilt only when a destination or its slide offset
+        changes, so rows that fit (or pause at the ends of their slide)
+        cost nothing.
+        
+        Args:
+            trains: Train objects shown (up to 2)
+            
+        Returns:
+            RGB image with the destination text of every row
+        """
+        destinations = tuple(train.destination for train in trains)
+        offsets = tuple(
+            self._calculate_slide_offset(destination, self.DEST_MAX_WIDTH)
+            for destination in destinations
+        )
+        key = (destinations, offsets)
+        if self.dest_layer_key == key:
+            return self.dest_layer
+        
+        image = Image.new('RGB', (self.DISPLAY_WIDTH, self.DISPLAY_HEIGHT), self.COLORS['black'])
+        draw = ImageDraw.Draw(image)
+        for idx, destination in enumerate(destinations):
+            row_y = self.HEADER_HEIGHT + (idx * self.ROW_HEIGHT) + 2
+            col2_x = self.COL_WIDTHS[0]
+            self.draw_destination_text_only(draw, destination, col2_x, row_y, 'dest', offsets[idx])
+        
+        self.dest_layer_key = key
+        self.dest_layer = image
+        self.layer_stats['dest_builds'] += 1
+        return image
+    
+    def frame_changed(self, img):
+        """
+        Compare a rendered frame with the last one pushed
+        
+        Counts the frame as pushed or skipped in frame_stats. Always True
+        when skip_unchanged is off.
+        
+        Args:
+            img: PIL Image object of the new frame
+            
+        Returns:
+            True if the frame differs and should be displayed
+        """
+        frame = img.tobytes()
+        if self.skip_unchanged and frame == self.last_frame:
+            self.frame_stats['skipped'] += 1
+            return False
+        
+        self.last_frame = frame
+        self.frame_stats['pushed'] += 1
+        return True
+    
+    def draw_header(self, draw, direction, stale=False):
         """
         Draw header row showing full NORTHBOUND/SOUTHBOUND text
         Positioned 2 pixels higher than before
@@ -282,15 +552,14 @@ class DisplayManager:
         Args:
             draw: PIL ImageDraw object
             direction: 'northbound' or 'southbound'
+            stale: Gray instead of white, for arrivals not confirmed by the feed yet
         """
         try:
-            font = self.fonts['header']
-            
             # Full direction text
             direction_text = "NORTHBOUND" if direction == 'northbound' else "SOUTHBOUND"
             
             # Get text dimensions
-            bbox = draw.textbbox((0, 0), direction_text, font=font)
+            bbox = self.text_bbox(direction_text, 'header')
             text_width = bbox[2] - bbox[0]
             text_height = bbox[3] - bbox[1]
             
@@ -299,17 +568,13 @@ class DisplayManager:
             y_pos = -1  # 2 pixels higher than default centered position
             
             # Draw text
-            draw.text(
-                (x_pos, y_pos),
-                direction_text,
-                font=font,
-                fill=self.COLORS['white']
-            )
+            color = self.COLORS['gray'] if stale else self.COLORS['white']
+            self.draw_text(draw, (x_pos, y_pos), direction_text, 'header', color)
             
         except Exception as e:
             logger.error(f"Error drawing header: {e}")
     
-    def draw_destination_text_only(self, draw, destination, x_pos, y_pos, font):
+    def draw_destination_text_only(self, draw, destination, x_pos, y_pos, font, offset=None):
         """
         Draw ONLY the destination text with sliding animation if too long
         Does not draw clipping rectangles - those are drawn separately
@@ -319,11 +584,12 @@ class DisplayManager:
             destination: Destination string
             x_pos: X position of column
             y_pos: Y position
-            font: Font to use
+            font: Font role to use (key of self.fonts)
+            offset: Slide offset in pixels (default: current animation frame)
         """
         try:
             # Get text dimensions
-            bbox = draw.textbbox((0, 0), destination, font=font)
+            bbox = self.text_bbox(destination, font)
             text_width = bbox[2] - bbox[0]
             text_height = bbox[3] - bbox[1]
             
@@ -334,20 +600,23 @@ class DisplayManager:
             text_y = y_pos + (self.ROW_HEIGHT - text_height) // 2
             
             # Calculate offset for animation
-            offset = self._calculate_slide_offset(destination, max_width)
-            
-            # Draw text with offset (handles both short and long text)
-            draw.text(
-                (x_pos + 2 - offset, text_y),
-                destination,
-                font=font,
-                fill=self.COLORS['white']
-            )
+            if offset is None:
+                offset = self._calculate_slide_offset(destination, max_width)
+            
+            # Paste the visible window of the pre-rendered text strip
+            # (handles both short and long text)
+            strip, bbox = self.text_sprite(destination, font)
+            strip_x = x_pos + 2 - offset + bbox[0]
+            left = max(0, x_pos + 2 - strip_x)
+            right = min(strip.width, x_pos + 2 + max_width - strip_x)
+            if right > left:
+                window = strip.crop((left, 0, right, strip.height))
+                draw.bitmap((strip_x + left, text_y + bbox[1]), window, fill=self.COLORS['white'])
             
         except Exception as e:
             logger.error(f"Error drawing destination text: {e}")
     
-    def draw_clipping_rectangles(self, draw, x_pos, y_pos):
+    def draw_clipping_rectangles(self, draw, x_pos, y_pos, fill=None):
         """
         Draw black rectangles to hide text overflow on both sides
         This is drawn AFTER the text but BEFORE badges and time
@@ -356,20 +625,23 @@ class DisplayManager:
             draw: PIL ImageDraw object
             x_pos: X position of destination column
             y_pos: Y position of row
+            fill: Rectangle color (default: black; 255 to draw the clip mask)
         """
         try:
             max_width = self.DEST_MAX_WIDTH
+            if fill is None:
+                fill = self.COLORS['black']
             
             # Left clipping rectangle - hide overflow into badge column
             draw.rectangle(
                 [(0, y_pos), (x_pos + 2 - 1, y_pos + self.ROW_HEIGHT - 1)],
-                fill=self.COLORS['black']
+                fill=fill
             )
             
             # Right clipping rectangle - hide overflow into time column
             draw.rectangle(
                 [(x_pos + 2 + max_width, y_pos), (self.DISPLAY_WIDTH - 1, y_pos + self.ROW_HEIGHT - 1)],
-                fill=self.COLORS['black']
+                fill=fill
             )
             
         except Exception as e:
@@ -387,8 +659,6 @@ class DisplayManager:
             y_pos: Y position of row
         """
         try:
-            font = self.fonts['badge']
-            
             # Circle parameters
             circle_x = 5
             circle_y = y_pos + self.ROW_HEIGHT // 2 - 0
@@ -403,7 +673,7 @@ class DisplayManager:
             )
             
             # Get text dimensions
-            bbox = draw.textbbox((0, 0), route_id, font=font)
+            bbox = self.text_bbox(route_id, 'badge')
             text_width = bbox[2] - bbox[0]
             text_height = bbox[3] - bbox[1]
             
@@ -412,80 +682,11 @@ class DisplayManager:
             text_y = circle_y - text_height // 2 - 2  # 2 pixels up
             
             # Draw text
-            draw.text(
-                (text_x, text_y),
-                route_id,
-                font=font,
-                fill=self.COLORS['yellow']
-            )
+            self.draw_text(draw, (text_x, text_y), route_id, 'badge', self.COLORS['yellow'])
             
         except Exception as e:
             logger.error(f"Error drawing train badge: {e}")
     
-    def draw_destination_sliding(self, draw, destination, x_pos, y_pos, font):
-        """
-        Draw destination text with sliding animation if too long
-        Text slides back and forth to show full length
-        Clipped to stay within destination column bounds
-        
-        Args:
-            draw: PIL ImageDraw object
-            destination: Destination string
-            x_pos: X position of column
-            y_pos: Y position
-            font: Font to use
-        """
-        try:
-            # Get text dimensions
-            bbox = draw.textbbox((0, 0), destination, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-            
-            # Max width for destination column
-            max_width = self.DEST_MAX_WIDTH
-            
-            # Vertically center text in row
-            text_y = y_pos + (self.ROW_HEIGHT - text_height) // 2
-            
-            # If text fits, just draw it
-            if text_width <= max_width:
-                draw.text(
-                    (x_pos + 2, text_y),
-                    destination,
-                    font=font,
-                    fill=self.COLORS['white']
-                )
-            else:
-                # Text is too long - animate sliding with clipping
-                offset = self._calculate_slide_offset(destination, max_width)
-                
-                # Draw text directly on main image with offset
-                # The text will naturally be clipped at the image boundaries
-                # We offset it to create the sliding effect
-                draw.text(
-                    (x_pos + 2 - offset, text_y),
-                    destination,
-                    font=font,
-                    fill=self.COLORS['white']
-                )
-                
-                # Fill in areas outside the destination column to hide overflow
-                # Left side (badge column) - draw black rectangle to hide overflow
-                img = draw.im
-                for py in range(y_pos, y_pos + self.ROW_HEIGHT):
-                    for px in range(x_pos + 2):
-                        if px >= 0:
-                            img.putpixel((px, py), self.COLORS['black'])
-                
-                # Right side (time column) - draw black rectangle to hide overflow
-                for py in range(y_pos, y_pos + self.ROW_HEIGHT):
-                    for px in range(x_pos + 2 + max_width, self.DISPLAY_WIDTH):
-                        if px < self.DISPLAY_WIDTH:
-                            img.putpixel((px, py), self.COLORS['black'])
-                
-        except Exception as e:
-            logger.error(f"Error drawing destination: {e}")
-    
     def _calculate_slide_offset(self, text, max_width):
         """
         Calculate the horizontal offset for sliding text animation
@@ -499,55 +700,164 @@ class DisplayManager:
             Pixel offset for text position
         """
         try:
-            font = self.fonts['dest']
-            bbox = ImageDraw.Draw(Image.new('RGB', (1, 1))).textbbox(
-                (0, 0), text, font=font
-            )
-            text_width = bbox[2] - bbox[0]
+            offsets = self._slide_offsets(text, max_width)
+            return offsets[self.frame_count % len(offsets)]
+        except Exception as e:
+            logger.error(f"Error calculating slide offset: {e}")
+            return 0
+    
+    def is_animating(self, trains):
+        """
+        Check whether any destination on screen slides
+        
+        Args:
+            trains: Train objects shown (up to 2)
             
-            if text_width <= max_width:
-                return 0
+        Returns:
+            True if frames change from one to the next
+        """
+        return any(
+            len(self._slide_offsets(train.destination, self.DEST_MAX_WIDTH)) > 1
+            for train in trains[:2]
+        )
+    
+    def _slide_offsets(self, text, max_width):
+        """
+        Get the offset table for one full slide cycle of a text
+        
+        Computed once per text and kept in slide_state, so each frame's
+        offset is a list lookup.
+        
+        Args:
+            text: Text to slide
+            max_width: Maximum width available
             
+        Returns:
+            List of pixel offsets, one per frame of the cycle
+        """
+        key = (text, max_width)
+        offsets = self.slide_state.get(key)
+        if offsets is not None:
+            return offsets
+        
+        bbox = self.text_bbox(text, 'dest')
+        text_width = bbox[2] - bbox[0]
+        cycle = self.SLIDE_CONFIG['cycle_duration']
+        
+        if text_width <= max_width:
+            offsets = [0]
+        else:
             # Distance to slide
             slide_distance = text_width - max_width + 5  # 5px margin
+            offsets = [self._slide_offset_at(frame, slide_distance) for frame in range(cycle)]
+        
+        if len(self.slide_state) >= self.TEXT_CACHE_SIZE:
+            self.slide_state.clear()
+        self.slide_state[key] = offsets
+        return offsets
+    
+    def _slide_offset_at(self, frame, slide_distance):
+        """
+        Offset of sliding text at one frame of the cycle
+        
+        Args:
+            frame: Frame number within the cycle
+            slide_distance: Pixels the text travels
             
-            # Get animation state
-            cycle = self.SLIDE_CONFIG['cycle_duration']
-            speed = self.SLIDE_CONFIG['speed']
-            pause = self.SLIDE_CONFIG['pause_frames']
-            
-            # Calculate position in cycle
-            frame = self.frame_count % cycle
-            
-            # Phases:
-            # 0: Pause at start
-            # pause: Slide right
-            # pause + slide_frames: Pause at end
-            # pause + slide_frames + pause: Slide left
-            # Total = cycle
-            
-            slide_frames = (cycle - 2 * pause) // 2
-            
-            if frame < pause:
-                # Pause at start
-                offset = 0
-            elif frame < pause + slide_frames:
-                # Slide right
-                progress = frame - pause
-                offset = int((progress / slide_frames) * slide_distance)
-            elif frame < pause + slide_frames + pause:
-                # Pause at end
-                offset = slide_distance
-            else:
-                # Slide left
-                progress = frame - (pause + slide_frames + pause)
-                offset = int(slide_distance - (progress / slide_frames) * slide_distance)
-            
-            return offset
+        Returns:
+            Pixel offset for text position
+        """
+        # Get animation state
+        cycle = self.SLIDE_CONFIG['cycle_duration']
+        pause = self.SLIDE_CONFIG['pause_frames']
+        
+        # Phases:
+        # 0: Pause at start
+        # pause: Slide right
+        # pause + slide_frames: Pause at end
+        # pause + slide_frames + pause: Slide left
+        # Total = cycle
+        
+        slide_frames = (cycle - 2 * pause) // 2
+        
+        if frame < pause:
+            # Pause at start
+            offset = 0
+        elif frame < pause + slide_frames:
+            # Slide right
+            progress = frame - pause
+            offset = int((progress / slide_frames) * slide_distance)
+        elif frame < pause + slide_frames + pause:
+            # Pause at end
+            offset = slide_distance
+        else:
+            # Slide left
+            progress = frame - (pause + slide_frames + pause)
+            offset = int(slide_distance - (progress / slide_frames) * slide_distance)
+        
+        return offset
+    
+    def text_sprite(self, text, role):
+        """
+        Get the rendered sprite for a string from the LRU text cache
+        
+        The sprite is an 'L' mask cropped to the text's bounding box, so it
+        can be drawn in any color. Misses rasterize the text once with the
+        role's font (FreeType, or glyph pixels for bitmap fonts); the least
+        recently used sprite is evicted when the cache is full.
+        
+        Args:
+            text: String to render
+            role: Font role (key of self.fonts, e.g. 'dest')
             
-        except Exception as e:
-            logger.error(f"Error calculating slide offset: {e}")
-            return 0
+        Returns:
+            Tuple of (mask image, bbox) with bbox as returned by textbbox()
+            for the text drawn at (0, 0)
+        """
+        key = (text, role)
+        sprite = self.text_cache.get(key)
+        if sprite is not None:
+            self.text_cache.move_to_end(key)
+            self.text_cache_stats['hits'] += 1
+            return sprite
+        
+        self.text_cache_stats['misses'] += 1
+        font = self.fonts[role]
+        if isinstance(font, BitmapFont):
+            sprite = font.render(text)
+        else:
+            bbox = ImageDraw.Draw(Image.new('L', (1, 1))).textbbox((0, 0), text, font=font)
+            mask = Image.new('L', (max(1, bbox[2] - bbox[0]), max(1, bbox[3] - bbox[1])), 0)
+            ImageDraw.Draw(mask).text((-bbox[0], -bbox[1]), text, font=font, fill=255)
+            sprite = (mask, bbox)
+        
+        if self.text_cache_size > 0:
+            self.text_cache[key] = sprite
+            if len(self.text_cache) > self.text_cache_size:
+                self.text_cache.popitem(last=False)
+                self.text_cache_stats['evictions'] += 1
+        return sprite
+    
+    def text_bbox(self, text, role):
+        """Bounding box of text drawn at (0, 0) with a font role (cached)"""
+        return self.text_sprite(text, role)[1]
+    
+    def draw_text(self, draw, xy, text, role, color):
+        """
+        Draw text by pasting its cached sprite
+        
+        Gives the same pixels as draw.text(xy, text, font=self.fonts[role],
+        fill=color).
+        
+        Args:
+            draw: PIL ImageDraw object
+            xy: Text origin, as for draw.text()
+            text: String to draw
+            role: Font role (key of self.fonts)
+            color: RGB tuple
+        """
+        mask, bbox = self.text_sprite(text, role)
+        draw.bitmap((xy[0] + bbox[0], xy[1] + bbox[1]), mask, fill=color)
     
     def format_time_text(self, minutes):
         """Format arrival time for display"""
@@ -560,7 +870,11 @@ class DisplayManager:
     
     def display_image(self, pil_image):
         """
-        Display PIL Image on LED matrix using SetPixel() API
+        Display PIL Image on LED matrix
+        
+        Copies the frame onto the offscreen canvas in one SetImage() call and
+        swaps it in on the next vertical sync. Falls back to per-pixel
+        SetPixel() when the library has no frame canvas.
         
         Args:
             pil_image: PIL Image object (RGB mode, 64x32)
@@ -574,6 +888,13 @@ class DisplayManager:
             if pil_image.mode != 'RGB':
                 pil_image = pil_image.convert('RGB')
             
+            if self.canvas is not None:
+                self.canvas.SetImage(pil_image)
+                # The previous front buffer becomes the next offscreen canvas
+                self.canvas = self.matrix.SwapOnVSync(self.canvas)
+                logger.debug("Frame displayed on matrix using SwapOnVSync()")
+                return
+            
             # Get image data
             pixels = pil_image.load()
             
@@ -590,27 +911,50 @@ class DisplayManager:
         except Exception as e:
             logger.error(f"Error displaying image: {e}", exc_info=True)
     
-    def save_test_image(self, img, direction):
+    def save_test_image(self, img, direction, now=None):
         """
-        Save image to file for testing (in test mode)
+        Hand a frame to the headless sinks (in test mode)
         
         Args:
             img: PIL Image object
             direction: Direction name for filename
+            now: Unix timestamp of the frame (default: time.time())
         """
-        try:
-            filename = f"/tmp/mta_display_{direction}_{int(time.time())}.png"
-            img.save(filename)
-            logger.debug(f"Saved test image: {filename}")
-        except Exception as e:
-            logger.debug(f"Could not save test image: {e}")
+        for sink in self.sinks:
+            try:
+                sink.write(img, direction, now)
+            except Exception as e:
+                logger.debug(f"Frame sink {type(sink).__name__} failed: {e}")
+    
+    def dump_animation(self, path, count=None, scale=1):
+        """
+        Write the frames held by the ring buffer sink to a GIF or APNG
+        
+        Args:
+            path: Output file ('.gif' for GIF, otherwise APNG)
+            count: Only the most recent count frames (default: all)
+            scale: Integer upscale factor
+            
+        Returns:
+            Number of frames written (0 without a ring buffer sink)
+        """
+        for sink in self.sinks:
+            if isinstance(sink, RingBufferSink):
+                return sink.dump_animation(path, count, scale)
+        logger.warning("No ring buffer sink configured, nothing to dump")
+        return 0
     
     def cleanup(self):
         """Clean up display resources"""
+        logger.info(
+            f"Frames pushed: {self.frame_stats['pushed']}, "
+            f"skipped as unchanged: {self.frame_stats['skipped']}"
+        )
         try:
             if self.matrix:
                 # Clear display
                 self.matrix.Clear()
+                self.last_frame = None
                 logger.info("Display cleared on shutdown")
         except Exception as e:
             logger.error(f"Error during cleanup: {e}")
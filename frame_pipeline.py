@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Pipelined frame rendering
+A render thread composes frames ahead of time into a small bounded queue,
+each stamped with the deadline it is due on screen; the output stage only
+waits for deadlines and blits. A slow frame then eats into the queue's
+lead instead of delaying the panel.
+
+A new arrival snapshot version invalidates the queued frames: the render
+thread starts over from the next frame slot, and queued frames of the old
+version are dropped as soon as a frame of the new one is ready (until then
+they keep the animation moving).
+"""
+
+import logging
+import threading
+import time
+from collections import deque, namedtuple
+
+logger = logging.getLogger(__name__)
+
+# One composed frame: snapshot version it was rendered from, monotonic
+# deadline, the Unix time its countdowns were computed for, and the image
+QueuedFrame = namedtuple('QueuedFrame', 'version deadline now direction frame image')
+
+
+class FramePipeline:
+    """Renders frames ahead on a worker thread for an output stage to blit on deadline"""
+
+    def __init__(self, display, scheduler, source, depth=3):
+        """Initialize pipeline
+
+        Args:
+            display: DisplayManager (compose_frame / present_frame)
+            scheduler: FrameScheduler deciding directions and frame times
+            source: Callable returning the current ArrivalSnapshot
+            depth: Most frames rendered ahead
+        """
+        self.display = display
+        self.scheduler = scheduler
+        self.source = source
+        self.depth = depth
+
+        self.frames = deque()  # QueuedFrame, oldest first
+        self.condition = threading.Condition()
+        self.version = None  # Snapshot version being rendered
+        self.shown_deadline = None  # Deadline of the frame last shown
+        self.running = False
+        self.thread = None
+
+        self.stats = {'rendered': 0, 'shown': 0, 'stale': 0, 'late': 0, 'invalidations': 0}
+
+    def start(self):
+        """Start the render thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._render_loop, name="render", daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=1.0):
+        """Stop the render thread and wake the output stage"""
+        with self.condition:
+            self.running = False
+            self.condition.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+    def notify_data(self):
+        """Wake the render thread to pick up a new snapshot (thread safe)
+
+        Queued frames are only invalidated if the snapshot version changed.
+        """
+        with self.condition:
+            self.condition.notify_all()
+
+    def _render_loop(self):
+        """Render thread: keep up to depth frames queued ahead of their deadlines"""
+        scheduler = self.scheduler
+        deadline = None
+        clock_offset = None  # Unix minus monotonic time, sampled once per version
+
+        while True:
+            with self.condition:
+                while (self.running and len(self.frames) >= self.depth
+                       and self.source().version == self.version):
+                    self.condition.wait()
+                if not self.running:
+                    return
+                snapshot = self.source()
+                if snapshot.version != self.version:
+                    if self.version is not None:
+                        self.stats['invalidations'] += 1
+                    self.version = snapshot.version
+                    deadline = scheduler.next_slot(time.monotonic())
+                    # One offset per version, so a frame planned for a
+                    # direction switch is not re-sampled to just before it
+                    clock_offset = time.time() - time.monotonic()
+
+            try:
+                now = time.monotonic()
+                if deadline < now - scheduler.frame_period:
+                    # Fell behind: render the current slot instead of late frames
+                    current = scheduler.next_slot(now) - scheduler.frame_period
+                    scheduler.frame_dropped(max(0, scheduler.frame_at(current) - scheduler.frame_at(deadline)))
+                    deadline = current
+
+                wall = deadline + clock_offset
+                direction = scheduler.direction_at(wall)
+                trains = snapshot.trains(direction)[:2]
+                frame = scheduler.frame_at(deadline)
+
+                render_start = time.monotonic()
+                img = self.display.compose_frame(direction, trains, now=wall, frame=frame,
+                                                 stale=snapshot.restored)
+                scheduler.end_frame(time.monotonic() - render_start)
+
+                if img is not None:
+                    with self.condition:
+                        self.frames.append(QueuedFrame(snapshot.version, deadline, wall, direction, frame, img))
+                        self.stats['rendered'] += 1
+                        self._drop_superseded()
+                        self.condition.notify_all()
+
+                # Next deadline: the next slot while animating, else the next change
+                animating = self.display.is_animating(trains)
+                due = scheduler.next_frame_time(wall, trains, animating)
+                if due is None:
+                    deadline = scheduler.next_slot(deadline)
+                else:
+                    deadline = due - clock_offset
+
+            except Exception as e:
+                logger.error(f"Error in render thread: {e}", exc_info=True)
+                time.sleep(0.1)
+
+    def _drop_superseded(self):
+        """Drop queued frames of old versions once a frame of the current one is queued"""
+        if any(queued.version == self.version for queued in self.frames):
+            while self.frames[0].version != self.version:
+                self.frames.popleft()
+                self.stats['stale'] += 1
+
+    def next_frame(self, timeout=None):
+        """Wait for the next frame to come due
+
+        Args:
+            timeout: Most seconds to wait (default: until a frame is due)
+
+        Returns:
+            QueuedFrame, or None on timeout or stop
+        """
+        give_up = None if timeout is None else time.monotonic() + timeout
+
+        with self.condition:
+            while self.running:
+                self._drop_superseded()
+                now = time.monotonic()
+                wait = None if give_up is None else give_up - now
+
+                if self.frames:
+                    delay = self.frames[0].deadline - now
+                    if delay <= 0:
+                        queued = self.frames.popleft()
+                        # A stale frame already filled this slot
+                        if self.shown_deadline is not None and queued.deadline <= self.shown_deadline:
+                            self.stats['stale'] += 1
+                            continue
+                        # Late, and the next frame is already due too: skip this one
+                        if self.frames and self.frames[0].deadline <= now:
+                            self.stats['late'] += 1
+                            self.scheduler.frame_dropped()
+                            continue
+                        self.shown_deadline = queued.deadline
+                        self.condition.notify_all()  # Room for the render thread
+                        return queued
+                    wait = delay if wait is None else min(wait, delay)
+
+                if wait is not None and wait <= 0:
+                    return None
+                self.condition.wait(wait)
+        return None
+
+    def show_next(self, timeout=None):
+        """Wait for the next frame to come due and put it on screen
+
+        Args:
+            timeout: Most seconds to wait
+
+        Returns:
+            True if a frame was shown
+        """
+        waited_from = time.monotonic()
+        queued = self.next_frame(timeout)
+        if queued is None:
+            return False
+
+        shown_at = time.monotonic()
+        self.display.present_frame(queued.image, queued.direction, queued.now)
+        self.stats['shown'] += 1
+        self.scheduler.frame_shown(queued.deadline, shown_at, shown_at - waited_from)
+        return True
+
+    def report(self):
+        """Get pipeline counters since the last report
+
+        Returns:
+            Dict of 'rendered', 'shown', 'stale', 'late', 'invalidations'
+            and the current 'queued' count; resets the counters
+        """
+        with self.condition:
+            report = dict(self.stats, queued=len(self.frames))
+            self.stats = {key: 0 for key in self.stats}
+        return report
@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Adaptive frame scheduler for the display loop
+Decides when the next frame is due from what is on screen: every frame
+while a destination slides, otherwise only when a countdown changes, the
+direction switches or new train data arrives
+
+Frames are paced against absolute deadlines on the monotonic clock, so
+render time does not add to the frame period; when the loop falls behind,
+missed frame slots are skipped instead of being rendered late.
+"""
+
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class TimingWindow:
+    """Rolling window of timing samples with percentile summaries"""
+
+    def __init__(self, size=1000):
+        """Initialize window
+
+        Args:
+            size: Number of most recent samples kept
+        """
+        self.samples = deque(maxlen=size)
+
+    def __len__(self):
+        return len(self.samples)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentiles(self, points=(50, 95, 99)):
+        """Get percentiles of the samples (nearest rank)
+
+        Args:
+            points: Percentiles to compute
+
+        Returns:
+            Dict of percentile -> seconds (0.0 when there are no samples)
+        """
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {point: 0.0 for point in points}
+        return {
+            point: ordered[min(len(ordered) - 1, max(0, math.ceil(point / 100 * len(ordered)) - 1))]
+            for point in points
+        }
+
+    def clear(self):
+        self.samples.clear()
+
+
+class FrameScheduler:
+    """Schedules display frames and tracks frame rate, idle time and timing"""
+
+    # Wake this long after a countdown's minute boundary, so the new value shows
+    BOUNDARY_MARGIN = 0.01
+
+    def __init__(self, fps=30, frame_duration=10, adaptive=True):
+        """Initialize scheduler
+
+        Args:
+            fps: Frame rate while something on screen is animating
+            frame_duration: Seconds each direction is shown
+            adaptive: Render at fps all the time when False
+        """
+        self.fps = fps
+        self.frame_period = 1 / fps
+        self.frame_duration = frame_duration
+        self.adaptive = adaptive
+
+        # Set by the update thread when new train data is available
+        self.data_event = threading.Event()
+
+        # Frame slots are epoch + n * frame_period on the monotonic clock
+        self.epoch = time.monotonic()
+        self.deadline = None  # Monotonic time the current frame was due
+
+        self.stats = {'frames': 0, 'skipped': 0, 'idle': 0.0, 'wakeups_on_data': 0}
+        self.stats_started = time.monotonic()
+        self.render_times = TimingWindow()
+        self.overshoot = TimingWindow()
+        self.jitter = TimingWindow()
+
+    def direction_at(self, now):
+        """Get the direction shown at a point in time
+
+        Directions alternate every frame_duration seconds of wall-clock
+        time, starting with northbound.
+
+        Args:
+            now: Unix timestamp
+
+        Returns:
+            'northbound' or 'southbound'
+        """
+        if int(now // self.frame_duration) % 2 == 0:
+            return "northbound"
+        return "southbound"
+
+    def next_direction_switch(self, now):
+        """Unix timestamp of the next direction switch after now"""
+        return (math.floor(now / self.frame_duration) + 1) * self.frame_duration
+
+    def next_minute_boundary(self, now, trains):
+        """Get the earliest time a displayed countdown changes
+
+        Countdowns show whole minutes until arrival, so each one changes
+        when its remaining seconds cross a multiple of 60.
+
+        Args:
+            now: Unix timestamp
+            trains: Train objects on screen
+
+        Returns:
+            Unix timestamp, or None if no countdown will change
+        """
+        boundary = None
+        for train in trains:
+            seconds_to_arrival = train.arrival_time - now
+            if seconds_to_arrival <= 0:
+                continue  # Shows NOW until the next update drops it
+            change = now + (seconds_to_arrival % 60 or 60) + self.BOUNDARY_MARGIN
+            if boundary is None or change < boundary:
+                boundary = change
+        return boundary
+
+    def next_frame_time(self, now, trains, animating):
+        """Get the time the next frame is due
+
+        Args:
+            now: Unix timestamp the current frame was rendered for
+            trains: Train objects on screen
+            animating: True while a destination is sliding
+
+        Returns:
+            Unix timestamp of the next frame, or None for the next slot of
+            the fixed-rate frame clock
+        """
+        if animating or not self.adaptive:
+            return None
+
+        due = self.next_direction_switch(now)
+        boundary = self.next_minute_boundary(now, trains)
+        if boundary is not None and boundary < due:
+            due = boundary
+        return due
+
+    def frame_at(self, when):
+        """Animation frame number of the frame slot containing a monotonic time"""
+        # Nudge so a slot's own start time (from next_slot) rounds into it
+        return int((when - self.epoch) / self.frame_period + 1e-6)
+
+    def next_slot(self, when):
+        """Monotonic time of the first frame slot after when"""
+        return self.epoch + (self.frame_at(when) + 1) * self.frame_period
+
+    def start_frame(self):
+        """Mark the start of a frame
+
+        Records how late the frame started against its deadline.
+
+        Returns:
+            Animation frame number: frame slots elapsed since the scheduler
+            started, so animations follow the clock even when frames are
+            skipped
+        """
+        started = time.monotonic()
+        if self.deadline is not None:
+            self.jitter.add(started - self.deadline)
+        return self.frame_at(started)
+
+    def end_frame(self, render_seconds):
+        """Record how long the frame took to render"""
+        self.render_times.add(render_seconds)
+
+    def frame_shown(self, deadline, shown_at, idle=0.0):
+        """Record a frame put on screen by an output stage that paces itself
+
+        For FramePipeline, whose output thread blits on deadline instead of
+        calling start_frame() / wait().
+
+        Args:
+            deadline: Monotonic time the frame was due
+            shown_at: Monotonic time it was shown
+            idle: Seconds the output stage slept before showing it
+        """
+        self.stats['frames'] += 1
+        self.stats['idle'] += idle
+        self.jitter.add(shown_at - deadline)
+
+    def frame_dropped(self, count=1):
+        """Count frame slots that were never shown"""
+        self.stats['skipped'] += count
+
+    def notify_data(self):
+        """Wake the display loop for new train data (thread safe)"""
+        self.data_event.set()
+
+    def wait(self, due=None):
+        """Sleep until the next frame is due or new data arrives
+
+        Args:
+            due: Unix timestamp from next_frame_time(), or None for the next
+                 frame clock slot. Slots that have already passed are
+                 skipped and counted.
+
+        Returns:
+            True if woken early by new data
+        """
+        self.stats['frames'] += 1
+        now = time.monotonic()
+
+        if due is None:
+            slot = math.floor((now - self.epoch) / self.frame_period) + 1
+            if self.deadline is not None:
+                # Slots between the last deadline and now were missed
+                missed = slot - round((self.deadline - self.epoch) / self.frame_period) - 1
+                self.stats['skipped'] += max(0, missed)
+            self.deadline = self.epoch + slot * self.frame_period
+        else:
+            self.deadline = now + (due - time.time())
+
+        timeout = self.deadline - now
+        if timeout <= 0:
+            return False
+
+        woken = self.data_event.wait(timeout)
+        woke_at = time.monotonic()
+        self.stats['idle'] += woke_at - now
+        if woken:
+            self.data_event.clear()
+            self.stats['wakeups_on_data'] += 1
+            self.deadline = woke_at  # Frame is due now
+        else:
+            self.overshoot.add(woke_at - self.deadline)
+        return woken
+
+    def report(self):
+        """Get frame rate, idle share and timing percentiles since the last report
+
+        Returns:
+            Dict with 'fps', 'idle_ratio', 'frames', 'skipped',
+            'wakeups_on_data', and 'render', 'overshoot', 'jitter' dicts of
+            percentile -> seconds; resets the counters
+        """
+        elapsed = max(time.monotonic() - self.stats_started, 1e-9)
+        report = {
+            'fps': self.stats['frames'] / elapsed,
+            'idle_ratio': self.stats['idle'] / elapsed,
+            'frames': self.stats['frames'],
+            'skipped': self.stats['skipped'],
+            'wakeups_on_data': self.stats['wakeups_on_data'],
+            'render': self.render_times.percentiles(),
+            'overshoot': self.overshoot.percentiles(),
+            'jitter': self.jitter.percentiles(),
+        }
+        self.stats = {'frames': 0, 'skipped': 0, 'idle': 0.0, 'wakeups_on_data': 0}
+        self.stats_started = time.monotonic()
+        for window in (self.render_times, self.overshoot, self.jitter):
+            window.clear()
+        return report
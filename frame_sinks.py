@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Headless frame sinks for DisplayManager
+Receive rendered frames when there is no LED matrix (or alongside one):
+an in-memory ring buffer of raw frames, a rate-limited PNG snapshot
+writer, and animated GIF/APNG dumps of buffered frames
+"""
+
+import logging
+import os
+import time
+from collections import deque
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+
+class RingBufferSink:
+    """Keeps the last N frames in memory as raw RGB bytes"""
+
+    def __init__(self, size=300, frame_size=(64, 32)):
+        """Initialize ring buffer
+
+        Args:
+            size: Number of frames kept
+            frame_size: (width, height) of the frames
+        """
+        self.frame_size = frame_size
+        self.frames = deque(maxlen=size)  # (timestamp, direction, RGB bytes)
+        self.written = 0
+
+    def __len__(self):
+        return len(self.frames)
+
+    def write(self, img, direction, now=None):
+        """Store a frame
+
+        Args:
+            img: PIL Image object (RGB)
+            direction: Direction shown
+            now: Unix timestamp of the frame (default: time.time())
+        """
+        self.frames.append((now or time.time(), direction, img.tobytes()))
+        self.written += 1
+
+    def images(self, count=None):
+        """Get buffered frames as images, oldest first
+
+        Args:
+            count: Only the most recent count frames (default: all)
+
+        Returns:
+            List of (timestamp, PIL Image) tuples
+        """
+        frames = list(self.frames)
+        if count is not None:
+            frames = frames[-count:]
+        return [
+            (timestamp, Image.frombytes('RGB', self.frame_size, data))
+            for timestamp, direction, data in frames
+        ]
+
+    def latest(self):
+        """Most recent frame as a PIL Image, or None if empty"""
+        if not self.frames:
+            return None
+        return Image.frombytes('RGB', self.frame_size, self.frames[-1][2])
+
+    def dump_animation(self, path, count=None, scale=1):
+        """Write buffered frames to one animated GIF or APNG
+
+        Args:
+            path: Output file; '.gif' writes a GIF, anything else an APNG
+            count: Only the most recent count frames (default: all)
+            scale: Integer upscale factor, since 64x32 is tiny on a monitor
+
+        Returns:
+            Number of frames written
+        """
+        frames = self.images(count)
+        if not frames:
+            logger.warning("No frames buffered, nothing to dump")
+            return 0
+        return dump_animation(frames, path, scale)
+
+
+class SnapshotSink:
+    """Writes a PNG of the current frame at most once per interval
+
+    Each direction has one file that is replaced on every snapshot, so a
+    long run keeps a fixed number of files instead of filling the disk.
+    """
+
+    def __init__(self, directory="/tmp", min_interval=5.0, prefix="mta_display"):
+        """Initialize snapshot writer
+
+        Args:
+            directory: Where snapshots are written
+            min_interval: Minimum seconds between snapshots
+            prefix: File name prefix ({prefix}_{direction}.png)
+        """
+        self.directory = directory
+        self.min_interval = min_interval
+        self.prefix = prefix
+        self.last_write = None
+        self.written = 0
+        self.dropped = 0
+
+    def write(self, img, direction, now=None):
+        """Save the frame unless a snapshot was written too recently
+
+        Args:
+            img: PIL Image object
+            direction: Direction name for filename
+            now: Unix timestamp of the frame (default: time.time())
+        """
+        now = now or time.time()
+        if self.last_write is not None and 0 <= now - self.last_write < self.min_interval:
+            self.dropped += 1
+            return
+
+        filename = self.path(direction)
+        tmp_path = filename + ".tmp"
+        try:
+            # Replace atomically so viewers never see a half-written PNG
+            img.save(tmp_path, format="PNG")
+            os.replace(tmp_path, filename)
+            self.last_write = now
+            self.written += 1
+            logger.debug(f"Saved test image: {filename}")
+        except Exception as e:
+            logger.debug(f"Could not save test image: {e}")
+
+    def path(self, direction):
+        """Snapshot file of a direction"""
+        return os.path.join(self.directory, f"{self.prefix}_{direction}.png")
+
+
+def dump_animation(frames, path, scale=1):
+    """Write frames to an animated GIF or APNG
+
+    Frame durations follow the frame timestamps, so frames the scheduler
+    held on screen longer are shown longer.
+
+    Args:
+        frames: List of (timestamp, PIL Image) tuples, oldest first
+        path: Output file; '.gif' writes a GIF, anything else an APNG
+        scale: Integer upscale factor
+
+    Returns:
+        Number of frames written
+    """
+    images = [img for timestamp, img in frames]
+    if scale > 1:
+        images = [
+            img.resize((img.width * scale, img.height * scale), Image.NEAREST)
+            for img in images
+        ]
+
+    timestamps = [timestamp for timestamp, img in frames]
+    durations = [
+        max(20, int((later - earlier) * 1000))
+        for earlier, later in zip(timestamps, timestamps[1:])
+    ]
+    durations.append(durations[-1] if durations else 100)
+
+    save_format = 'GIF' if path.lower().endswith('.gif') else 'PNG'
+    images[0].save(
+        path,
+        format=save_format,
+        save_all=True,
+        append_images=images[1:],
+        duration=durations,
+        loop=0,
+    )
+    logger.info(f"Wrote {len(images)} frames to {path}")
+    return len(images)
@@ -7,11 +7,17 @@ Displays real-time train arrivals for multiple routes at a station
 
 import time
 import logging
+import signal
 from threading import Thread
 
+from arrival_snapshot import ArrivalSnapshot
 from config import Config
 from mta_client import MTAClient
 from display_manager import DisplayManager
+from frame_pipeline import FramePipeline
+from frame_scheduler import FrameScheduler
+from poll_scheduler import PollScheduler
+from static_gtfs import StaticGTFS
 
 # Configure logging
 logging.basicConfig(
@@ -28,102 +34,417 @@ class MTATrainDisplay:
         """Initialize the display application"""
         self.config = Config
         # Initialize MTA client - uses only real-time feed data
-        self.mta_client = MTAClient(api_key=self.config.MTA_API_KEY)
+        # Static trips.txt supplies real headsigns for every route
+        static_gtfs = StaticGTFS.load(
+            self.config.STATIC_TRIPS_PATH,
+            self.config.STATIC_CACHE_PATH
+        )
+        self.mta_client = MTAClient(
+            api_key=self.config.MTA_API_KEY,
+            max_trains=self.config.MAX_TRAINS,
+            stale_seconds=self.config.STALE_ARRIVAL_SECONDS,
+            static_gtfs=static_gtfs,
+            breaker_threshold=self.config.BREAKER_FAILURE_THRESHOLD,
+            breaker_reset=self.config.BREAKER_RESET_TIMEOUT
+        )
         self.display_manager = DisplayManager()
+        self.frame_scheduler = FrameScheduler(
+            fps=self.config.DISPLAY_FPS,
+            frame_duration=self.config.FRAME_DURATION,
+            adaptive=self.config.ADAPTIVE_FRAME_RATE
+        )
+        
+        # Optional render thread that composes frames ahead of their deadlines
+        self.frame_pipeline = None
+        if self.config.RENDER_PIPELINE:
+            self.frame_pipeline = FramePipeline(
+                self.display_manager,
+                self.frame_scheduler,
+                lambda: self.snapshot,
+                depth=self.config.RENDER_QUEUE_SIZE
+            )
+        
+        # Polls timed to the feed's publish cadence
+        self.poll_scheduler = PollScheduler(
+            interval=self.config.API_UPDATE_INTERVAL,
+            retry_delay=self.config.POLL_RETRY_DELAY,
+            max_backoff=self.config.POLL_MAX_BACKOFF,
+            adaptive=self.config.FEED_AWARE_POLLING,
+            min_interval=self.config.POLL_MIN_INTERVAL if self.config.PROXIMITY_POLLING else None,
+            max_interval=self.config.POLL_MAX_INTERVAL,
+            proximity_factor=self.config.POLL_PROXIMITY_FACTOR
+        )
+        
+        # Feeds covering every configured route (e.g. R/N and D live on
+        # different feeds), fetched concurrently each update
+        self.feed_paths = MTAClient.feed_paths_for_routes(
+            self.config.ROUTE_IDS,
+            self.config.FEED_PATH
+        )
         
         self.running = False
         self.current_frame = "northbound"  # Start with northbound
-        self.train_data = {"northbound": [], "southbound": []}
+        # Current arrivals; replaced (never modified) by the update thread
+        self.snapshot = ArrivalSnapshot.empty()
         self.last_update = 0
+        self.data_expired = False  # Board cleared after STALE_DATA_LIMIT
+        self.saved_version = None  # Snapshot version last written to SNAPSHOT_PATH
+        self.last_save = 0
         
         logger.info("MTATrainDisplay initialized")
         logger.info(f"  Stop: {self.config.STOP_NAME}")
         logger.info(f"  Stop ID: {self.config.STOP_ID}")
         logger.info(f"  Routes: {self.config.ROUTE_IDS}")
+        logger.info(f"  Feeds: {self.feed_paths}")
         logger.info(f"  Display: {self.config.DISPLAY_WIDTH}x{self.config.DISPLAY_HEIGHT}")
     
     def fetch_train_data(self):
         """Fetch train data from MTA API
         
-        Uses real-time feed from MTA (no external files needed)
+        Uses real-time feed from MTA (no external files needed). Only the
+        update thread calls this, so it is the single writer of
+        self.snapshot.
         """
         try:
-            feed = self.mta_client.get_feed(self.config.FEED_PATH)
+            feed = self.mta_client.get_feeds(self.feed_paths)
+            fetched_at = time.time()
             if feed is None:
-                logger.warning("Failed to fetch feed data")
+                # Keep serving the last good snapshot while retrying
+                self.poll_scheduler.record(None, fetched_at)
+                logger.warning(
+                    f"Failed to fetch feed data, showing data "
+                    f"{self.snapshot.age(fetched_at):.0f}s old"
+                )
+                self.expire_stale_data(fetched_at)
+                return
+            
+            self.poll_scheduler.record(feed.header.timestamp, fetched_at)
+            
+            # Unchanged feed - current train data is still up to date
+            # (unless the board was cleared while the feed was failing)
+            if not self.mta_client.last_feed_changed and not self.data_expired:
+                self.publish(None, feed.header.timestamp, fetched_at)
+                logger.debug(
+                    f"Feed unchanged, skipped parse "
+                    f"({self.mta_client.fetch_stats['skipped']}/"
+                    f"{self.mta_client.fetch_stats['fetches']} fetches skipped)"
+                )
                 return
             
             # Parse feed - extracts destination and direction from real-time data
-            self.train_data = self.mta_client.parse_feed(
+            train_data = self.mta_client.parse_feed(
                 feed, 
                 self.config.STOP_ID,
                 route_ids=self.config.ROUTE_IDS
             )
-            self.last_update = time.time()
+            snapshot = self.publish(train_data, feed.header.timestamp, fetched_at)
+            self.data_expired = False
             
             logger.info(
-                f"Updated train data - "
-                f"Northbound: {len(self.train_data['northbound'])} trains, "
-                f"Southbound: {len(self.train_data['southbound'])} trains"
+                f"Updated train data (version {snapshot.version}) - "
+                f"Northbound: {len(snapshot.northbound)} trains, "
+                f"Southbound: {len(snapshot.southbound)} trains, "
+                f"data age {fetched_at - feed.header.timestamp:.1f}s"
             )
             
         except Exception as e:
             logger.error(f"Error fetching train data: {e}")
     
+    def expire_stale_data(self, now):
+        """Clear the board once the last good data is older than STALE_DATA_LIMIT
+        
+        Args:
+            now: Unix timestamp
+        """
+        snapshot = self.snapshot
+        if self.data_expired or snapshot.age(now) < self.config.STALE_DATA_LIMIT:
+            return
+        self.data_expired = True
+        if snapshot.northbound or snapshot.southbound:
+            logger.warning(
+                f"Train data is {snapshot.age(now):.0f}s old, "
+                f"clearing the board until the feed recovers"
+            )
+            # Keep fetched_at so the age keeps counting from the last good data
+            self.publish({}, snapshot.feed_timestamp, snapshot.fetched_at)
+    
+    def publish(self, train_data, feed_timestamp, fetched_at):
+        """Publish the next arrival snapshot
+        
+        Readers pick it up by reading self.snapshot; the display is only
+        woken when the arrivals actually changed.
+        
+        Args:
+            train_data: Dict from MTAClient.parse_feed(), or None if the
+                        feed was unchanged
+            feed_timestamp: Feed header timestamp
+            fetched_at: Unix time of the fetch
+            
+        Returns:
+            The published ArrivalSnapshot
+        """
+        previous = self.snapshot
+        snapshot = previous.publish(train_data, feed_timestamp, fetched_at)
+        self.snapshot = snapshot  # Atomic reference swap
+        self.last_update = fetched_at
+        
+        if snapshot.version != previous.version:
+            self.frame_scheduler.notify_data()
+            if self.frame_pipeline:
+                self.frame_pipeline.notify_data()
+            if fetched_at - self.last_save >= self.config.SNAPSHOT_SAVE_INTERVAL:
+                self.save_snapshot()
+        return snapshot
+    
+    def save_snapshot(self):
+        """Write the current arrivals to SNAPSHOT_PATH if they changed since the last save"""
+        snapshot = self.snapshot
+        if (not self.config.SNAPSHOT_PATH or snapshot.restored
+                or snapshot.version == self.saved_version
+                or not (snapshot.northbound or snapshot.southbound)):
+            return
+        try:
+            snapshot.save(self.config.SNAPSHOT_PATH)
+            self.saved_version = snapshot.version
+            self.last_save = snapshot.fetched_at
+        except OSError as e:
+            logger.error(f"Error saving arrivals snapshot: {e}")
+    
+    def restore_snapshot(self):
+        """Show the arrivals saved by the last run until the first fetch returns
+        
+        Called before the threads start. Saved data older than
+        STALE_DATA_LIMIT is ignored, and trains that have left are dropped.
+        """
+        if not self.config.SNAPSHOT_PATH:
+            return
+        now = time.time()
+        snapshot = ArrivalSnapshot.load(
+            self.config.SNAPSHOT_PATH,
+            after=now - self.config.STALE_ARRIVAL_SECONDS
+        )
+        if snapshot is None:
+            return
+        
+        age = snapshot.age(now)
+        if age > self.config.STALE_DATA_LIMIT:
+            logger.info(f"Ignoring saved arrivals from {age:.0f}s ago")
+            return
+        
+        self.snapshot = snapshot
+        self.last_update = snapshot.fetched_at
+        logger.info(
+            f"Restored arrivals saved {age:.0f}s ago - "
+            f"Northbound: {len(snapshot.northbound)} trains, "
+            f"Southbound: {len(snapshot.southbound)} trains (stale until the feed answers)"
+        )
+    
     def update_loop(self):
-        """Background thread to update train data periodically"""
+        """Background thread to update train data periodically
+        
+        Polls when the PollScheduler expects the next feed publish to be
+        available, skipping publishes while the next train is far away.
+        Failed polls are retried with jittered backoff, and not before the
+        circuit breakers of the feeds let requests through again.
+        The first poll goes out right away.
+        """
+        last_report = time.time()
+        
         while self.running:
             try:
+                now = time.time()
+                next_arrival = self.snapshot.next_arrival(now)
+                due = self.poll_scheduler.next_poll(now, next_arrival)
+                retry_at = self.mta_client.retry_at(self.feed_paths)
+                if retry_at is not None:
+                    due = max(due, retry_at)
+                delay = due - now
+                
+                # Clear data that outlives STALE_DATA_LIMIT during a long backoff
+                expires = self.snapshot.fetched_at + self.config.STALE_DATA_LIMIT
+                if (self.poll_scheduler.failures and not self.data_expired
+                        and now <= expires < due):
+                    time.sleep(expires - now)
+                    self.expire_stale_data(time.time())
+                    continue
+                
+                logger.debug(
+                    f"Next poll in {delay:.1f}s"
+                    + (f" (next train in {next_arrival - now:.0f}s)" if next_arrival else "")
+                )
+                if delay > 0:
+                    time.sleep(delay)
                 self.fetch_train_data()
-                time.sleep(self.config.API_UPDATE_INTERVAL)
+                
+                if time.time() - last_report >= self.config.POLL_STATS_INTERVAL:
+                    self.log_poll_stats(self.poll_scheduler.report())
+                    last_report = time.time()
             except Exception as e:
                 logger.error(f"Error in update loop: {e}")
                 time.sleep(5)  # Wait before retrying
     
     def display_loop(self):
-        """Main display loop - alternates between northbound and southbound"""
-        frame_duration = self.config.FRAME_DURATION
-        last_frame_switch = time.time()
+        """Main display loop - alternates between northbound and southbound
+        
+        Frames are rendered when the scheduler says something changed:
+        every frame while a destination slides, otherwise at countdown
+        minute boundaries, direction switches and new data.
+        """
+        if self.frame_pipeline:
+            self.pipelined_display_loop()
+            return
+        
+        scheduler = self.frame_scheduler
+        last_report = time.time()
         
         while self.running:
             try:
+                frame = scheduler.start_frame()
+                render_start = time.monotonic()
                 current_time = time.time()
                 
-                # Switch frames every frame_duration seconds
-                if current_time - last_frame_switch > frame_duration:
-                    self.current_frame = (
-                        "southbound" 
-                        if self.current_frame == "northbound" 
-                        else "northbound"
-                    )
-                    last_frame_switch = current_time
+                # Switch direction every FRAME_DURATION seconds
+                self.current_frame = scheduler.direction_at(current_time)
                 
                 # Get the trains for current frame
                 direction = self.current_frame
-                trains = self.train_data[direction][:2]  # Get first 2 trains
+                snapshot = self.snapshot
+                trains = snapshot.trains(direction)[:2]  # Get first 2 trains
                 
                 # Render the frame
-                self.display_manager.render_frame(direction, trains)
+                self.display_manager.render_frame(direction, trains, now=current_time, frame=frame,
+                                                  stale=snapshot.restored)
+                scheduler.end_frame(time.monotonic() - render_start)
                 
-                time.sleep(1 / self.config.DISPLAY_FPS)
+                if current_time - last_report >= self.config.FRAME_STATS_INTERVAL:
+                    self.log_frame_stats(scheduler.report())
+                    last_report = current_time
+                
+                # Sleep until the next frame is due (or new data arrives)
+                animating = self.display_manager.is_animating(trains)
+                scheduler.wait(scheduler.next_frame_time(current_time, trains, animating))
                 
             except Exception as e:
                 logger.error(f"Error in display loop: {e}")
                 time.sleep(0.1)
     
+    def pipelined_display_loop(self):
+        """Display loop with a render thread
+        
+        The render thread composes frames ahead with the same schedule as
+        display_loop; this loop only blits each one on its deadline.
+        """
+        pipeline = self.frame_pipeline
+        last_report = time.time()
+        pipeline.start()
+        
+        try:
+            while self.running:
+                try:
+                    pipeline.show_next(timeout=1.0)
+                    
+                    current_time = time.time()
+                    if current_time - last_report >= self.config.FRAME_STATS_INTERVAL:
+                        self.log_frame_stats(self.frame_scheduler.report())
+                        self.log_pipeline_stats(pipeline.report())
+                        last_report = current_time
+                        
+                except Exception as e:
+                    logger.error(f"Error in display loop: {e}")
+                    time.sleep(0.1)
+        finally:
+            pipeline.stop()
+    
+    def log_poll_stats(self, report):
+        """Log a PollScheduler report
+        
+        Args:
+            report: Dict from PollScheduler.report()
+        """
+        period = f"{report['period']:.1f}s" if report['period'] else "unknown"
+        spacing = f", spacing now {report['spacing']:.0f}s" if report['spacing'] else ""
+        age = report['data_age']
+        logger.info(
+            f"Polling: {report['polls']} requests "
+            f"({report['polls'] * 60 / self.config.POLL_STATS_INTERVAL:.1f}/min{spacing}), "
+            f"{report['fresh']} fresh, {report['misses']} early or stalled, "
+            f"{report['failures']} failed, {report['retries']} retries"
+        )
+        breakers = self.mta_client.breakers.values()
+        if any(breaker.stats['failures'] for breaker in breakers):
+            logger.info(
+                "  Circuit breakers: " + ", ".join(
+                    f"{breaker.name} {breaker.state} "
+                    f"({breaker.stats['failures']} failures, {breaker.stats['opened']} opened, "
+                    f"{breaker.stats['rejected']} rejected)"
+                    for breaker in breakers
+                )
+            )
+        logger.info(
+            f"  Feed publishes every {period}, available after {report['lag']:.1f}s; "
+            f"data age at fetch p50/p95: {age[50]:.1f}/{age[95]:.1f}s"
+        )
+    
+    def log_pipeline_stats(self, report):
+        """Log a FramePipeline report
+        
+        Args:
+            report: Dict from FramePipeline.report()
+        """
+        logger.info(
+            f"  Pipeline - rendered: {report['rendered']}, "
+            f"shown: {report['shown']}, "
+            f"stale: {report['stale']}, late: {report['late']}, "
+            f"invalidations: {report['invalidations']}, "
+            f"queued: {report['queued']}"
+        )
+    
+    def log_frame_stats(self, report):
+        """Log a FrameScheduler report
+        
+        Args:
+            report: Dict from FrameScheduler.report()
+        """
+        def ms(percentiles):
+            return "/".join(f"{percentiles[p] * 1000:.1f}" for p in (50, 95, 99))
+        
+        logger.info(
+            f"Display: {report['fps']:.1f} FPS, "
+            f"{report['idle_ratio']:.0%} idle, "
+            f"{report['skipped']} frames skipped, "
+            f"{report['wakeups_on_data']} wakeups on new data"
+        )
+        logger.info(
+            f"  p50/p95/p99 ms - render: {ms(report['render'])}, "
+            f"sleep overshoot: {ms(report['overshoot'])}, "
+            f"jitter: {ms(report['jitter'])}"
+        )
+    
+    def dump_frames(self, signum=None, frame=None):
+        """Write the recently rendered frames to an animated GIF (SIGUSR1)"""
+        path = f"/tmp/mta_display_{int(time.time())}.gif"
+        try:
+            self.display_manager.dump_animation(path, scale=4)
+        except Exception as e:
+            logger.error(f"Error dumping frames: {e}")
+    
     def run(self):
         """Start the application"""
         logger.info("Starting MTA Train Display application")
         self.running = True
         
+        # kill -USR1 <pid> dumps the buffered frames (test mode)
+        if hasattr(signal, "SIGUSR1"):
+            signal.signal(signal.SIGUSR1, self.dump_frames)
+        
         try:
-            # Start update thread (fetches new data every API_UPDATE_INTERVAL seconds)
+            # Arrivals from the last run, so the first frame has countdowns
+            self.restore_snapshot()
+            
+            # Start update thread (fetches right away, then as the feed publishes)
             update_thread = Thread(target=self.update_loop, daemon=True)
             update_thread.start()
             
-            # Initial fetch
-            self.fetch_train_data()
-            
             # Run display loop (main thread)
             self.display_loop()
             
@@ -138,6 +459,7 @@ class MTATrainDisplay:
         """Clean shutdown"""
         logger.info("Shutting down...")
         self.running = False
+        self.save_snapshot()
         self.display_manager.cleanup()
         logger.info("Shutdown complete")
 
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Mock RGB LED matrix
+Stands in for rgbmatrix.RGBMatrix so DisplayManager output can be
+exercised and benchmarked headless, without a Pi or LED panel
+"""
+
+from PIL import Image
+
+
+class MockCanvas:
+    """Offscreen frame canvas, as returned by CreateFrameCanvas()"""
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.image = Image.new('RGB', (width, height))
+
+    def SetImage(self, image, offset_x=0, offset_y=0, unsafe=True):
+        """Copy a PIL image onto the canvas"""
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        self.image.paste(image, (offset_x, offset_y))
+
+    def SetPixel(self, x, y, r, g, b):
+        self.image.putpixel((x, y), (r, g, b))
+
+    def Clear(self):
+        self.image.paste((0, 0, 0), (0, 0, self.width, self.height))
+
+
+class MockMatrix:
+    """In-memory RGBMatrix with the subset of the API the display uses
+
+    Counts SetPixel calls and vsync swaps so tests and benchmarks can check
+    which output path was taken. With canvas=False the frame canvas calls
+    are missing, like an old rgbmatrix build.
+    """
+
+    def __init__(self, width=64, height=32, canvas=True):
+        """Initialize mock matrix
+
+        Args:
+            width: Panel width in pixels
+            height: Panel height in pixels
+            canvas: Provide CreateFrameCanvas / SwapOnVSync
+        """
+        self.width = width
+        self.height = height
+        self.front = MockCanvas(width, height)
+        self.set_pixel_calls = 0
+        self.swaps = 0
+        if not canvas:
+            # Leave out the double-buffering API
+            self.CreateFrameCanvas = None
+            self.SwapOnVSync = None
+
+    def CreateFrameCanvas(self):
+        return MockCanvas(self.width, self.height)
+
+    def SwapOnVSync(self, canvas):
+        """Show canvas and hand back the previous front buffer"""
+        self.swaps += 1
+        self.front, canvas = canvas, self.front
+        return canvas
+
+    def SetPixel(self, x, y, r, g, b):
+        self.set_pixel_calls += 1
+        self.front.SetPixel(x, y, r, g, b)
+
+    def Clear(self):
+        self.front.Clear()
+
+    @property
+    def image(self):
+        """Copy of the frame currently shown"""
+        return self.front.image.copy()
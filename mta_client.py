@@ -5,20 +5,35 @@ Fetches and parses real-time train data from MTA
 Uses route + direction mapping to provide destinations
 """
 
+import bisect
+import hashlib
+import heapq
 import logging
 import requests
+import sys
 import certifi
 import time
+import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from google.transit import gtfs_realtime_pb2
 import urllib3
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
+from arrival_table import HAVE_NUMPY, ArrivalTable
+from circuit_breaker import CircuitBreaker
+
 logger = logging.getLogger(__name__)
 
 
 class Train:
-    """Represents a train with arrival information"""
+    """Represents a train with arrival information
+    
+    Uses __slots__ so the many short-lived Train objects created on every
+    update carry no per-instance __dict__.
+    """
+    
+    __slots__ = ('route_id', 'destination', 'arrival_time', 'direction')
     
     def __init__(self, route_id, destination, arrival_time, direction):
         self.route_id = route_id
@@ -26,10 +41,16 @@ class Train:
         self.arrival_time = arrival_time  # Unix timestamp
         self.direction = direction
     
-    def get_minutes_to_arrival(self):
-        """Get minutes until train arrival"""
-        current_time = time.time()
-        seconds_to_arrival = self.arrival_time - current_time
+    def get_minutes_to_arrival(self, now=None):
+        """Get minutes until train arrival
+        
+        Args:
+            now: Optional Unix timestamp to measure from, so every train of
+                 a frame can share one clock sample (default: time.time())
+        """
+        if now is None:
+            now = time.time()
+        seconds_to_arrival = self.arrival_time - now
         minutes = max(0, int(seconds_to_arrival / 60))
         return minutes
     
@@ -37,6 +58,213 @@ class Train:
         return f"Train(route={self.route_id}, dest={self.destination}, arrives_in={self.get_minutes_to_arrival()}m)"
 
 
+class FeedIndex:
+    """Arrivals by stop ID, kept up to date from successive feeds
+    
+    Maps each platform stop ID (e.g. 'R35N') to its arrivals sorted by time,
+    so any number of stations can be answered from one decoded FeedMessage.
+    
+    Each trip_update entity is remembered by entity.id together with its
+    trip update timestamp, or its serialized bytes when the feed leaves the
+    timestamp unset (as the subway feeds do). update() only re-extracts
+    entities that were added or changed and drops removed ones, patching
+    the stop lists in place. Feeds must not be modified once indexed.
+    """
+    
+    def __init__(self, feed=None, stop_ids=None, route_ids=None):
+        """Initialize the index
+        
+        Args:
+            feed: Optional FeedMessage to index right away
+            stop_ids: Optional set of stop IDs to index; None indexes every
+                      stop in the feed
+            route_ids: Optional set of route IDs to index; None indexes
+                       every route
+        """
+        self.stop_filter = set(stop_ids) if stop_ids is not None else None
+        self.route_filter = set(route_ids) if route_ids is not None else None
+        # Indexed stop IDs as serialized in a StopTimeUpdate (field 4 tag,
+        # length, bytes): counting them in a trip's bytes tells how many
+        # indexed stops it visits before walking its stop_time_updates
+        self._stop_patterns = None
+        if self.stop_filter is not None:
+            self._stop_patterns = [
+                b"\x22" + bytes([len(encoded)]) + encoded
+                for encoded in (stop_id.encode() for stop_id in self.stop_filter)
+                if len(encoded) < 0x80
+            ]
+        self._entities = {}  # entity key -> (version, [stop_id, ...])
+        self._stops = defaultdict(dict)  # stop_id -> {entity key: arrival}
+        self._sorted = {}  # stop_id -> sorted arrivals, dropped when patched
+        self.trip_count = 0
+        self.timestamp = 0
+        self.version = 0  # Bumped whenever an update changes any arrival
+        self.update_stats = {'reused': 0, 'added': 0, 'changed': 0, 'removed': 0}
+        
+        if feed is not None:
+            self.update(feed)
+    
+    @property
+    def reuse_ratio(self):
+        """Fraction of trips reused unchanged by the last update()"""
+        if not self.trip_count:
+            return 0.0
+        return self.update_stats['reused'] / self.trip_count
+    
+    def build(self, feed):
+        """Index all trip updates of a feed from scratch
+        
+        Args:
+            feed: FeedMessage from MTA
+        """
+        self._entities = {}
+        self._stops = defaultdict(dict)
+        self._sorted = {}
+        self.version += 1
+        self.update(feed)
+    
+    def update(self, feed):
+        """Bring the index up to date with a new feed
+        
+        Args:
+            feed: FeedMessage from MTA
+        """
+        entities = self._entities
+        route_filter = self.route_filter
+        seen = set()
+        stats = {'reused': 0, 'added': 0, 'changed': 0, 'removed': 0}
+        
+        for entity in feed.entity:
+            if not entity.HasField("trip_update"):
+                continue
+            
+            trip_update = entity.trip_update
+            trip = trip_update.trip
+            if route_filter is not None and trip.route_id not in route_filter:
+                continue
+            # Entity IDs are only unique per feed; the trip ID keeps merged
+            # feeds apart
+            key = (entity.id, trip.trip_id)
+            seen.add(key)
+            
+            # Without a trip timestamp the serialized trip update is its
+            # version: one C-level serialize and byte compare per trip
+            data = None
+            version = trip_update.timestamp
+            if not version:
+                version = data = trip_update.SerializeToString()
+            
+            previous = entities.get(key)
+            if previous is not None:
+                if previous[0] == version:
+                    stats['reused'] += 1
+                    continue
+                self._remove(key, previous[1])
+                stats['changed'] += 1
+            else:
+                stats['added'] += 1
+            
+            visits = None  # Unknown: walk every stop
+            if data is not None and self._stop_patterns is not None:
+                visits = sum(map(data.count, self._stop_patterns))
+            entities[key] = (version, self._add(key, trip_update, visits) if visits != 0 else [])
+        
+        for key in [key for key in entities if key not in seen]:
+            self._remove(key, entities.pop(key)[1])
+            stats['removed'] += 1
+        
+        self.update_stats = stats
+        if stats['added'] or stats['changed'] or stats['removed']:
+            self.version += 1
+        self.trip_count = len(seen)
+        self.timestamp = feed.header.timestamp
+    
+    def _add(self, key, trip_update, visits=None):
+        """Index the arrivals of one trip update
+        
+        Args:
+            key: Entity key
+            trip_update: TripUpdate message
+            visits: Number of indexed stops the trip visits, to stop walking
+                    once all were found (None walks every stop)
+            
+        Returns:
+            List of stop IDs the trip was indexed under
+        """
+        stops = self._stops
+        stop_filter = self.stop_filter
+        trip = trip_update.trip
+        trip_info = None
+        stop_ids = []
+        
+        found = 0
+        for stop_time in trip_update.stop_time_update:
+            if found == visits:
+                break
+            stop_id = stop_time.stop_id
+            if stop_filter is not None and stop_id not in stop_filter:
+                continue
+            found += 1
+            
+            # Unset fields read as 0, which avoids two HasField calls
+            arrival_time = stop_time.arrival.time or stop_time.departure.time
+            if not arrival_time:
+                continue
+            
+            if trip_info is None:
+                # Route IDs repeat across thousands of rows - share one string
+                trip_info = (sys.intern(trip.route_id), trip.trip_id, trip.direction_id)
+            stops[stop_id][key] = (arrival_time,) + trip_info
+            self._sorted.pop(stop_id, None)
+            stop_ids.append(stop_id)
+        
+        return stop_ids
+    
+    def _remove(self, key, stop_ids):
+        """Drop the arrivals of one entity
+        
+        Args:
+            key: Entity key
+            stop_ids: Stop IDs the entity was indexed under
+        """
+        for stop_id in stop_ids:
+            arrivals = self._stops[stop_id]
+            arrivals.pop(key, None)
+            if not arrivals:
+                del self._stops[stop_id]
+            self._sorted.pop(stop_id, None)
+    
+    def arrivals(self, stop_id):
+        """Get arrivals at an exact stop ID
+        
+        Args:
+            stop_id: Platform stop ID (e.g., 'R35N')
+            
+        Returns:
+            List of (arrival_time, route_id, trip_id, direction_id) tuples
+            sorted by arrival time
+        """
+        arrivals = self._sorted.get(stop_id)
+        if arrivals is None:
+            arrivals = sorted(self._stops[stop_id].values()) if stop_id in self._stops else []
+            self._sorted[stop_id] = arrivals
+        return arrivals
+    
+    def stop_ids(self):
+        """Get all indexed stop IDs with at least one arrival"""
+        return self._stops.keys()
+    
+    def rows(self):
+        """Iterate over all indexed arrivals, in no particular order
+        
+        Yields:
+            Tuples of (stop_id, (arrival_time, route_id, trip_id, direction_id))
+        """
+        for stop_id, arrivals in self._stops.items():
+            for arrival in arrivals.values():
+                yield stop_id, arrival
+
+
 class MTAClient:
     """Client for MTA GTFS-RT API"""
     
@@ -57,13 +285,55 @@ class MTAClient:
         }
     }
     
-    def __init__(self, api_key=None):
+    # Feed path serving each route
+    ROUTE_FEEDS = {
+        '1': 'gtfs', '2': 'gtfs', '3': 'gtfs', '4': 'gtfs', '5': 'gtfs',
+        '6': 'gtfs', '6X': 'gtfs', '7': 'gtfs', '7X': 'gtfs', 'GS': 'gtfs',
+        'A': 'gtfs-ace', 'C': 'gtfs-ace', 'E': 'gtfs-ace', 'H': 'gtfs-ace',
+        'FS': 'gtfs-ace',
+        'B': 'gtfs-bdfm', 'D': 'gtfs-bdfm', 'F': 'gtfs-bdfm', 'FX': 'gtfs-bdfm',
+        'M': 'gtfs-bdfm',
+        'G': 'gtfs-g',
+        'J': 'gtfs-jz', 'Z': 'gtfs-jz',
+        'L': 'gtfs-l',
+        'N': 'gtfs-nqrw', 'Q': 'gtfs-nqrw', 'R': 'gtfs-nqrw', 'W': 'gtfs-nqrw',
+        'SI': 'gtfs-si',
+    }
+    
+    # Arrivals kept per direction, and how long a train stays listed after
+    # its predicted arrival time
+    MAX_TRAINS = 5
+    STALE_SECONDS = 30
+    
+    # Consecutive failures that open a feed's circuit breaker, and seconds
+    # before a trial request is let through
+    BREAKER_THRESHOLD = 3
+    BREAKER_RESET = 30
+    
+    def __init__(self, api_key=None, max_trains=None, stale_seconds=None, static_gtfs=None,
+                 breaker_threshold=None, breaker_reset=None, use_arrival_table=False):
         """Initialize MTA client
         
         Args:
             api_key: Optional MTA API key
+            max_trains: Trains kept per direction (default MAX_TRAINS)
+            stale_seconds: Seconds after arrival before a train is dropped
+                           (default STALE_SECONDS)
+            static_gtfs: Optional StaticGTFS whose headsigns are used as
+                         destinations (DESTINATIONS is the fallback)
+            breaker_threshold: Failures that open a feed's circuit breaker
+                               (default BREAKER_THRESHOLD)
+            breaker_reset: Seconds a breaker stays open before a trial
+                           request (default BREAKER_RESET)
+            use_arrival_table: Answer lookups from a NumPy ArrivalTable
+                               (ignored without NumPy). The table is rebuilt
+                               on every changed feed, which only pays off for
+                               overview boards querying many stops per poll
         """
         self.api_key = api_key
+        self.static_gtfs = static_gtfs
+        self.max_trains = max_trains if max_trains is not None else self.MAX_TRAINS
+        self.stale_seconds = stale_seconds if stale_seconds is not None else self.STALE_SECONDS
         self.base_url = "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds%2fnyct"
         self.session = requests.Session()
         self.session.verify = False  # ← ADD THIS LINE
@@ -71,6 +341,46 @@ class MTAClient:
         if self.api_key:
             self.session.headers.update({"x-api-key": self.api_key})
 
+        # Conditional fetch state per feed path: ETag / Last-Modified from the
+        # server, a hash of the raw body, the header timestamp and the last
+        # decoded FeedMessage (reused whenever the feed has not changed)
+        self._feed_state = {}
+        self.last_feed_changed = True
+        self.fetch_stats = {
+            'fetches': 0,
+            'skipped': 0,         # Total fetches that skipped the decode
+            'not_modified': 0,    # Server answered 304
+            'same_body': 0,       # Body hash matched the previous fetch
+            'same_timestamp': 0,  # Header timestamp matched the previous fetch
+            'failures': 0,        # HTTP or decode errors
+            'rejected': 0,        # Not sent: circuit breaker open
+        }
+        self._stats_lock = threading.Lock()
+        
+        # Circuit breaker per feed path, so a failing feed is left alone for
+        # a while instead of being requested on every poll
+        self.breaker_threshold = (breaker_threshold if breaker_threshold is not None
+                                  else self.BREAKER_THRESHOLD)
+        self.breaker_reset = breaker_reset if breaker_reset is not None else self.BREAKER_RESET
+        self.breakers = {}
+        
+        # Multi-feed fetching: worker pool, per-feed timings of the last
+        # get_feeds() call and the last merged FeedMessage
+        self._executor = None
+        self.feed_timings = {}
+        self._merged_paths = None
+        self._merged_feed = None
+        
+        # Arrival index patched in place from poll to poll
+        self.feed_index = None
+        self._indexed_feed = None
+        
+        # Optional columnar backend for overview boards
+        self.use_arrival_table = use_arrival_table and HAVE_NUMPY
+        self._arrival_table = None
+        self._arrival_table_index = None
+        self._arrival_table_version = None
+
         # Configure SSL/TLS properly with certifi
         # try:
         #     ca_bundle = certifi.where()
@@ -84,40 +394,402 @@ class MTAClient:
     def get_feed(self, feed_path):
         """Fetch GTFS-RT feed from MTA
         
+        Sends conditional request headers when the server provided them and
+        skips the protobuf decode when the feed has not changed since the last
+        fetch. In that case the previously decoded FeedMessage is returned and
+        last_feed_changed is set to False so callers can skip parsing as well.
+        Nothing is requested while the feed's circuit breaker is open.
+        
         Args:
             feed_path: Feed path (e.g., 'gtfs-nqrw' for NQRW lines)
             
         Returns:
             Parsed FeedMessage or None on error
         """
+        feed, changed = self._guarded_fetch(feed_path)
+        if feed is not None:
+            self.last_feed_changed = changed
+        return feed
+    
+    def breaker(self, feed_path):
+        """Get the circuit breaker of a feed path, creating it on first use"""
+        breaker = self.breakers.get(feed_path)
+        if breaker is None:
+            breaker = CircuitBreaker(feed_path, self.breaker_threshold, self.breaker_reset,
+                                     max_reset_timeout=4 * self.breaker_reset)
+            self.breakers[feed_path] = breaker
+        return breaker
+    
+    def breaker_states(self):
+        """Get dict of feed path -> breaker state ('closed', 'open', 'half_open')"""
+        return {feed_path: breaker.state for feed_path, breaker in self.breakers.items()}
+    
+    def retry_at(self, feed_paths):
+        """Get when an open breaker lets requests through again
+        
+        Args:
+            feed_paths: Feed paths the next poll needs
+            
+        Returns:
+            Unix timestamp if every one of the feeds has an open breaker,
+            else None (at least one can be requested now)
+        """
+        times = [self.breaker(feed_path).retry_at() for feed_path in feed_paths]
+        if not times or None in times:
+            return None
+        return min(times)
+    
+    def _guarded_fetch(self, feed_path):
+        """Fetch a feed through its circuit breaker
+        
+        Args:
+            feed_path: Feed path to fetch
+            
+        Returns:
+            Tuple of (FeedMessage or None, changed)
+        """
+        breaker = self.breaker(feed_path)
+        if not breaker.allow():
+            self._count('rejected')
+            logger.debug(f"Circuit open, not fetching feed {feed_path}")
+            return None, False
+        
         try:
-            url = f"{self.base_url}/{feed_path}"
-            logger.debug(f"Fetching from {url}")
+            feed, changed = self._fetch_feed(feed_path)
+            breaker.record_success()
+            return feed, changed
             
-            response = self.session.get(
-                url,
-                timeout=10,
-                verify=False  # Explicitly disable SSL verification
-            )
-            response.raise_for_status()
+        except requests.exceptions.RequestException as e:
+            logger.error(f"HTTP error fetching feed {feed_path}: {e}")
+        except Exception as e:
+            logger.error(f"Error parsing feed {feed_path}: {e}")
+        self._count('failures')
+        breaker.record_failure()
+        return None, False
+    
+    def _fetch_feed(self, feed_path):
+        """Download a feed, decoding it only if it changed
+        
+        Args:
+            feed_path: Feed path (e.g., 'gtfs-nqrw' for NQRW lines)
             
-            feed = gtfs_realtime_pb2.FeedMessage()
-            feed.ParseFromString(response.content)
+        Returns:
+            Tuple of (FeedMessage, changed)
+        """
+        url = f"{self.base_url}/{feed_path}"
+        logger.debug(f"Fetching from {url}")
+        
+        state = self._feed_state.get(feed_path)
+        headers = {}
+        if state:
+            if state['etag']:
+                headers['If-None-Match'] = state['etag']
+            if state['last_modified']:
+                headers['If-Modified-Since'] = state['last_modified']
+        
+        response = self.session.get(
+            url,
+            headers=headers,
+            timeout=10,
+            verify=False  # Explicitly disable SSL verification
+        )
+        self._count('fetches')
+        
+        if response.status_code == 304 and state:
+            return self._skip_fetch(feed_path, 'not_modified')
+        
+        response.raise_for_status()
+        content = response.content
+        body_hash = hashlib.blake2b(content, digest_size=16).digest()
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        
+        if state:
+            if body_hash == state['body_hash']:
+                # Same bytes as the decoded feed, so its validators are good
+                state['etag'] = etag
+                state['last_modified'] = last_modified
+                return self._skip_fetch(feed_path, 'same_body')
             
-            logger.debug(f"Successfully fetched feed with {len(feed.entity)} entities")
+            timestamp = self._peek_header_timestamp(content)
+            if timestamp and timestamp == state['timestamp']:
+                state['body_hash'] = body_hash
+                return self._skip_fetch(feed_path, 'same_timestamp')
+        
+        # Validators are only stored with a successfully decoded feed, so a
+        # bad response is not answered with 304 on the next request
+        feed = gtfs_realtime_pb2.FeedMessage()
+        feed.ParseFromString(content)
+        
+        self._feed_state[feed_path] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'body_hash': body_hash,
+            'timestamp': feed.header.timestamp,
+            'feed': feed,
+        }
+        
+        logger.debug(f"Successfully fetched feed with {len(feed.entity)} entities")
+        return feed, True
+    
+    def _skip_fetch(self, feed_path, reason):
+        """Record a skipped decode and return the cached feed
+        
+        Args:
+            feed_path: Feed path that was fetched
+            reason: fetch_stats counter explaining why the decode was skipped
+            
+        Returns:
+            Tuple of (cached FeedMessage, False)
+        """
+        self._count(reason)
+        self._count('skipped')
+        logger.debug(f"Feed {feed_path} unchanged ({reason}), skipping decode")
+        return self._feed_state[feed_path]['feed'], False
+    
+    def _count(self, name):
+        """Increment a fetch_stats counter (fetches may run on worker threads)"""
+        with self._stats_lock:
+            self.fetch_stats[name] += 1
+    
+    @classmethod
+    def feed_paths_for_routes(cls, route_ids, default_feed_path):
+        """Get the feed paths needed to cover a set of routes
+        
+        Args:
+            route_ids: List of route IDs, or None for all routes
+            default_feed_path: Feed used for unknown routes or when
+                               route_ids is None
+            
+        Returns:
+            List of unique feed paths, in route order
+        """
+        if route_ids is None:
+            return [default_feed_path]
+        
+        feed_paths = []
+        for route_id in route_ids:
+            feed_path = cls.ROUTE_FEEDS.get(route_id, default_feed_path)
+            if feed_path not in feed_paths:
+                feed_paths.append(feed_path)
+        return feed_paths
+    
+    def get_feeds(self, feed_paths):
+        """Fetch several GTFS-RT feeds concurrently and merge them
+        
+        All feeds are requested at the same time on a small thread pool, so
+        the total latency is that of the slowest feed. Per-feed timings are
+        stored in feed_timings. A feed that fails falls back to its last good
+        copy as long as another feed answered; last_feed_changed is False if
+        no feed changed.
+        
+        Args:
+            feed_paths: List of feed paths (e.g., ['gtfs-nqrw', 'gtfs-bdfm'])
+            
+        Returns:
+            FeedMessage with the entities of all feeds, or None if every
+            feed failed (last good copies alone would hide the outage)
+        """
+        if len(feed_paths) == 1:
+            start = time.monotonic()
+            feed = self.get_feed(feed_paths[0])
+            self.feed_timings = {feed_paths[0]: time.monotonic() - start}
             return feed
+        
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=4,
+                thread_name_prefix="feed-fetch"
+            )
+        
+        futures = {
+            feed_path: self._executor.submit(self._timed_fetch, feed_path)
+            for feed_path in feed_paths
+        }
+        
+        feeds = []
+        fallbacks = []
+        changed = False
+        timings = {}
+        for feed_path, future in futures.items():
+            feed, feed_changed, elapsed = future.result()
+            timings[feed_path] = elapsed
+            if feed is None:
+                state = self._feed_state.get(feed_path)
+                if state is None:
+                    continue
+                fallbacks.append(feed_path)
+                feed = state['feed']
+            feeds.append(feed)
+            changed = changed or feed_changed
+        
+        self.feed_timings = timings
+        logger.debug(
+            "Feed timings: " +
+            ", ".join(f"{path}={elapsed * 1000:.0f}ms" for path, elapsed in timings.items())
+        )
+        
+        if len(fallbacks) == len(feeds):
+            return None  # No feed answered
+        for feed_path in fallbacks:
+            logger.warning(f"Using last good copy of feed {feed_path}")
+        
+        paths = tuple(feed_paths)
+        if not changed and self._merged_paths == paths:
+            self.last_feed_changed = False
+            return self._merged_feed
+        
+        merged = gtfs_realtime_pb2.FeedMessage()
+        merged.header.CopyFrom(max(feeds, key=lambda f: f.header.timestamp).header)
+        for feed in feeds:
+            merged.entity.extend(feed.entity)
+        
+        self._merged_paths = paths
+        self._merged_feed = merged
+        self.last_feed_changed = True
+        return merged
+    
+    def _timed_fetch(self, feed_path):
+        """Fetch one feed on a worker thread
+        
+        Args:
+            feed_path: Feed path to fetch
             
-        except requests.exceptions.RequestException as e:
-            logger.error(f"HTTP error fetching feed: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"Error parsing feed: {e}")
+        Returns:
+            Tuple of (FeedMessage or None, changed, elapsed seconds)
+        """
+        start = time.monotonic()
+        feed, changed = self._guarded_fetch(feed_path)
+        return feed, changed, time.monotonic() - start
+    
+    @staticmethod
+    def _peek_header_timestamp(content):
+        """Read feed.header.timestamp without decoding the whole feed
+        
+        The header is field 1 of FeedMessage and is serialized first, so only
+        its length prefix and the few bytes of the header itself are decoded.
+        
+        Args:
+            content: Raw FeedMessage bytes
+            
+        Returns:
+            Header timestamp, or None if it could not be read
+        """
+        try:
+            if not content or content[0] != 0x0A:  # field 1, length-delimited
+                return None
+            
+            length = 0
+            shift = 0
+            pos = 1
+            while True:
+                byte = content[pos]
+                pos += 1
+                length |= (byte & 0x7F) << shift
+                if not byte & 0x80:
+                    break
+                shift += 7
+            
+            header = gtfs_realtime_pb2.FeedHeader()
+            header.ParseFromString(content[pos:pos + length])
+            return header.timestamp or None
+            
+        except Exception:
             return None
     
+    @staticmethod
+    def compile_stop_matcher(stop_id):
+        """Build the exact stop ID -> direction table for a station
+        
+        Args:
+            stop_id: Base stop ID (e.g., 'R35')
+            
+        Returns:
+            Dict mapping 'R35N' -> 'northbound', 'R35S' -> 'southbound' and
+            the parent 'R35' -> None (direction taken from the trip)
+        """
+        return {
+            f"{stop_id}N": "northbound",
+            f"{stop_id}S": "southbound",
+            stop_id: None,
+        }
+    
+    def get_destination(self, route_id, direction, trip_id=None):
+        """Get the destination shown for a train
+        
+        Args:
+            route_id: Route ID (e.g., 'R')
+            direction: 'northbound' or 'southbound'
+            trip_id: Optional GTFS-RT trip ID, matched against the static
+                     trips for the exact headsign of that trip
+            
+        Returns:
+            Static GTFS headsign, destination from the mapping, or 'Unknown'
+        """
+        if self.static_gtfs is not None:
+            destination = None
+            if trip_id:
+                destination = self.static_gtfs.headsign_for_trip(trip_id)
+            if not destination:
+                destination = self.static_gtfs.destination(route_id, direction)
+            if destination:
+                return destination
+        
+        if route_id in self.DESTINATIONS:
+            return self.DESTINATIONS[route_id].get(direction, "Unknown")
+        return "Unknown"
+    
+    def index_feed(self, feed, stop_ids, route_ids=None):
+        """Update the client's FeedIndex with a feed
+        
+        The index persists across polls so only entities that changed since
+        the previous feed are re-extracted. It covers every stop ID and route
+        requested so far; asking for new ones starts a fresh index.
+        
+        Args:
+            feed: FeedMessage from MTA
+            stop_ids: Platform stop IDs that must be indexed
+            route_ids: Route IDs that must be indexed, or None for all routes
+            
+        Returns:
+            Up-to-date FeedIndex
+        """
+        index = self.feed_index
+        routes_covered = index is not None and (
+            index.route_filter is None
+            or (route_ids is not None and index.route_filter.issuperset(route_ids))
+        )
+        if index is None or not routes_covered or not index.stop_filter.issuperset(stop_ids):
+            watched = set(stop_ids)
+            routes = set(route_ids) if route_ids is not None else None
+            if index is not None:
+                watched.update(index.stop_filter)
+                if routes is not None and index.route_filter is not None:
+                    routes.update(index.route_filter)
+                else:
+                    routes = None
+            index = self.feed_index = FeedIndex(stop_ids=watched, route_ids=routes)
+            self._indexed_feed = None
+        
+        if feed is not self._indexed_feed:
+            index.update(feed)
+            self._indexed_feed = feed
+            stats = index.update_stats
+            logger.debug(
+                f"Index update: {stats['reused']} reused, {stats['added']} added, "
+                f"{stats['changed']} changed, {stats['removed']} removed "
+                f"(reuse ratio {index.reuse_ratio:.0%})"
+            )
+        
+        return index
+    
     def parse_feed(self, feed, stop_id, route_ids=None):
         """Parse GTFS-RT feed to extract train arrivals
         
-        Uses route + direction mapping for destinations
+        Uses route + direction mapping for destinations. Stop IDs are matched
+        exactly against the station's directional platforms in one pass over
+        the feed (see trains_from_feed); parse_stations serves many stations
+        from a persistent FeedIndex instead.
         
         Args:
             feed: FeedMessage from MTA
@@ -132,101 +804,27 @@ class MTAClient:
         try:
             logger.debug(f"Parsing feed for stop_id={stop_id}, route_ids={route_ids}")
             
-            # First pass: collect candidate stops
-            all_stops = defaultdict(int)
-            for entity in feed.entity:
-                if not entity.HasField("trip_update"):
-                    continue
-                
-                for stop_time in entity.trip_update.stop_time_update:
-                    stop = stop_time.stop_id
-                    if stop_id.upper() in stop.upper() or stop.startswith(stop_id):
-                        all_stops[stop] += 1
-            
-            if all_stops:
-                logger.debug(f"Found {len(all_stops)} candidate stops matching '{stop_id}':")
-                for stop in sorted(all_stops.keys()):
-                    logger.debug(f"  {stop}: {all_stops[stop]} trips")
-            
-            # Second pass: extract trains
-            processed = 0
-            matched = 0
-            
-            for entity in feed.entity:
-                if not entity.HasField("trip_update"):
-                    continue
-                
-                trip_update = entity.trip_update
-                trip = trip_update.trip
-                route_id = trip.route_id
-                
-                processed += 1
-                
-                # MULTIPLE ROUTES SUPPORT
-                if route_ids is not None:
-                    if route_id not in route_ids:
+            # Candidate stops are only collected for debugging
+            if logger.isEnabledFor(logging.DEBUG):
+                all_stops = defaultdict(int)
+                for entity in feed.entity:
+                    if not entity.HasField("trip_update"):
                         continue
-                
-                # Check each stop in the trip
-                for stop_time in trip_update.stop_time_update:
-                    stop_id_check = stop_time.stop_id
-                    
-                    # Check if this stop matches our target
-                    matches = False
                     
-                    if stop_id.upper() in stop_id_check.upper():
-                        matches = True
-                    elif stop_id_check.startswith(stop_id):
-                        matches = True
-                    elif stop_id in stop_id_check:
-                        matches = True
-                    
-                    if matches:
-                        # Determine direction from stop_id suffix
-                        stop_upper = stop_id_check.upper()
-                        direction = None
-                        
-                        if stop_upper.endswith('N') or stop_upper.endswith('1'):
-                            direction = "northbound"
-                        elif stop_upper.endswith('S') or stop_upper.endswith('2'):
-                            direction = "southbound"
-                        elif stop_upper.endswith('0') or stop_upper.endswith('3'):
-                            # Use direction_id as fallback
-                            direction_id = trip.direction_id if hasattr(trip, 'direction_id') else 0
-                            direction = "northbound" if direction_id == 0 else "southbound"
-                        
-                        # Get destination from mapping (or Unknown as fallback)
-                        destination = "Unknown"
-                        if route_id in self.DESTINATIONS:
-                            destination = self.DESTINATIONS[route_id].get(direction, "Unknown")
-                        
-                        # Get arrival time
-                        arrival_time = None
-                        if stop_time.HasField("arrival"):
-                            arrival_time = stop_time.arrival.time
-                        elif stop_time.HasField("departure"):
-                            arrival_time = stop_time.departure.time
-                        
-                        if arrival_time and direction:
-                            train = Train(
-                                route_id=route_id,
-                                destination=destination,
-                                arrival_time=arrival_time,
-                                direction=direction
-                            )
-                            trains[direction].append(train)
-                            matched += 1
-                            logger.debug(f"✓ Added {direction} train: {route_id} to '{destination}' (stop: {stop_id_check})")
-                        
-                        break  # Found this trip's stop, move to next trip
-            
-            logger.info(f"Processed {processed} trips, matched {matched} to stop '{stop_id}'")
-            
-            # Sort by arrival time and limit to top 5
-            for direction in ["northbound", "southbound"]:
-                trains[direction].sort(key=lambda t: t.arrival_time)
-                trains[direction] = trains[direction][:5]
+                    for stop_time in entity.trip_update.stop_time_update:
+                        stop = stop_time.stop_id
+                        if stop.startswith(stop_id):
+                            all_stops[stop] += 1
+                
+                if all_stops:
+                    logger.debug(f"Found {len(all_stops)} candidate stops matching '{stop_id}':")
+                    for stop in sorted(all_stops.keys()):
+                        logger.debug(f"  {stop}: {all_stops[stop]} trips")
             
+            processed = len(feed.entity)
+            trains = self.trains_from_feed(feed, stop_id, route_ids)
+            
+            logger.info(f"Processed {processed} trips for stop '{stop_id}'")
             logger.info(f"Parsed trains - Northbound: {len(trains['northbound'])}, Southbound: {len(trains['southbound'])}")
             
             if len(trains['northbound']) == 0 and len(trains['southbound']) == 0:
@@ -241,6 +839,212 @@ class MTAClient:
             logger.error(f"Error parsing feed: {e}", exc_info=True)
             return trains
     
+    def parse_stations(self, feed, station_configs):
+        """Parse arrivals for several stations from one feed
+        
+        The platforms of every station share the client's FeedIndex, so the
+        feed is scanned once and each station is answered with a lookup plus
+        a route filter.
+        
+        Args:
+            feed: FeedMessage from MTA
+            station_configs: Dict of station key -> config with 'stop_id' and
+                             'route_ids' (e.g., Config.STATION_CONFIGS)
+            
+        Returns:
+            Dict of station key -> dict with 'northbound' and 'southbound'
+            lists of Train objects
+        """
+        matchers = {
+            key: self.compile_stop_matcher(station["stop_id"])
+            for key, station in station_configs.items()
+        }
+        stop_ids = set()
+        for stop_directions in matchers.values():
+            stop_ids.update(stop_directions)
+        route_ids = set()
+        for station in station_configs.values():
+            if station.get("route_ids") is None:
+                route_ids = None
+                break
+            route_ids.update(station["route_ids"])
+        
+        index = self.index_feed(feed, stop_ids, route_ids)
+        logger.debug(f"Indexed {index.trip_count} trips for {len(station_configs)} stations")
+        
+        return {
+            key: self.trains_from_index(index, station["stop_id"], station.get("route_ids"))
+            for key, station in station_configs.items()
+        }
+    
+    def trains_from_index(self, index, stop_id, route_ids=None):
+        """Look up a station's next trains in a FeedIndex
+        
+        Only the first max_trains arrivals per direction are turned into
+        Train objects. Each platform's arrivals are already sorted, so the
+        scan starts at the stale cutoff (bisect) and stops as soon as the
+        platform has contributed max_trains trains in its direction.
+        
+        With use_arrival_table set the lookup runs on an ArrivalTable built
+        from the index instead.
+        
+        Args:
+            index: FeedIndex covering the station's platforms
+            stop_id: Base stop ID (e.g., 'R35')
+            route_ids: List of route IDs to include, or None for all routes
+            
+        Returns:
+            Dict with 'northbound' and 'southbound' lists of Train objects
+        """
+        if self.use_arrival_table:
+            return self.trains_from_table(self.arrival_table_for(index), stop_id, route_ids)
+        
+        stop_directions = self.compile_stop_matcher(stop_id)
+        limit = self.max_trains
+        cutoff = (int(time.time() - self.stale_seconds),)
+        route_filter = set(route_ids) if route_ids is not None else None
+        candidates = {"northbound": [], "southbound": []}
+        
+        for stop_id, stop_direction in stop_directions.items():
+            arrivals = index.arrivals(stop_id)
+            taken = {"northbound": 0, "southbound": 0}
+            
+            # Skip trains that left more than stale_seconds ago
+            for i in range(bisect.bisect_left(arrivals, cutoff), len(arrivals)):
+                arrival_time, route_id, trip_id, direction_id = arrivals[i]
+                if route_filter is not None and route_id not in route_filter:
+                    continue
+                
+                direction = stop_direction
+                if direction is None:
+                    # Parent stop - use direction_id as fallback
+                    direction = "northbound" if direction_id == 0 else "southbound"
+                
+                if taken[direction] >= limit:
+                    if stop_direction is not None:
+                        break
+                    continue
+                
+                taken[direction] += 1
+                candidates[direction].append((arrival_time, route_id, trip_id))
+        
+        # At most max_trains candidates per platform - merge and allocate
+        return self._next_trains(candidates)
+    
+    def trains_from_feed(self, feed, stop_id, route_ids=None):
+        """Look up a station's next trains with one pass over a feed
+        
+        Each trip is matched against the station's exact platform IDs and
+        left at its first match. Nothing is kept between polls: for a single
+        station this is cheaper than keeping a FeedIndex up to date, which
+        still has to compare every trip of the subway feeds.
+        
+        Args:
+            feed: FeedMessage from MTA
+            stop_id: Base stop ID (e.g., 'R35')
+            route_ids: List of route IDs to include, or None for all routes
+            
+        Returns:
+            Dict with 'northbound' and 'southbound' lists of Train objects
+        """
+        stop_directions = self.compile_stop_matcher(stop_id)
+        cutoff = int(time.time() - self.stale_seconds)
+        route_filter = set(route_ids) if route_ids is not None else None
+        candidates = {"northbound": [], "southbound": []}
+        
+        for entity in feed.entity:
+            if not entity.HasField("trip_update"):
+                continue
+            
+            trip_update = entity.trip_update
+            trip = trip_update.trip
+            route_id = trip.route_id
+            if route_filter is not None and route_id not in route_filter:
+                continue
+            
+            for stop_time in trip_update.stop_time_update:
+                if stop_time.stop_id not in stop_directions:
+                    continue
+                
+                direction = stop_directions[stop_time.stop_id]
+                if direction is None:
+                    # Parent stop - use direction_id as fallback
+                    direction = "northbound" if trip.direction_id == 0 else "southbound"
+                
+                # Unset fields read as 0; skip trains that left more than
+                # stale_seconds ago
+                arrival_time = stop_time.arrival.time or stop_time.departure.time
+                if arrival_time >= cutoff:
+                    candidates[direction].append((arrival_time, route_id, trip.trip_id))
+                break  # Found this trip's stop, move to next trip
+        
+        return self._next_trains(candidates)
+    
+    def _next_trains(self, candidates):
+        """Turn the soonest max_trains candidates per direction into Trains
+        
+        Args:
+            candidates: Dict of direction -> list of (arrival_time, route_id,
+                        trip_id) tuples
+            
+        Returns:
+            Dict with 'northbound' and 'southbound' lists of Train objects
+        """
+        trains = {}
+        for direction, arrivals in candidates.items():
+            trains[direction] = [
+                Train(
+                    route_id=route_id,
+                    destination=self.get_destination(route_id, direction, trip_id),
+                    arrival_time=arrival_time,
+                    direction=direction
+                )
+                for arrival_time, route_id, trip_id in heapq.nsmallest(self.max_trains, arrivals)
+            ]
+        return trains
+    
+    def arrival_table_for(self, index):
+        """Get a columnar ArrivalTable for a FeedIndex, rebuilt on change
+        
+        Args:
+            index: FeedIndex
+            
+        Returns:
+            ArrivalTable with the index's arrivals
+        """
+        if index is not self._arrival_table_index or index.version != self._arrival_table_version:
+            self._arrival_table = ArrivalTable.from_index(index)
+            self._arrival_table_index = index
+            self._arrival_table_version = index.version
+        return self._arrival_table
+    
+    def trains_from_table(self, table, stop_id, route_ids=None):
+        """Look up a station's next trains in an ArrivalTable
+        
+        Args:
+            table: ArrivalTable covering the station's stops
+            stop_id: Base stop ID (e.g., 'R35')
+            route_ids: List of route IDs to include, or None for all routes
+            
+        Returns:
+            Dict with 'northbound' and 'southbound' lists of Train objects
+        """
+        after = int(time.time() - self.stale_seconds)
+        rows = table.next_arrivals(stop_id, route_ids, k=self.max_trains, after=after)
+        
+        trains = {}
+        for direction, direction_rows in rows.items():
+            trains[direction] = []
+            for row in direction_rows:
+                route_id, arrival_time, trip_id = table.row(row)
+                trains[direction].append(Train(
+                    route_id=route_id,
+                    destination=self.get_destination(route_id, direction, trip_id),
+                    arrival_time=arrival_time,
+                    direction=direction
+                ))
+        return trains
+    
     @staticmethod
     def get_display_name(route_id):
         """Get display name for route"""
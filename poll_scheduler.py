@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Feed-aware poll scheduler
+Learns how often the GTFS-RT feed publishes (its period) and when (its
+phase) from the history of feed.header.timestamp values, and schedules
+each poll just after the next publish should be available, instead of on
+a fixed interval that drifts against the publish times.
+
+Until enough publishes have been seen it polls every default interval.
+Polls after an expected publish that bring nothing new are retried with
+exponential backoff, so a stalled feed is not hammered. Failed requests
+back off the same way, with random jitter so displays that lost the feed
+together do not come back in lockstep.
+
+Optionally the spacing between polls also follows the nearest arrival on
+the board: every publish while a train is a minute or two out, when a
+stale countdown is most visible, and only every few publishes while the
+next train is far away.
+"""
+
+import logging
+import math
+import random
+import time
+from collections import deque
+
+from circuit_breaker import backoff_delay
+from frame_scheduler import TimingWindow
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """Decides when to poll the feed next, from its publish history"""
+
+    # Distinct feed timestamps needed before the period is trusted
+    MIN_SAMPLES = 3
+    # How much earlier to poll after each publish found on the first try,
+    # so the availability lag estimate does not stay too late
+    LAG_PROBE = 0.25
+
+    def __init__(self, interval=10, retry_delay=1.0, max_backoff=60,
+                 margin=0.5, min_period=5, max_period=120, history=20, adaptive=True,
+                 min_interval=None, max_interval=None, proximity_factor=0.1, rng=None):
+        """Initialize scheduler
+
+        Args:
+            interval: Seconds between polls until the period is learned
+            retry_delay: First retry delay when an expected publish is late
+            max_backoff: Longest delay between retries of a stalled feed
+            margin: Seconds to poll after a publish should be available
+            min_period: Shortest publish period believed
+            max_period: Longest publish period believed
+            history: Number of distinct feed timestamps remembered
+            adaptive: Poll every interval regardless of the feed when False
+            min_interval: Shortest spacing between polls when a train is
+                          close; None turns proximity spacing off
+            max_interval: Longest spacing, with no train or a distant one
+            proximity_factor: Spacing as a fraction of the time until the
+                              nearest arrival, clamped to the bounds above
+            rng: Random source for retry jitter (default: random module)
+        """
+        self.interval = interval
+        self.adaptive = adaptive
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.proximity_factor = proximity_factor
+        self.spacing = None  # Last proximity spacing used (seconds)
+        self.retry_delay = retry_delay
+        self.max_backoff = max_backoff
+        self.rng = rng or random
+        self.margin = margin
+        self.min_period = min_period
+        self.max_period = max_period
+
+        self.timestamps = deque(maxlen=history)  # Distinct header timestamps
+        self.latencies = deque(maxlen=history)   # Seen at - header timestamp
+        self.period_samples = deque(maxlen=history)
+        self.period = None  # Learned publish period (seconds)
+        self.lag = 0.0      # Publish -> available on the server (seconds)
+
+        self.last_poll = None
+        self.misses = 0  # Polls since an expected publish that brought nothing
+        self.planned = None  # Publish periods the scheduled poll waits for
+        self.failures = 0  # Consecutive failed polls
+        self.failure_delay = None  # Jittered delay before retrying a failed poll
+
+        self.stats = {'polls': 0, 'fresh': 0, 'unchanged': 0, 'misses': 0,
+                      'failures': 0, 'retries': 0}
+        self.data_ages = TimingWindow(size=history)
+
+    @property
+    def last_timestamp(self):
+        """Newest feed header timestamp seen, or None"""
+        return self.timestamps[-1] if self.timestamps else None
+
+    def data_age(self, now=None):
+        """Seconds since the newest data seen was published (None before any)"""
+        if self.last_timestamp is None:
+            return None
+        return (now or time.time()) - self.last_timestamp
+
+    def expected_publish(self):
+        """Unix time the publish after the newest one should be available
+
+        Returns:
+            Unix timestamp, or None while the period is unknown
+        """
+        if self.period is None or self.last_timestamp is None:
+            return None
+        return self.last_timestamp + self.period + self.lag
+
+    def proximity_interval(self, now, next_arrival):
+        """Get the spacing between polls for the nearest arrival
+
+        Args:
+            now: Unix timestamp
+            next_arrival: Unix arrival time of the nearest train, or None
+
+        Returns:
+            Seconds, or None when proximity spacing is off
+        """
+        if self.min_interval is None:
+            return None
+        if next_arrival is None:
+            return self.max_interval
+        spacing = (next_arrival - now) * self.proximity_factor
+        return min(max(spacing, self.min_interval), self.max_interval)
+
+    def next_poll(self, now=None, next_arrival=None):
+        """Get the time of the next poll
+
+        Args:
+            now: Unix timestamp (default: time.time())
+            next_arrival: Unix arrival time of the nearest train on the
+                          board, for proximity spacing
+
+        Returns:
+            Unix timestamp; now or earlier means poll right away
+        """
+        now = now or time.time()
+        if self.last_poll is None:
+            return now
+
+        if self.failures:
+            return self.last_poll + self.failure_delay
+
+        if self.adaptive and self.misses:
+            backoff = min(self.retry_delay * 2 ** (self.misses - 1), self.max_backoff)
+            return self.last_poll + backoff
+
+        self.spacing = self.proximity_interval(now, next_arrival)
+        if not self.adaptive:
+            return self.last_poll + (self.interval if self.spacing is None else self.spacing)
+
+        expected = self.expected_publish()
+        if expected is None:
+            # Learning the period: sparser polls would only see multiples of it
+            self.planned = None
+            return self.last_poll + self.interval
+
+        # First expected publish at least spacing after the last poll
+        due = expected + self.margin
+        self.planned = 1
+        if self.spacing is not None and due < self.last_poll + self.spacing:
+            skipped = math.ceil((self.last_poll + self.spacing - due) / self.period)
+            due += skipped * self.period
+            self.planned += skipped
+        return due
+
+    def record(self, feed_timestamp, fetched_at=None):
+        """Record the outcome of a poll
+
+        Args:
+            feed_timestamp: feed.header.timestamp of the response, or None
+                            if the poll failed
+            fetched_at: Unix time of the poll (default: time.time())
+
+        Returns:
+            True if the poll brought a publish not seen before
+        """
+        fetched_at = fetched_at or time.time()
+        self.last_poll = fetched_at
+        self.stats['polls'] += 1
+        if self.failures:
+            self.stats['retries'] += 1
+
+        if feed_timestamp is None:
+            self.stats['failures'] += 1
+            self.failures += 1
+            self.failure_delay = backoff_delay(
+                self.failures - 1, self.retry_delay, self.max_backoff, self.rng
+            )
+            return False
+
+        if self.failures > 1:
+            logger.info(f"Feed reachable again after {self.failures} failed polls")
+        self.failures = 0
+
+        # A response without a header timestamp cannot be placed in the
+        # publish history, so it counts as bringing nothing new
+        if not feed_timestamp or (self.last_timestamp is not None
+                                  and feed_timestamp <= self.last_timestamp):
+            self.stats['unchanged'] += 1
+            self._missed(fetched_at)
+            return False
+
+        self.stats['fresh'] += 1
+        if self.misses > 1:
+            logger.info(f"Feed resumed after {self.misses} empty polls")
+        retried = self.misses > 0
+        self.misses = 0
+
+        # Publish this poll was timed for; getting an older one means the
+        # poll came too early (it only caught up on a publish it missed)
+        target = None
+        if self.period is not None and self.planned and self.last_timestamp is not None:
+            target = self.last_timestamp + self.planned * self.period
+            if feed_timestamp >= target - self.period / 2:
+                target = None
+
+        self.timestamps.append(feed_timestamp)
+        self.latencies.append(fetched_at - feed_timestamp)
+        self.data_ages.add(fetched_at - feed_timestamp)
+        self._learn(retried, target, fetched_at)
+        return True
+
+    def _missed(self, fetched_at):
+        """Count a poll that brought nothing new after the publish was due"""
+        expected = self.expected_publish()
+        if expected is None:
+            return  # Nothing expected yet: regular interval polling
+        if fetched_at >= expected or self.misses:
+            self.misses += 1
+            self.stats['misses'] += 1
+            if self.misses == 3:
+                logger.warning(
+                    f"Feed stalled: no new data {fetched_at - self.last_timestamp:.0f}s "
+                    f"after its last publish, backing off"
+                )
+
+    def _learn(self, retried, early_target=None, fetched_at=None):
+        """Re-estimate the publish period and availability lag
+
+        Args:
+            retried: The new publish was only found by a retry
+            early_target: Timestamp of the publish the poll was timed for,
+                          if it came too early to get it
+            fetched_at: Unix time of the poll
+        """
+        stamps = list(self.timestamps)
+        if early_target is not None:
+            pass  # Delta spans fewer periods than planned, so says nothing
+        elif self.period is not None and self.planned and len(stamps) > 1:
+            # The poll waited for a known number of periods, so the delta
+            # divides evenly even when publishes were skipped on purpose;
+            # a feed that slowed down shows up as longer deltas
+            self.period_samples.append((stamps[-1] - stamps[-2]) / self.planned)
+        else:
+            deltas = [later - earlier for earlier, later in zip(stamps, stamps[1:])]
+            if len(deltas) < self.MIN_SAMPLES - 1:
+                return
+            # Interval polls can miss publishes, so some deltas span several
+            # periods: take a low quantile as the base period and divide each
+            # delta by the number of periods it spans
+            ordered = sorted(deltas)
+            base = max(ordered[len(ordered) // 4], self.min_period)
+            self.period_samples.clear()
+            self.period_samples.extend(delta / max(1, round(delta / base)) for delta in deltas)
+
+        periods = sorted(self.period_samples)
+        period = min(max(periods[len(periods) // 2], self.min_period), self.max_period)
+
+        if self.period is None:
+            # Earliest sighting so far: an upper bound on the lag
+            self.lag = max(0.0, min(self.latencies))
+        elif early_target is not None:
+            # The targeted publish was not out yet: the lag is at least this
+            self.lag = max(self.lag, fetched_at - early_target)
+        elif retried:
+            # Became available between the missed poll and this one
+            self.lag = max(0.0, self.latencies[-1])
+        else:
+            # Found on the first try: try a little earlier next time
+            self.lag = max(0.0, self.lag - self.LAG_PROBE)
+
+        if self.period is None or abs(period - self.period) >= 0.5:
+            logger.info(f"Feed publishes every {period:.1f}s")
+        self.period = period
+
+    def report(self):
+        """Get poll counters and data age since the last report
+
+        Returns:
+            Dict with 'period', 'lag', 'spacing', 'polls', 'fresh',
+            'unchanged', 'misses', 'failures', 'retries' (polls after a
+            failure) and 'data_age' (percentile -> seconds at fetch time);
+            resets the counters
+        """
+        report = dict(
+            self.stats,
+            period=self.period,
+            lag=self.lag,
+            spacing=self.spacing,
+            data_age=self.data_ages.percentiles(),
+        )
+        self.stats = {key: 0 for key in self.stats}
+        self.data_ages.clear()
+        return report
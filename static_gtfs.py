@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+"""
+Static GTFS store for trips.txt
+Interns routes, headsigns and direction_id into compact arrays and keeps
+them in a versioned binary cache that is memory-mapped on later starts,
+so the CSV is only parsed again when it changes
+
+Also resolves realtime trip IDs to static headsigns. GTFS-RT trip IDs
+such as '053850_R..N' share their tail with the static IDs
+('L0S1-R-1096-S02_053850_R..N27R'): origin time in hundredths of a minute,
+then the route pattern (route, direction and optional shape variant).
+"""
+
+import csv
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# GTFS direction_id -> board direction (NYCT: 0 = north, 1 = south)
+DIRECTIONS = ("northbound", "southbound")
+
+# Resolved realtime trip IDs kept before the memo is reset
+MAX_RESOLVED_TRIPS = 5000
+
+
+def split_trip_id(trip_id):
+    """Split the shared tail of a static or realtime trip ID
+
+    Args:
+        trip_id: e.g. 'L0S1-R-1096-S02_001500_R..S27R' or '001500_R..S'
+
+    Returns:
+        Tuple of (origin time, route pattern), e.g. (1500, 'R..S27R'), or
+        None if the ID does not follow the NYCT format
+    """
+    parts = trip_id.rsplit("_", 2)
+    if len(parts) < 2 or not parts[-2].isdigit():
+        return None
+    return int(parts[-2]), parts[-1]
+
+
+def short_pattern(pattern):
+    """Strip the shape variant from a route pattern
+
+    Args:
+        pattern: Route pattern, e.g. 'R..S27R' or 'GS.N01R'
+
+    Returns:
+        Route and direction only, e.g. 'R..S' or 'GS.N'
+    """
+    dot = pattern.find(".")
+    if dot < 0:
+        return pattern
+    end = dot
+    while end < len(pattern) and pattern[end] == ".":
+        end += 1
+    return pattern[:end + 1]
+
+
+def service_for_date(start_date=None):
+    """Get the NYCT service_id running on a date
+
+    Args:
+        start_date: 'YYYYMMDD' string (default: today)
+
+    Returns:
+        'Weekday', 'Saturday' or 'Sunday'
+    """
+    if start_date:
+        day = time.strptime(start_date, "%Y%m%d").tm_wday
+    else:
+        day = time.localtime().tm_wday
+    return ("Weekday", "Weekday", "Weekday", "Weekday", "Weekday", "Saturday", "Sunday")[day]
+
+
+class StaticGTFS:
+    """Trips from a static GTFS feed, stored column-wise
+
+    Row i of the arrays describes trip i of trips.txt: route_idx,
+    headsign_idx, pattern_idx and service_idx point into the interned
+    routes / headsigns / patterns / services lists, origin holds the trip's
+    origin time and direction its GTFS direction_id.
+    """
+
+    CACHE_MAGIC = b"MTAGTFS\0"
+    CACHE_VERSION = 2
+    # magic, version, source size, source mtime_ns, source hash, rows, meta length
+    CACHE_HEADER = struct.Struct("<8sIQQ16sII")
+
+    def __init__(self, routes, headsigns, patterns, services, columns, destinations):
+        """Initialize from prepared tables (use load())
+
+        Args:
+            routes: List of route IDs
+            headsigns: List of trip headsigns
+            patterns: List of route patterns (e.g. 'R..S27R')
+            services: List of service IDs
+            columns: Dict of per-trip arrays (or memoryviews): 'origin',
+                     'route_idx', 'headsign_idx', 'pattern_idx', 'direction'
+                     and 'service_idx'
+            destinations: Dict of route_id -> [northbound, southbound] headsign
+        """
+        self.routes = routes
+        self.headsigns = headsigns
+        self.patterns = patterns
+        self.services = services
+        self.origin = columns["origin"]
+        self.route_idx = columns["route_idx"]
+        self.headsign_idx = columns["headsign_idx"]
+        self.pattern_idx = columns["pattern_idx"]
+        self.direction = columns["direction"]
+        self.service_idx = columns["service_idx"]
+        self.destinations = destinations
+        self._mmap = None
+
+        # (service, origin, pattern) -> headsign index, built on first use
+        self._trip_index = None
+        # Realtime trip ID -> headsign, kept across polls
+        self._resolved = {}
+
+    def __len__(self):
+        return len(self.route_idx)
+
+    def destination(self, route_id, direction):
+        """Get the usual headsign of a route in one direction
+
+        Args:
+            route_id: Route ID (e.g., 'R')
+            direction: 'northbound' or 'southbound'
+
+        Returns:
+            Headsign, or None if the route/direction has no trips
+        """
+        by_direction = self.destinations.get(route_id)
+        if by_direction is None:
+            return None
+        return by_direction[DIRECTIONS.index(direction)]
+
+    def headsign_for_trip(self, trip_id, start_date=None):
+        """Resolve a realtime trip ID to its static headsign
+
+        Looks the trip up by (service, origin time, route pattern), first
+        with the shape variant and then by route and direction only, trying
+        the service running on start_date before the others. Results are
+        memoized, so each realtime trip is resolved once.
+
+        Args:
+            trip_id: GTFS-RT trip ID (e.g., '053850_R..N')
+            start_date: Trip start date 'YYYYMMDD' (default: today)
+
+        Returns:
+            Headsign, or None if no static trip matches
+        """
+        service = service_for_date(start_date)
+        memo_key = (trip_id, service)
+        if memo_key in self._resolved:
+            return self._resolved[memo_key]
+
+        headsign = None
+        parsed = split_trip_id(trip_id)
+        if parsed is not None:
+            if self._trip_index is None:
+                self._trip_index = self._build_trip_index()
+
+            origin, pattern = parsed
+            services = [service] + [s for s in self.services if s != service]
+            for candidate in services:
+                for key in ((candidate, origin, pattern), (candidate, origin, short_pattern(pattern))):
+                    headsign_idx = self._trip_index.get(key)
+                    if headsign_idx is not None:
+                        headsign = self.headsigns[headsign_idx]
+                        break
+                if headsign is not None:
+                    break
+
+        if len(self._resolved) >= MAX_RESOLVED_TRIPS:
+            self._resolved.clear()
+        self._resolved[memo_key] = headsign
+        return headsign
+
+    def _build_trip_index(self):
+        """Build the (service, origin, pattern) -> headsign lookup
+
+        Every trip is indexed under its full pattern and its short pattern
+        (route and direction only), since realtime IDs may omit the shape.
+
+        Returns:
+            Dict of key -> headsign index
+        """
+        index = {}
+        services, patterns = self.services, self.patterns
+        short_patterns = [short_pattern(pattern) for pattern in patterns]
+        for i in range(len(self)):
+            service = services[self.service_idx[i]]
+            origin = self.origin[i]
+            headsign = self.headsign_idx[i]
+            index.setdefault((service, origin, patterns[self.pattern_idx[i]]), headsign)
+            index.setdefault((service, origin, short_patterns[self.pattern_idx[i]]), headsign)
+        logger.debug(f"Built static trip index with {len(index)} keys")
+        return index
+
+    @classmethod
+    def load(cls, trips_path, cache_path=None):
+        """Load trips.txt, from the binary cache when it is still valid
+
+        The cache is keyed on the size, mtime and hash of trips.txt. If the
+        size and mtime match it is used without reading the CSV at all; if
+        only the hash matches the cache is reused and its header refreshed.
+
+        Args:
+            trips_path: Path to trips.txt
+            cache_path: Path of the binary cache (default: next to trips.txt)
+
+        Returns:
+            StaticGTFS, or None if trips.txt cannot be read
+        """
+        if cache_path is None:
+            cache_path = os.path.splitext(trips_path)[0] + ".cache"
+
+        try:
+            stat = os.stat(trips_path)
+        except OSError as e:
+            logger.warning(f"Static GTFS not available: {e}")
+            return None
+
+        source_hash = None
+        header = cls._read_cache_header(cache_path)
+        if header is not None:
+            if (header["size"], header["mtime_ns"]) != (stat.st_size, stat.st_mtime_ns):
+                source_hash = cls._hash_file(trips_path)
+                if source_hash != header["hash"]:
+                    header = None
+                else:
+                    cls._touch_cache(cache_path, stat, source_hash)
+
+        if header is not None:
+            try:
+                store = cls._load_cache(cache_path)
+                logger.debug(f"Loaded {len(store)} static trips from {cache_path}")
+                return store
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable static GTFS cache: {e}")
+
+        store = cls.from_csv(trips_path)
+        try:
+            store.save_cache(cache_path, stat, source_hash or cls._hash_file(trips_path))
+        except OSError as e:
+            logger.warning(f"Could not write static GTFS cache: {e}")
+        logger.info(f"Parsed {len(store)} static trips from {trips_path}")
+        return store
+
+    @classmethod
+    def from_csv(cls, trips_path):
+        """Parse trips.txt
+
+        Args:
+            trips_path: Path to trips.txt
+
+        Returns:
+            StaticGTFS
+        """
+        routes, headsigns, patterns, services = {}, {}, {}, {}
+        columns = {
+            "origin": array("I"),
+            "route_idx": array("H"),
+            "headsign_idx": array("H"),
+            "pattern_idx": array("H"),
+            "direction": array("B"),
+            "service_idx": array("B"),
+        }
+        counts = Counter()
+
+        with open(trips_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                route = routes.setdefault(row["route_id"], len(routes))
+                headsign = headsigns.setdefault(row["trip_headsign"], len(headsigns))
+                direction_id = int(row["direction_id"] or 0)
+                origin, pattern = split_trip_id(row["trip_id"]) or (0, "")
+
+                columns["origin"].append(origin)
+                columns["route_idx"].append(route)
+                columns["headsign_idx"].append(headsign)
+                columns["pattern_idx"].append(patterns.setdefault(pattern, len(patterns)))
+                columns["direction"].append(direction_id)
+                columns["service_idx"].append(services.setdefault(row["service_id"], len(services)))
+                counts[(route, direction_id, headsign)] += 1
+
+        route_names = list(routes)
+        headsign_names = list(headsigns)
+
+        # Most common headsign per route and direction
+        best = {}
+        for (route, direction_id, headsign), count in counts.items():
+            key = (route, direction_id)
+            if key not in best or count > best[key][0]:
+                best[key] = (count, headsign)
+
+        destinations = {}
+        for (route, direction_id), (count, headsign) in best.items():
+            if direction_id < len(DIRECTIONS):
+                by_direction = destinations.setdefault(route_names[route], [None, None])
+                by_direction[direction_id] = headsign_names[headsign]
+
+        return cls(route_names, headsign_names, list(patterns), list(services), columns, destinations)
+
+    # Column order and typecodes in the cache, widest first to keep alignment
+    CACHE_COLUMNS = (
+        ("origin", "I"),
+        ("route_idx", "H"),
+        ("headsign_idx", "H"),
+        ("pattern_idx", "H"),
+        ("direction", "B"),
+        ("service_idx", "B"),
+    )
+
+    def save_cache(self, cache_path, stat, source_hash):
+        """Write the binary cache atomically
+
+        Args:
+            cache_path: Destination path
+            stat: os.stat() result of trips.txt
+            source_hash: Hash of trips.txt contents
+        """
+        meta = json.dumps({
+            "byteorder": sys.byteorder,
+            "routes": self.routes,
+            "headsigns": self.headsigns,
+            "patterns": self.patterns,
+            "services": self.services,
+            "destinations": self.destinations,
+        }).encode("utf-8")
+        meta += b"\0" * (-len(meta) % 4)  # keep the uint32 column aligned
+
+        header = self.CACHE_HEADER.pack(
+            self.CACHE_MAGIC, self.CACHE_VERSION, stat.st_size, stat.st_mtime_ns,
+            source_hash, len(self), len(meta)
+        )
+
+        directory = os.path.dirname(os.path.abspath(cache_path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(meta)
+                for name, typecode in self.CACHE_COLUMNS:
+                    f.write(array(typecode, getattr(self, name)).tobytes())
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def _read_cache_header(cls, cache_path):
+        """Read and check the cache header
+
+        Returns:
+            Dict with source size, mtime_ns and hash, or None if the cache is
+            missing or from another format version
+        """
+        try:
+            with open(cache_path, "rb") as f:
+                data = f.read(cls.CACHE_HEADER.size)
+        except OSError:
+            return None
+
+        if len(data) != cls.CACHE_HEADER.size:
+            return None
+        magic, version, size, mtime_ns, source_hash, rows, meta_len = cls.CACHE_HEADER.unpack(data)
+        if magic != cls.CACHE_MAGIC or version != cls.CACHE_VERSION:
+            return None
+        return {"size": size, "mtime_ns": mtime_ns, "hash": source_hash}
+
+    @classmethod
+    def _touch_cache(cls, cache_path, stat, source_hash):
+        """Record a new size/mtime for an unchanged trips.txt in the cache header"""
+        try:
+            with open(cache_path, "r+b") as f:
+                data = bytearray(f.read(cls.CACHE_HEADER.size))
+                fields = list(cls.CACHE_HEADER.unpack(data))
+                fields[2:5] = [stat.st_size, stat.st_mtime_ns, source_hash]
+                f.seek(0)
+                f.write(cls.CACHE_HEADER.pack(*fields))
+        except OSError as e:
+            logger.debug(f"Could not refresh static GTFS cache header: {e}")
+
+    @classmethod
+    def _load_cache(cls, cache_path):
+        """Memory-map the cache and wrap its columns without copying
+
+        Returns:
+            StaticGTFS backed by the mapped file
+
+        Raises:
+            ValueError: If the file size does not match its header (e.g. a
+                        truncated cache) or it comes from another byte order
+        """
+        with open(cache_path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, size, mtime_ns, source_hash, rows, meta_len = \
+            cls.CACHE_HEADER.unpack_from(mapped)
+        expected = cls.CACHE_HEADER.size + meta_len + sum(
+            array(typecode).itemsize * rows for _, typecode in cls.CACHE_COLUMNS
+        )
+        if len(mapped) != expected:
+            actual = len(mapped)
+            mapped.close()
+            raise ValueError(f"cache is {actual} bytes, header describes {expected}")
+
+        offset = cls.CACHE_HEADER.size
+        meta = json.loads(bytes(mapped[offset:offset + meta_len]).rstrip(b"\0"))
+        if meta["byteorder"] != sys.byteorder:
+            raise ValueError("cache written on a machine with another byte order")
+        offset += meta_len
+
+        view = memoryview(mapped)
+        columns = {}
+        for name, typecode in cls.CACHE_COLUMNS:
+            length = array(typecode).itemsize * rows
+            columns[name] = view[offset:offset + length].cast(typecode)
+            offset += length
+
+        store = cls(meta["routes"], meta["headsigns"], meta["patterns"],
+                    meta["services"], columns, meta["destinations"])
+        store._mmap = mapped
+        return store
+
+    @staticmethod
+    def _hash_file(path):
+        """Hash a file's contents (16-byte BLAKE2b digest)"""
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 16), b""):
+                digest.update(chunk)
+        return digest.digest()
@@ -92,6 +92,114 @@ def test_display_rendering():
     return True
 
 
+GOLDEN_BDF = """STARTFONT 2.1
+FONT golden
+SIZE 6 75 75
+FONTBOUNDINGBOX 4 6 0 -1
+STARTPROPERTIES 2
+FONT_ASCENT 5
+FONT_DESCENT 1
+ENDPROPERTIES
+CHARS 3
+STARTCHAR H
+ENCODING 72
+DWIDTH 4 0
+BBX 3 5 0 0
+BITMAP
+A0
+A0
+E0
+A0
+A0
+ENDCHAR
+STARTCHAR i
+ENCODING 105
+DWIDTH 2 0
+BBX 1 5 0 0
+BITMAP
+80
+00
+80
+80
+80
+ENDCHAR
+STARTCHAR ?
+ENCODING 63
+DWIDTH 4 0
+BBX 3 5 0 0
+BITMAP
+E0
+20
+60
+00
+40
+ENDCHAR
+ENDFONT
+"""
+
+# "Hi?" from GOLDEN_BDF: H, i and ? at pen x 0, 4, 6
+GOLDEN_ROWS = [
+    "#.#.#.###",
+    "#.#.....#",
+    "###.#..##",
+    "#.#.#....",
+    "#.#.#..#.",
+]
+
+
+def test_bitmap_font():
+    """Test BDF bitmap font rendering is pixel exact"""
+    print("\n=== Testing Bitmap Font Rendering ===")
+
+    import os
+    import tempfile
+    from PIL import Image, ImageDraw
+    from bitmap_font import BitmapFont
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "golden.bdf")
+        with open(path, "w") as f:
+            f.write(GOLDEN_BDF)
+        font = BitmapFont.load(path)
+
+    mask, bbox = font.render("Hi?")
+    rows = [
+        "".join("#" if mask.getpixel((x, y)) else "." for x in range(mask.width))
+        for y in range(mask.height)
+    ]
+    if bbox != (0, 0, 9, 5) or rows != GOLDEN_ROWS:
+        print(f"✗ Glyph pixels differ: bbox {bbox}")
+        for row in rows:
+            print(f"  {row}")
+        return False
+    print("✓ Glyph pixels match")
+
+    # Missing characters fall back to '?'
+    if font.render("H~")[0].tobytes() != font.render("H?")[0].tobytes():
+        print("✗ Missing glyph not drawn as '?'")
+        return False
+
+    # Through the display: only exact colors, no antialiased edge pixels
+    display = DisplayManager()
+    display.fonts['dest'] = font
+    display.text_cache.clear()
+    img = Image.new('RGB', (display.DISPLAY_WIDTH, display.DISPLAY_HEIGHT))
+    display.draw_text(ImageDraw.Draw(img), (10, 20), "Hi?", 'dest', display.COLORS['white'])
+    display.cleanup()
+
+    for y, row in enumerate(GOLDEN_ROWS):
+        for x, cell in enumerate(row):
+            expected = display.COLORS['white'] if cell == "#" else (0, 0, 0)
+            if img.getpixel((10 + x, 20 + y)) != expected:
+                print(f"✗ Display pixel ({10 + x}, {20 + y}) is {img.getpixel((10 + x, 20 + y))}")
+                return False
+    if set(img.getdata()) != {(0, 0, 0), display.COLORS['white']}:
+        print("✗ Display frame has blended pixels")
+        return False
+    print("✓ Display pixels match")
+    return True
+
+
 def test_real_time_display():
     """Run live display test"""
     print("\n=== Running Live Display Test ===")
@@ -155,6 +263,7 @@ def main():
         ("API Connection", test_api_connection),
         ("Train Parsing", test_parse_trains),
         ("Display Rendering", test_display_rendering),
+        ("Bitmap Font", test_bitmap_font),
     ]
     
     results = []
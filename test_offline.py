@@ -0,0 +1,848 @@
+#!/usr/bin/env python3
+"""
+Offline checks for MTA Train Display
+Feed fetching and parsing, polling resilience and saved snapshots, run
+against synthetic feeds (no network or LED hardware needed)
+"""
+
+import logging
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import requests
+from google.transit import gtfs_realtime_pb2
+from PIL import Image
+
+from arrival_snapshot import ArrivalSnapshot
+from arrival_table import HAVE_NUMPY, ArrivalTable
+from benchmark import build_synthetic_feed, changed_copy
+from circuit_breaker import CircuitBreaker, backoff_delay
+from config import Config
+from frame_sinks import SnapshotSink
+from main import MTATrainDisplay
+from mta_client import FeedIndex, MTAClient, Train
+from poll_scheduler import PollScheduler
+from static_gtfs import StaticGTFS
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+# Damaged snapshot and cache files are expected here
+logging.getLogger("arrival_snapshot").setLevel(logging.ERROR)
+logging.getLogger("static_gtfs").setLevel(logging.ERROR)
+
+
+class FakeResponse:
+    """Just enough of requests.Response for MTAClient._fetch_feed"""
+
+    def __init__(self, content, status_code=200, etag=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = {'ETag': etag} if etag else {}
+
+    def raise_for_status(self):
+        pass
+
+
+class FakeSession:
+    """Serves queued responses and records the request headers"""
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.sent_headers = []
+
+    def get(self, url, headers=None, **kwargs):
+        self.sent_headers.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+class FeedServer:
+    """Session serving fixed feed bodies by path, with switchable outages"""
+
+    def __init__(self, bodies):
+        self.bodies = bodies
+        self.down = set()  # Feed paths that fail to connect
+        self.requests = 0
+
+    def get(self, url, headers=None, **kwargs):
+        self.requests += 1
+        feed_path = url.rsplit("/", 1)[-1]
+        if feed_path in self.down:
+            raise requests.exceptions.ConnectionError(f"{feed_path} unreachable")
+        return FakeResponse(self.bodies[feed_path])
+
+
+def test_conditional_fetch():
+    """Test a response that fails to decode does not replace the validators"""
+    print("\n=== Testing Conditional Fetch ===")
+
+    good = build_synthetic_feed(20).SerializeToString()
+    client = MTAClient()
+    client.session = FakeSession([
+        FakeResponse(good, etag='"a"'),
+        FakeResponse(b"\x0a\xff\xff not a feed", etag='"b"'),
+        FakeResponse(b"", status_code=304),
+    ])
+
+    if client.get_feed("gtfs-nqrw") is None:
+        print("✗ First fetch failed")
+        return False
+    if client.get_feed("gtfs-nqrw") is not None:
+        print("✗ Undecodable response was accepted")
+        return False
+    client.get_feed("gtfs-nqrw")
+
+    sent = client.session.sent_headers[2].get('If-None-Match')
+    if sent != '"a"':
+        print(f"✗ Sent If-None-Match {sent} after a bad response, expected the last good one")
+        return False
+    print("✓ Validators only stored with a decoded feed")
+    return True
+
+
+def index_contents(index):
+    """Dict of stop ID -> sorted arrivals of a FeedIndex"""
+    return {stop_id: index.arrivals(stop_id) for stop_id in list(index.stop_ids())}
+
+
+def expected_contents(feed, stop_ids, route_ids):
+    """Arrivals of a feed by stop ID, computed directly from the messages"""
+    contents = {}
+    for entity in feed.entity:
+        trip = entity.trip_update.trip
+        if route_ids is not None and trip.route_id not in route_ids:
+            continue
+        for stop_time in entity.trip_update.stop_time_update:
+            arrival_time = stop_time.arrival.time or stop_time.departure.time
+            if arrival_time and (stop_ids is None or stop_time.stop_id in stop_ids):
+                contents.setdefault(stop_time.stop_id, []).append(
+                    (arrival_time, trip.route_id, trip.trip_id, trip.direction_id)
+                )
+    return {stop_id: sorted(arrivals) for stop_id, arrivals in contents.items()}
+
+
+def test_incremental_index():
+    """Test FeedIndex.update() ends up where a fresh index of the same feed does"""
+    print("\n=== Testing Incremental FeedIndex ===")
+
+    base = build_synthetic_feed(60)
+    shifted = changed_copy(base, 0.2)
+
+    # Trips ending and starting
+    churned = gtfs_realtime_pb2.FeedMessage()
+    churned.CopyFrom(shifted)
+    del churned.entity[3]
+    added = churned.entity.add()
+    added.CopyFrom(churned.entity[0])
+    added.id = "new"
+    added.trip_update.trip.trip_id = "999999_R..S"
+
+    # Trip timestamps set, then only the bumped ones change
+    stamped = gtfs_realtime_pb2.FeedMessage()
+    stamped.CopyFrom(churned)
+    for entity in stamped.entity:
+        entity.trip_update.timestamp = 100
+    restamped = changed_copy(stamped, 0.25)
+    for entity in restamped.entity[::4]:
+        entity.trip_update.timestamp = 200
+
+    for stop_ids, route_ids in [(None, None),
+                                (MTAClient.compile_stop_matcher("R35"), ["R", "N", "D"])]:
+        index = FeedIndex(stop_ids=stop_ids, route_ids=route_ids)
+        for step, feed in enumerate([base, shifted, churned, base, stamped, restamped]):
+            index.update(feed)
+            fresh = FeedIndex(feed, stop_ids=stop_ids, route_ids=route_ids)
+            if index_contents(index) != index_contents(fresh):
+                print(f"✗ Feed {step}: incremental index differs from a fresh build "
+                      f"(stops {stop_ids and sorted(stop_ids)}, routes {route_ids})")
+                return False
+            if index_contents(fresh) != expected_contents(feed, stop_ids, route_ids):
+                print(f"✗ Feed {step}: index arrivals differ from the feed "
+                      f"(stops {stop_ids and sorted(stop_ids)}, routes {route_ids})")
+                return False
+            if index.trip_count != fresh.trip_count:
+                print(f"✗ Feed {step}: {index.trip_count} trips indexed, fresh build has {fresh.trip_count}")
+                return False
+
+    print("✓ Incremental updates match fresh builds")
+    return True
+
+
+def test_single_station_parse():
+    """Test the single-pass parse_feed picks the same trains as an index lookup"""
+    print("\n=== Testing Single Station Parse ===")
+
+    # Started ten minutes ago, so some trains have already left
+    feed = build_synthetic_feed(120, now=time.time() - 600)
+    client = MTAClient()
+
+    for stop_id, route_ids in [("R35", ["R", "N", "D"]), ("R35", None), ("N05", ["N"]), ("X99", None)]:
+        index = FeedIndex(feed, stop_ids=MTAClient.compile_stop_matcher(stop_id), route_ids=route_ids)
+        expected = client.trains_from_index(index, stop_id, route_ids)
+        trains = client.parse_feed(feed, stop_id, route_ids)
+        for direction in ("northbound", "southbound"):
+            if train_fields(trains[direction]) != train_fields(expected[direction]):
+                print(f"✗ {stop_id} {direction} (routes {route_ids}): {train_fields(trains[direction])}, "
+                      f"expected {train_fields(expected[direction])}")
+                return False
+
+    print("✓ parse_feed matches the index lookup")
+    return True
+
+
+def test_static_cache():
+    """Test a truncated or padded trips cache is rebuilt from trips.txt"""
+    print("\n=== Testing Static GTFS Cache ===")
+
+    feed = build_synthetic_feed(60)
+    trip_id = feed.entity[0].trip_update.trip.trip_id
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trips_path = os.path.join(tmp, "trips.txt")
+        cache_path = os.path.join(tmp, "trips.cache")
+        write_trips(trips_path, feed)
+        rows = len(StaticGTFS.load(trips_path, cache_path))
+        with open(cache_path, "rb") as f:
+            data = f.read()
+
+        cached = StaticGTFS.load(trips_path, cache_path)
+        if cached._mmap is None:
+            print("✗ Valid cache was not used")
+            return False
+
+        for problem, content in [("truncated by 100 bytes", data[:-100]),
+                                 ("truncated by 1 byte", data[:-1]),
+                                 ("padded by 1 byte", data + b"\0")]:
+            with open(cache_path, "wb") as f:
+                f.write(content)
+            store = StaticGTFS.load(trips_path, cache_path)
+            lengths = {len(getattr(store, name)) for name, _ in StaticGTFS.CACHE_COLUMNS}
+            if lengths != {rows} or store.headsign_for_trip(trip_id) != f"To {trip_id}":
+                print(f"✗ Cache {problem}: column lengths {sorted(lengths)} for {rows} trips")
+                return False
+            with open(cache_path, "rb") as f:
+                if f.read() != data:
+                    print(f"✗ Cache {problem} was not rewritten")
+                    return False
+
+    print("✓ Damaged caches fall back to trips.txt and are rewritten")
+    return True
+
+
+def test_snapshot_sink():
+    """Test PNG snapshots replace one file per direction instead of piling up"""
+    print("\n=== Testing Snapshot Sink ===")
+
+    image = Image.new("RGB", (64, 32), (255, 0, 0))
+    with tempfile.TemporaryDirectory() as tmp:
+        sink = SnapshotSink(tmp, min_interval=5.0)
+        now = 1000.0
+        for i in range(200):
+            sink.write(image, "northbound" if i % 2 else "southbound", now=now + i)
+
+        files = sorted(os.listdir(tmp))
+        expected = ["mta_display_northbound.png", "mta_display_southbound.png"]
+        if files != expected:
+            print(f"✗ Snapshot directory holds {files}, expected {expected}")
+            return False
+        if sink.written != 40 or sink.dropped != 160:
+            print(f"✗ {sink.written} written, {sink.dropped} dropped, expected 40 and 160")
+            return False
+        with Image.open(sink.path("southbound")) as saved:
+            if saved.size != (64, 32) or saved.convert("RGB").getpixel((0, 0)) != (255, 0, 0):
+                print("✗ Snapshot does not hold the frame")
+                return False
+
+    print("✓ One PNG per direction, rate limited")
+    return True
+
+
+def test_arrival_table_overview():
+    """Test the whole-line overview, including queries that match nothing"""
+    print("\n=== Testing ArrivalTable Overview ===")
+
+    if not HAVE_NUMPY:
+        print("✓ Skipped - NumPy is not installed")
+        return True
+
+    feed = build_synthetic_feed(60)
+    table = ArrivalTable.from_index(FeedIndex(feed))
+    last_arrival = int(table.arrival_ts.max())
+
+    for label, query_table, route_ids, after in [
+        ("empty table", ArrivalTable.from_rows([]), None, 0),
+        ("after every arrival", table, None, last_arrival + 1),
+        ("unknown route", table, ["Z"], 0),
+    ]:
+        overview = query_table.next_arrivals_all(route_ids, k=5, after=after)
+        if overview != {}:
+            print(f"✗ Overview of {label}: {overview}, expected no stops")
+            return False
+
+    overview = table.next_arrivals_all(["R", "N"], k=3, after=0)
+    for stop_id in table.stops:
+        expected = table.next_arrivals(stop_id, ["R", "N"], k=3, after=0)
+        by_direction = overview.get(stop_id, {})
+        for direction, rows in expected.items():
+            if list(by_direction.get(direction, [])) != list(rows):
+                print(f"✗ Overview of {stop_id} {direction} differs from next_arrivals()")
+                return False
+
+    print("✓ Overview matches per-stop lookups, empty queries return no stops")
+    return True
+
+
+def write_trips(path, feed):
+    """Write a trips.txt with a different headsign for every trip of a feed"""
+    with open(path, "w") as f:
+        f.write("route_id,trip_id,service_id,trip_headsign,direction_id,shape_id\n")
+        for entity in feed.entity:
+            trip = entity.trip_update.trip
+            pattern = trip.trip_id.split("_", 1)[1]
+            direction_id = 0 if pattern.endswith("N") else 1
+            for service in ("Weekday", "Saturday", "Sunday"):
+                f.write(f"{trip.route_id},TEST-{service}-00_{trip.trip_id},{service},"
+                        f"To {trip.trip_id},{direction_id},{pattern}\n")
+
+
+def test_trip_destinations():
+    """Test every train is shown with its own trip's headsign on both backends"""
+    print("\n=== Testing Trip Destinations ===")
+
+    feed = build_synthetic_feed(60)
+    stop_ids = MTAClient.compile_stop_matcher("R35")
+    index = FeedIndex(feed, stop_ids=stop_ids)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trips_path = os.path.join(tmp, "trips.txt")
+        write_trips(trips_path, feed)
+        static_gtfs = StaticGTFS.from_csv(trips_path)
+
+    backends = [False, True] if HAVE_NUMPY else [False]
+    results = {}
+    for use_arrival_table in backends:
+        client = MTAClient(static_gtfs=static_gtfs, use_arrival_table=use_arrival_table)
+        trains = client.trains_from_index(index, "R35")
+        results[use_arrival_table] = {
+            direction: [(train.arrival_time, train.route_id, train.destination) for train in direction_trains]
+            for direction, direction_trains in trains.items()
+        }
+
+    expected_arrivals = expected_contents(feed, stop_ids, None)
+    for stop_id, direction in (("R35N", "northbound"), ("R35S", "southbound")):
+        expected = [
+            (arrival_time, route_id, f"To {trip_id}")
+            for arrival_time, route_id, trip_id, _ in expected_arrivals[stop_id][:client.max_trains]
+        ]
+        for use_arrival_table, trains in results.items():
+            backend = "ArrivalTable" if use_arrival_table else "FeedIndex"
+            if trains[direction] != expected:
+                print(f"✗ {backend} {direction}: {trains[direction]}, expected {expected}")
+                return False
+
+    print(f"✓ Destinations match each train's trip ({', '.join('ArrivalTable' if b else 'FeedIndex' for b in backends)})")
+    return True
+
+
+class FixedRandom:
+    """Random source whose uniform() always returns one end of the range"""
+
+    def __init__(self, high):
+        self.high = high
+
+    def uniform(self, a, b):
+        return b if self.high else a
+
+
+def test_backoff_delay():
+    """Test retry delays double per attempt, stay capped and keep half fixed"""
+    print("\n=== Testing Backoff Delay ===")
+
+    for attempt in range(40):
+        delay = min(60.0, 2.0 * 2 ** attempt)
+        shortest = backoff_delay(attempt, base=2.0, cap=60.0, rng=FixedRandom(False))
+        longest = backoff_delay(attempt, base=2.0, cap=60.0, rng=FixedRandom(True))
+        jittered = backoff_delay(attempt, base=2.0, cap=60.0, rng=random.Random(attempt))
+        if (shortest, longest) != (delay / 2, delay) or not shortest <= jittered <= longest:
+            print(f"✗ Attempt {attempt}: delays {shortest}, {jittered}, {longest}, expected within [{delay / 2}, {delay}]")
+            return False
+
+    print("✓ Delays between half and all of min(cap, base * 2**attempt)")
+    return True
+
+
+def test_circuit_breaker():
+    """Test breaker transitions and reset timeout doubling with a fixed clock"""
+    print("\n=== Testing Circuit Breaker ===")
+
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30,
+                             max_reset_timeout=120, rng=FixedRandom(True))
+    now = 1000.0
+
+    # Closed until the third consecutive failure
+    breaker.record_failure(now)
+    breaker.record_success()
+    breaker.record_failure(now)
+    breaker.record_failure(now)
+    if breaker.state != CircuitBreaker.CLOSED or not breaker.allow(now) or breaker.retry_at() is not None:
+        print(f"✗ Breaker {breaker.state} after 2 consecutive failures, expected closed")
+        return False
+    breaker.record_failure(now)
+    if breaker.state != CircuitBreaker.OPEN or breaker.retry_at() != now + 30:
+        print(f"✗ Breaker {breaker.state} retrying at {breaker.retry_at()} after 3 failures, "
+              f"expected open until {now + 30}")
+        return False
+
+    # Open: rejected until the timeout passes, then a single half-open trial
+    if breaker.allow(now + 29) or breaker.stats['rejected'] != 1:
+        print("✗ Request allowed before the reset timeout")
+        return False
+    if not breaker.allow(now + 30) or breaker.state != CircuitBreaker.HALF_OPEN:
+        print(f"✗ Breaker {breaker.state} after the reset timeout, expected half open")
+        return False
+    if breaker.allow(now + 30):
+        print("✗ Second request allowed while the trial is pending")
+        return False
+
+    # Each failed trial doubles the timeout, up to max_reset_timeout
+    for timeout in (60, 120, 120):
+        now = breaker.retry_at()
+        breaker.allow(now)
+        breaker.record_failure(now)
+        if breaker.state != CircuitBreaker.OPEN or breaker.retry_at() != now + timeout:
+            print(f"✗ Failed trial: breaker {breaker.state} retrying in "
+                  f"{breaker.retry_at() - now}s, expected open for {timeout}s")
+            return False
+
+    # A successful trial closes the breaker and resets the timeout
+    now = breaker.retry_at()
+    breaker.allow(now)
+    breaker.record_success()
+    if breaker.state != CircuitBreaker.CLOSED or breaker.timeout != 30 or breaker.failures:
+        print(f"✗ Breaker {breaker.state} with timeout {breaker.timeout} after a successful trial")
+        return False
+    if breaker.stats['opened'] != 4:
+        print(f"✗ Breaker opened {breaker.stats['opened']} times, expected 4")
+        return False
+
+    # Jittered timeouts fall in the upper half of the timeout
+    jittered = CircuitBreaker("jitter", failure_threshold=1, rng=random.Random(0))
+    for _ in range(20):
+        jittered.record_failure(2000.0)
+        if not 2015.0 <= jittered.retry_at() <= 2030.0:
+            print(f"✗ Jittered breaker retrying at {jittered.retry_at()}, expected 2015-2030")
+            return False
+        jittered.record_success()
+
+    print("✓ Closed -> open -> half open transitions and timeout doubling")
+    return True
+
+
+class PublishingFeed:
+    """Feed publishing every period seconds from phase, readable lag seconds later"""
+
+    def __init__(self, phase=1003, period=15, lag=2):
+        self.phase = phase
+        self.period = period
+        self.lag = lag
+        self.stalled_at = None  # Publishes stop after this Unix time
+
+    def published(self, timestamp):
+        """Unix time a publish timestamp becomes available"""
+        return timestamp + self.lag
+
+    def latest(self, now):
+        """Header timestamp a poll at now gets"""
+        if self.stalled_at is not None:
+            now = min(now, self.stalled_at)
+        return self.phase + math.floor((now - self.lag - self.phase) / self.period) * self.period
+
+
+def poll_once(scheduler, feed, now, next_arrival=None):
+    """Wait for the scheduler's next poll and record what the feed returns
+
+    Returns:
+        Tuple of (poll time, header timestamp, whether it was fresh)
+    """
+    now = max(now, scheduler.next_poll(now, next_arrival))
+    timestamp = feed.latest(now)
+    return now, timestamp, scheduler.record(timestamp, now)
+
+
+def test_poll_schedule():
+    """Test period and phase learning, stall backoff and planned skips with a fixed clock"""
+    print("\n=== Testing Poll Schedule ===")
+
+    feed = PublishingFeed()
+    scheduler = PollScheduler(interval=10, retry_delay=1.0, max_backoff=60, margin=0.5)
+    # First seen 2.5s after publishing: the first lag estimate is too high
+    now, timestamp, _ = poll_once(scheduler, feed, 1005.5)
+    for _ in range(10):
+        now, timestamp, _ = poll_once(scheduler, feed, now)
+    if scheduler.period != feed.period:
+        print(f"✗ Learned period {scheduler.period}, feed publishes every {feed.period}s")
+        return False
+
+    # Learned: every publish is caught, soon after it becomes available
+    waits = []
+    for _ in range(30):
+        previous = timestamp
+        now, timestamp, fresh = poll_once(scheduler, feed, now)
+        if not fresh:
+            # Polled a little early while probing the lag: one quick retry
+            now, timestamp, fresh = poll_once(scheduler, feed, now)
+        if not fresh or timestamp != previous + feed.period:
+            print(f"✗ Poll at {now:.2f} got publish {timestamp} after {previous}")
+            return False
+        if not 0 <= now - feed.published(timestamp) <= 1.5:
+            print(f"✗ Publish {timestamp} polled {now - feed.published(timestamp):.2f}s after it was available")
+            return False
+        waits.append(now - feed.published(timestamp))
+    if min(waits) > scheduler.margin:
+        print(f"✗ Polls never came closer than {min(waits):.2f}s to a publish, lag estimate not probed")
+        return False
+
+    # Stalled feed: retries back off exponentially up to max_backoff
+    feed.stalled_at = now
+    polls = []
+    for _ in range(9):
+        now, _, fresh = poll_once(scheduler, feed, now)
+        polls.append(now)
+    delays = [round(later - earlier, 6) for earlier, later in zip(polls, polls[1:])]
+    if delays != [1, 2, 4, 8, 16, 32, 60, 60]:
+        print(f"✗ Stall retry delays {delays}, expected 1, 2, 4 ... capped at 60")
+        return False
+    feed.stalled_at = None
+    now, timestamp, fresh = poll_once(scheduler, feed, now)
+    if not fresh or scheduler.misses or scheduler.period != feed.period:
+        print("✗ Schedule did not recover when the feed resumed")
+        return False
+
+    # Distant train: proximity spacing skips whole publish periods
+    spaced = PollScheduler(interval=10, margin=0.5, min_interval=5, max_interval=60,
+                           proximity_factor=0.1)
+    now, timestamp, _ = poll_once(spaced, feed, 1010.0)
+    for _ in range(12):
+        now, timestamp, _ = poll_once(spaced, feed, now)
+    due = spaced.next_poll(now, next_arrival=now + 600)
+    expected = timestamp + spaced.planned * feed.period + spaced.lag + spaced.margin
+    if spaced.planned < 2 or due - now < 60 or abs(due - expected) > 1e-6:
+        print(f"✗ Poll planned {spaced.planned} periods ahead at {due - now:.2f}s, expected "
+              f"at least 60s spacing on a publish boundary")
+        return False
+    now, timestamp, fresh = poll_once(spaced, feed, now, next_arrival=now + 600)
+    if not fresh or spaced.period != feed.period:
+        print(f"✗ Skipping {spaced.planned - 1} publishes changed the period to {spaced.period}")
+        return False
+
+    # The feed gets slower to serve publishes: the poll comes early, gets
+    # the publish before the one it waited for, and raises the lag estimate
+    feed.lag = 12
+    target = timestamp + spaced.planned * feed.period
+    now, timestamp, fresh = poll_once(spaced, feed, now, next_arrival=now + 600)
+    if not fresh or timestamp >= target or spaced.lag != now - target or spaced.period != feed.period:
+        print(f"✗ Early poll: got {timestamp} for target {target}, lag {spaced.lag:.2f}, "
+              f"period {spaced.period}")
+        return False
+
+    print("✓ Period, phase, stall backoff and planned skips")
+    return True
+
+
+def test_poll_failures():
+    """Test failed polls back off and a response without a timestamp is not a failure"""
+    print("\n=== Testing Poll Failures ===")
+
+    scheduler = PollScheduler(retry_delay=1.0, max_backoff=60, rng=FixedRandom(True))
+    now = 1000.0
+    for attempt in range(8):
+        scheduler.record(None, now)
+        delay = scheduler.next_poll(now) - now
+        if delay != min(60.0, 2.0 ** attempt):
+            print(f"✗ Failure {attempt + 1}: retry in {delay}s, expected {min(60.0, 2.0 ** attempt)}s")
+            return False
+        now += delay
+
+    scheduler.record(0, now)
+    if scheduler.failures or scheduler.stats['failures'] != 8 or scheduler.stats['unchanged'] != 1:
+        print(f"✗ Response with timestamp 0 counted as failure ({scheduler.stats})")
+        return False
+    if scheduler.next_poll(now) != now + scheduler.interval:
+        print("✗ Polling did not return to the regular interval")
+        return False
+
+    print("✓ Failure backoff, timestamp 0 is a successful poll")
+    return True
+
+
+class FeedSource:
+    """Stands in for MTAClient.get_feeds: serves queued (feed, changed) pairs"""
+
+    def __init__(self, client, feeds):
+        self.client = client
+        self.feeds = list(feeds)
+
+    def __call__(self, feed_paths):
+        feed, changed = self.feeds.pop(0)
+        self.client.last_feed_changed = changed
+        return feed
+
+
+def offline_app(**settings):
+    """MTATrainDisplay with config overrides and no snapshot file"""
+    app = MTATrainDisplay()
+    app.config = type("OfflineConfig", (Config,), dict({"SNAPSHOT_PATH": None}, **settings))
+    return app
+
+
+def test_stale_data_expiry():
+    """Test the board is cleared at STALE_DATA_LIMIT and refilled by the next feed"""
+    print("\n=== Testing Stale Data Expiry ===")
+
+    feed = build_synthetic_feed(60)
+    app = offline_app(STALE_DATA_LIMIT=300)
+    app.mta_client.get_feeds = FeedSource(app.mta_client, [(feed, True), (None, False), (feed, False)])
+
+    app.fetch_train_data()
+    fetched_at = app.snapshot.fetched_at
+    trains = (app.snapshot.northbound, app.snapshot.southbound)
+    if not all(trains):
+        print("✗ No trains parsed from the synthetic feed")
+        return False
+
+    app.expire_stale_data(fetched_at + 299)
+    if app.data_expired or (app.snapshot.northbound, app.snapshot.southbound) != trains:
+        print("✗ Board cleared before STALE_DATA_LIMIT")
+        return False
+    app.expire_stale_data(fetched_at + 300)
+    if not app.data_expired or app.snapshot.northbound or app.snapshot.southbound:
+        print("✗ Board not cleared at STALE_DATA_LIMIT")
+        return False
+    if app.snapshot.fetched_at != fetched_at:
+        print("✗ Clearing the board reset the data age")
+        return False
+
+    # Failed fetch with old data: cleared by the fetch itself
+    app.data_expired = False
+    app.publish(
+        {"northbound": trains[0], "southbound": trains[1]},
+        app.snapshot.feed_timestamp, fetched_at - 300
+    )
+    app.fetch_train_data()
+    if not app.data_expired or app.snapshot.northbound or app.snapshot.southbound:
+        print("✗ Failed fetch did not clear data older than STALE_DATA_LIMIT")
+        return False
+
+    # Feed back but unchanged since the last parse: must be parsed again
+    app.fetch_train_data()
+    if app.data_expired or not (app.snapshot.northbound and app.snapshot.southbound):
+        print("✗ Unchanged feed after expiry skipped the parse, board still empty")
+        return False
+
+    print("✓ Cleared at STALE_DATA_LIMIT, re-parsed when the feed answers")
+    return True
+
+
+def train_fields(trains):
+    """Comparable (route, destination, arrival time, direction) tuples"""
+    return [(t.route_id, t.destination, t.arrival_time, t.direction) for t in trains]
+
+
+def sample_snapshot(now, fetched_at):
+    """Published snapshot with trains before and after now"""
+    train_data = {
+        "northbound": [Train("R", "Forest Hills-71 Av", now - 120, "northbound"),
+                       Train("N", "Astoria-Ditmars Blvd", now + 60, "northbound")],
+        "southbound": [Train("D", "Coney Island-Stillwell Av", now + 180, "southbound"),
+                       Train("R", "Bay Ridge-95 St", now + 420, "southbound")],
+    }
+    return ArrivalSnapshot.empty().publish(train_data, int(fetched_at) - 5, fetched_at)
+
+
+def test_feed_outage():
+    """Test a poll where every feed fails is a failure, not an unchanged feed"""
+    print("\n=== Testing Feed Outage ===")
+
+    app = offline_app(STALE_DATA_LIMIT=300)
+    client = app.mta_client
+    if len(app.feed_paths) < 2:
+        print(f"✗ Expected ROUTE_IDS to need several feeds, got {app.feed_paths}")
+        return False
+    server = client.session = FeedServer({
+        "gtfs-nqrw": build_synthetic_feed(60, routes=("R", "N")).SerializeToString(),
+        "gtfs-bdfm": build_synthetic_feed(60, routes=("D",)).SerializeToString(),
+    })
+
+    app.fetch_train_data()
+    fetched_at = app.snapshot.fetched_at
+    if not (app.snapshot.northbound and app.snapshot.southbound):
+        print("✗ No trains parsed from the synthetic feeds")
+        return False
+
+    # One feed down: filled in from its last good copy, the poll succeeds
+    server.down = {"gtfs-bdfm"}
+    app.fetch_train_data()
+    if app.poll_scheduler.failures or app.snapshot.fetched_at == fetched_at:
+        print("✗ Poll with one feed answering was counted as failed")
+        return False
+    fetched_at = app.snapshot.fetched_at
+
+    # Every feed down: failed polls, data age keeps growing
+    server.down = set(app.feed_paths)
+    for _ in range(8):
+        app.fetch_train_data()
+    states = set(client.breaker_states().values())
+    if app.poll_scheduler.failures != 8 or app.snapshot.fetched_at != fetched_at:
+        print(f"✗ After 8 failed polls: {app.poll_scheduler.failures} failures recorded, "
+              f"data age reset {app.snapshot.fetched_at != fetched_at}")
+        return False
+    if states != {"open"} or not client.fetch_stats['rejected']:
+        print(f"✗ Breakers {states} after 8 failed polls, expected all open")
+        return False
+
+    # Still failing once the data is older than STALE_DATA_LIMIT: cleared
+    app.snapshot = app.snapshot._replace(fetched_at=fetched_at - 300)
+    app.fetch_train_data()
+    if not app.data_expired or app.snapshot.northbound or app.snapshot.southbound:
+        print("✗ Board not cleared once the data outlived STALE_DATA_LIMIT")
+        return False
+
+    # Feeds back (breaker timeouts passed) with the same bodies as before
+    server.down = set()
+    for breaker in client.breakers.values():
+        breaker.reopen_at = 0
+    app.fetch_train_data()
+    if app.data_expired or app.poll_scheduler.failures or not app.snapshot.northbound:
+        print("✗ Board not refilled when the feeds came back")
+        return False
+
+    print("✓ Outage of every feed backs off, ages and clears the data")
+    return True
+
+
+def test_snapshot_file():
+    """Test saved snapshots load back and damaged files are rejected"""
+    print("\n=== Testing Snapshot File ===")
+
+    now = 1_800_000_000
+    snapshot = sample_snapshot(now, now - 10.5)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "arrivals.snapshot")
+        snapshot.save(path)
+        with open(path, "rb") as f:
+            data = f.read()
+
+        loaded = ArrivalSnapshot.load(path)
+        if loaded is None or not loaded.restored or (loaded.sequence, loaded.version) != (1, 1):
+            print(f"✗ Loaded {loaded}, expected a restored snapshot")
+            return False
+        if ((loaded.feed_timestamp, loaded.fetched_at) != (snapshot.feed_timestamp, snapshot.fetched_at)
+                or train_fields(loaded.northbound) != train_fields(snapshot.northbound)
+                or train_fields(loaded.southbound) != train_fields(snapshot.southbound)):
+            print(f"✗ Round trip changed the snapshot: {loaded}")
+            return False
+
+        loaded = ArrivalSnapshot.load(path, after=now)
+        if (train_fields(loaded.northbound) != train_fields(snapshot.northbound[1:])
+                or train_fields(loaded.southbound) != train_fields(snapshot.southbound)):
+            print(f"✗ after= kept {train_fields(loaded.northbound + loaded.southbound)}")
+            return False
+
+        header = ArrivalSnapshot.FILE_HEADER
+        fields = list(header.unpack_from(data))
+        damaged = {
+            "wrong magic": b"XXXXXXXX" + data[8:],
+            "wrong version": header.pack(*fields[:1], fields[1] + 1, *fields[2:]) + data[header.size:],
+        }
+        for length in range(len(data)):
+            damaged[f"truncated to {length} bytes"] = data[:length]
+        for problem, content in damaged.items():
+            with open(path, "wb") as f:
+                f.write(content)
+            if ArrivalSnapshot.load(path) is not None:
+                print(f"✗ Snapshot file with {problem} was loaded")
+                return False
+
+        if ArrivalSnapshot.load(os.path.join(tmp, "missing.snapshot")) is not None:
+            print("✗ Missing snapshot file was loaded")
+            return False
+
+    print("✓ Round trip, after= filter and damaged files")
+    return True
+
+
+def test_restore_snapshot():
+    """Test startup restores recent arrivals and ignores old ones"""
+    print("\n=== Testing Snapshot Restore ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "arrivals.snapshot")
+        app = offline_app(SNAPSHOT_PATH=path, STALE_DATA_LIMIT=300)
+        now = time.time()
+
+        sample_snapshot(now, now - 310).save(path)
+        app.restore_snapshot()
+        if app.snapshot.sequence != 0:
+            print(f"✗ Restored arrivals saved {now - app.snapshot.fetched_at:.0f}s ago, "
+                  f"older than STALE_DATA_LIMIT")
+            return False
+
+        sample_snapshot(now, now - 10).save(path)
+        app.restore_snapshot()
+        if not app.snapshot.restored or len(app.snapshot.northbound) != 1:
+            print(f"✗ Expected the recent arrivals without departed trains, got {app.snapshot}")
+            return False
+
+    print("✓ Recent arrivals restored, old ones ignored")
+    return True
+
+
+def main():
+    """Run checks"""
+    tests = [
+        ("Conditional Fetch", test_conditional_fetch),
+        ("Incremental FeedIndex", test_incremental_index),
+        ("Single Station Parse", test_single_station_parse),
+        ("Trip Destinations", test_trip_destinations),
+        ("ArrivalTable Overview", test_arrival_table_overview),
+        ("Static GTFS Cache", test_static_cache),
+        ("Snapshot Sink", test_snapshot_sink),
+        ("Backoff Delay", test_backoff_delay),
+        ("Circuit Breaker", test_circuit_breaker),
+        ("Poll Schedule", test_poll_schedule),
+        ("Poll Failures", test_poll_failures),
+        ("Stale Data Expiry", test_stale_data_expiry),
+        ("Feed Outage", test_feed_outage),
+        ("Snapshot File", test_snapshot_file),
+        ("Snapshot Restore", test_restore_snapshot),
+    ]
+
+    results = []
+    for test_name, test_func in tests:
+        try:
+            results.append((test_name, test_func()))
+        except Exception as e:
+            logger.error(f"Test '{test_name}' failed with exception: {e}", exc_info=True)
+            results.append((test_name, False))
+
+    print("\n" + "="*50)
+    print("TEST SUMMARY")
+    print("="*50)
+    for test_name, result in results:
+        status = "✓ PASS" if result else "✗ FAIL"
+        print(f"{test_name:30} {status}")
+
+    passed = sum(1 for _, r in results if r)
+    print(f"\nTotal: {passed}/{len(results)} tests passed")
+    return passed == len(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)